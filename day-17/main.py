@@ -136,6 +136,11 @@ async def websocket_audio_streaming(websocket: WebSocket):
 
     # Create a queue for transcription messages
     transcription_queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+
+    def enqueue_message(message: dict):
+        """Hands a message to the sender task; safe to call from AssemblyAI's callback thread."""
+        loop.call_soon_threadsafe(transcription_queue.put_nowait, message)
 
     # Initialize AssemblyAI StreamingClient
     client = StreamingClient(
@@ -156,7 +161,7 @@ async def websocket_audio_streaming(websocket: WebSocket):
         
         # Put transcription in queue for async sending
         try:
-            transcription_queue.put_nowait({
+            enqueue_message({
                 "type": "transcription",
                 "text": transcript_text,
                 "is_final": event.end_of_turn
@@ -174,7 +179,7 @@ async def websocket_audio_streaming(websocket: WebSocket):
     def on_error(self: Type[StreamingClient], error: StreamingError):
         logging.error(f"AssemblyAI streaming error: {error}")
         try:
-            transcription_queue.put_nowait({
+            enqueue_message({
                 "type": "error",
                 "message": f"Transcription error: {error}"
             })
@@ -191,11 +196,13 @@ async def websocket_audio_streaming(websocket: WebSocket):
     async def send_transcriptions():
         while True:
             try:
-                message = await asyncio.wait_for(transcription_queue.get(), timeout=0.1)
+                message = await transcription_queue.get()
+                # A newer message is already waiting, so this partial transcript is stale
+                if not message.get("is_final", True) and not transcription_queue.empty():
+                    transcription_queue.task_done()
+                    continue
                 await websocket.send_text(json.dumps(message))
                 transcription_queue.task_done()
-            except asyncio.TimeoutError:
-                continue
             except Exception as e:
                 logging.error(f"Error sending transcription: {e}")
                 break
@@ -9,12 +9,12 @@ from pathlib import Path as PathLib
 from uuid import uuid4
 import json
 import asyncio
-import time
 import threading
 
 # Import the config file FIRST to load dotenv and configure APIs
 import config
 from services import stt, llm, tts
+from services import endpointing
 from schemas import TTSRequest
 
 # AssemblyAI streaming imports
@@ -26,6 +26,7 @@ from assemblyai.streaming.v3 import (
     StreamingError,
     StreamingEvents,
     StreamingParameters,
+    StreamingSessionParameters,
     TerminationEvent,
     TurnEvent,
 )
@@ -155,14 +156,15 @@ async def websocket_audio_streaming(websocket: WebSocket):
 
     # Create a queue for transcription messages
     transcription_queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+
+    def enqueue_message(message: dict):
+        """Hands a message to the sender task; safe to call from AssemblyAI's callback thread."""
+        loop.call_soon_threadsafe(transcription_queue.put_nowait, message)
     
     # Session history for WebSocket connection
     session_history = []
     
-    # Track processed turns to prevent duplicates (normalize case and whitespace)
-    processed_turns = set()
-    last_turn_time = 0
-
     # Initialize AssemblyAI StreamingClient
     client = StreamingClient(
         StreamingClientOptions(
@@ -204,45 +206,33 @@ async def websocket_audio_streaming(websocket: WebSocket):
         print("Transcription session started")
 
     def on_turn(self: Type[StreamingClient], event: TurnEvent):
-        nonlocal processed_turns, last_turn_time
-        transcript_text = event.transcript.strip()
-        current_time = time.time()
-        
-        # Normalize transcript for duplicate detection (lowercase, remove extra spaces)
-        normalized_transcript = ' '.join(transcript_text.lower().split())
+        # The endpointer dedupes turns and checks local silence before calling on_turn_end
+        endpointer.on_turn(event)
+
+    def on_turn_end(transcript_text: str):
+        print(f"\nUser: {transcript_text}")
         
-        # Only process end-of-turn events, avoid duplicates, and prevent rapid-fire duplicates
-        if (event.end_of_turn and 
-            transcript_text and 
-            len(transcript_text) > 3 and  # Ignore very short transcripts
-            normalized_transcript not in processed_turns and
-            current_time - last_turn_time > 2.0):  # Increase to 2 seconds between turns
+        # Put final transcription in queue for async sending
+        try:
+            enqueue_message({
+                "type": "transcription",
+                "text": transcript_text,
+                "is_final": True,
+                "end_of_turn": True
+            })
             
-            processed_turns.add(normalized_transcript)
-            last_turn_time = current_time
-            print(f"\nUser: {transcript_text}")
+            # Send explicit end-of-turn notification
+            enqueue_message({
+                "type": "turn_end",
+                "message": "User stopped talking"
+            })
             
-            # Put final transcription in queue for async sending
-            try:
-                transcription_queue.put_nowait({
-                    "type": "transcription",
-                    "text": transcript_text,
-                    "is_final": True,
-                    "end_of_turn": True
-                })
-                
-                # Send explicit end-of-turn notification
-                transcription_queue.put_nowait({
-                    "type": "turn_end",
-                    "message": "User stopped talking"
-                })
-                
-                # Process LLM streaming response with Murf integration
-                print("Assistant: ", end="", flush=True)
-                process_llm_with_murf_sync(transcript_text)
-                
-            except asyncio.QueueFull:
-                print("Transcription queue is full")
+            # Process LLM streaming response with Murf integration
+            print("Assistant: ", end="", flush=True)
+            process_llm_with_murf_sync(transcript_text)
+            
+        except asyncio.QueueFull:
+            print("Transcription queue is full")
 
     def on_terminated(self: Type[StreamingClient], event: TerminationEvent):
         print(f"Session ended - {event.audio_duration_seconds:.1f}s processed")
@@ -250,13 +240,21 @@ async def websocket_audio_streaming(websocket: WebSocket):
     def on_error(self: Type[StreamingClient], error: StreamingError):
         print(f"Transcription error: {error}")
         try:
-            transcription_queue.put_nowait({
+            enqueue_message({
                 "type": "error",
                 "message": f"Transcription error: {error}"
             })
         except asyncio.QueueFull:
             pass
 
+    # Turn detection for this session. Clients can tune AssemblyAI's parameters
+    # with query arguments (/ws?max_turn_silence=1000) or an "endpointing" message.
+    endpointer = endpointing.Endpointer(
+        on_turn_end=on_turn_end,
+        params=endpointing.session_parameters(websocket.query_params),
+        update_params=lambda params: client.set_params(StreamingSessionParameters(**params)),
+    )
+
     # Register event handlers
     client.on(StreamingEvents.Begin, on_begin)
     client.on(StreamingEvents.Turn, on_turn)
@@ -267,11 +265,9 @@ async def websocket_audio_streaming(websocket: WebSocket):
     async def send_transcriptions():
         while True:
             try:
-                message = await asyncio.wait_for(transcription_queue.get(), timeout=0.1)
+                message = await transcription_queue.get()
                 await websocket.send_text(json.dumps(message))
                 transcription_queue.task_done()
-            except asyncio.TimeoutError:
-                continue
             except Exception:
                 break
 
@@ -285,6 +281,7 @@ async def websocket_audio_streaming(websocket: WebSocket):
                 sample_rate=16000,
                 format_turns=True,
                 enable_extra_session_information=True,
+                **endpointer.params,
             )
         )
         
@@ -303,11 +300,23 @@ async def websocket_audio_streaming(websocket: WebSocket):
                     pcm_data = message["bytes"]
                     f.write(pcm_data)  # Save to file for debugging
                     client.stream(pcm_data)  # Send to AssemblyAI for transcription
+                    endpointer.observe_audio(pcm_data)  # Local VAD for end-of-turn silence
                     
                 elif message.get("text") == "EOF":
                     print("Recording finished")
                     break
 
+                elif message.get("text"):
+                    try:
+                        control = json.loads(message["text"])
+                    except ValueError:
+                        continue
+                    if isinstance(control, dict) and control.get("type") == "endpointing":
+                        # Retune turn detection mid-session
+                        params = endpointing.session_parameters({**endpointer.params, **control})
+                        endpointer.params.update(params)
+                        client.set_params(StreamingSessionParameters(**params))
+
     except WebSocketDisconnect:
         print("Client disconnected")
     except Exception as e:
@@ -9,12 +9,13 @@ from pathlib import Path as PathLib
 from uuid import uuid4
 import json
 import asyncio
-import time
 import threading
 
 # Import the config file FIRST to load dotenv and configure APIs
 import config
 from services import stt, llm, tts
+from services import endpointing
+from services.timeline import TurnTimeline
 from schemas import TTSRequest
 
 # AssemblyAI streaming imports
@@ -26,6 +27,7 @@ from assemblyai.streaming.v3 import (
     StreamingError,
     StreamingEvents,
     StreamingParameters,
+    StreamingSessionParameters,
     TerminationEvent,
     TurnEvent,
 )
@@ -155,14 +157,16 @@ async def websocket_audio_streaming(websocket: WebSocket):
 
     # Create a queue for transcription messages
     transcription_queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+
+    def enqueue_message(message: dict):
+        """Hands a message to the sender task; safe to call from AssemblyAI's callback thread."""
+        loop.call_soon_threadsafe(transcription_queue.put_nowait, message)
     
     # Session history for WebSocket connection
     session_history = []
+    session_id = uuid4().hex[:12]
     
-    # Track processed turns to prevent duplicates (normalize case and whitespace)
-    processed_turns = set()
-    last_turn_time = 0
-
     # Initialize AssemblyAI StreamingClient
     client = StreamingClient(
         StreamingClientOptions(
@@ -175,8 +179,9 @@ async def websocket_audio_streaming(websocket: WebSocket):
     async def process_llm_with_murf_and_stream_audio(transcript_text: str):
         """Process LLM streaming response with Murf integration and stream audio to client"""
         nonlocal session_history
+        timeline = TurnTimeline(session_id, transcript_text)
         try:
-            llm_response_text, updated_history, audio_chunks = await llm.get_llm_streaming_response_with_murf(transcript_text, session_history)
+            llm_response_text, updated_history, audio_chunks = await llm.get_llm_streaming_response_with_murf(transcript_text, session_history, timeline)
             session_history = updated_history
             print()  # New line after streaming response
             print(f"\nReceived {len(audio_chunks)} audio chunks from Murf")
@@ -193,6 +198,9 @@ async def websocket_audio_streaming(websocket: WebSocket):
                             "audio_data": chunk,
                             "is_final": i == len(audio_chunks) - 1
                         }))
+                        if i == 0:
+                            timeline.mark("first_audio_sent")
+                        timeline.add_bytes("sent", len(chunk))
                         print(f"Sent audio chunk {i + 1}/{len(audio_chunks)} to client")
                     except Exception as chunk_error:
                         print(f"Error sending audio chunk {i + 1}: {chunk_error}")
@@ -205,6 +213,7 @@ async def websocket_audio_streaming(websocket: WebSocket):
                         "message": "Audio streaming completed",
                         "total_chunks": len(audio_chunks)
                     }))
+                    timeline.mark("audio_complete", chunks=len(audio_chunks))
                     print("Audio streaming completed")
                 except Exception as complete_error:
                     print(f"Error sending completion message: {complete_error}")
@@ -213,6 +222,7 @@ async def websocket_audio_streaming(websocket: WebSocket):
                 
         except Exception as e:
             print(f"\nError in LLM/Murf integration: {e}")
+            timeline.mark("error", message=str(e)[:200])
             try:
                 await websocket.send_text(json.dumps({
                     "type": "error",
@@ -220,6 +230,8 @@ async def websocket_audio_streaming(websocket: WebSocket):
                 }))
             except:
                 pass
+        finally:
+            timeline.write()
 
     def process_llm_with_murf_sync(transcript_text: str):
         """Synchronous wrapper that runs async function in new event loop"""
@@ -242,45 +254,33 @@ async def websocket_audio_streaming(websocket: WebSocket):
         print("Transcription session started")
 
     def on_turn(self: Type[StreamingClient], event: TurnEvent):
-        nonlocal processed_turns, last_turn_time
-        transcript_text = event.transcript.strip()
-        current_time = time.time()
-        
-        # Normalize transcript for duplicate detection (lowercase, remove extra spaces)
-        normalized_transcript = ' '.join(transcript_text.lower().split())
+        # The endpointer dedupes turns and checks local silence before calling on_turn_end
+        endpointer.on_turn(event)
+
+    def on_turn_end(transcript_text: str):
+        print(f"\nUser: {transcript_text}")
         
-        # Only process end-of-turn events, avoid duplicates, and prevent rapid-fire duplicates
-        if (event.end_of_turn and 
-            transcript_text and 
-            len(transcript_text) > 3 and  # Ignore very short transcripts
-            normalized_transcript not in processed_turns and
-            current_time - last_turn_time > 2.0):  # Increase to 2 seconds between turns
+        # Put final transcription in queue for async sending
+        try:
+            enqueue_message({
+                "type": "transcription",
+                "text": transcript_text,
+                "is_final": True,
+                "end_of_turn": True
+            })
             
-            processed_turns.add(normalized_transcript)
-            last_turn_time = current_time
-            print(f"\nUser: {transcript_text}")
+            # Send explicit end-of-turn notification
+            enqueue_message({
+                "type": "turn_end",
+                "message": "User stopped talking"
+            })
             
-            # Put final transcription in queue for async sending
-            try:
-                transcription_queue.put_nowait({
-                    "type": "transcription",
-                    "text": transcript_text,
-                    "is_final": True,
-                    "end_of_turn": True
-                })
-                
-                # Send explicit end-of-turn notification
-                transcription_queue.put_nowait({
-                    "type": "turn_end",
-                    "message": "User stopped talking"
-                })
-                
-                # Process LLM streaming response with Murf integration and stream audio
-                print("Assistant: ", end="", flush=True)
-                process_llm_with_murf_sync(transcript_text)
-                
-            except asyncio.QueueFull:
-                print("Transcription queue is full")
+            # Process LLM streaming response with Murf integration and stream audio
+            print("Assistant: ", end="", flush=True)
+            process_llm_with_murf_sync(transcript_text)
+            
+        except asyncio.QueueFull:
+            print("Transcription queue is full")
 
     def on_terminated(self: Type[StreamingClient], event: TerminationEvent):
         print(f"Session ended - {event.audio_duration_seconds:.1f}s processed")
@@ -288,13 +288,21 @@ async def websocket_audio_streaming(websocket: WebSocket):
     def on_error(self: Type[StreamingClient], error: StreamingError):
         print(f"Transcription error: {error}")
         try:
-            transcription_queue.put_nowait({
+            enqueue_message({
                 "type": "error",
                 "message": f"Transcription error: {error}"
             })
         except asyncio.QueueFull:
             pass
 
+    # Turn detection for this session. Clients can tune AssemblyAI's parameters
+    # with query arguments (/ws?max_turn_silence=1000) or an "endpointing" message.
+    endpointer = endpointing.Endpointer(
+        on_turn_end=on_turn_end,
+        params=endpointing.session_parameters(websocket.query_params),
+        update_params=lambda params: client.set_params(StreamingSessionParameters(**params)),
+    )
+
     # Register event handlers
     client.on(StreamingEvents.Begin, on_begin)
     client.on(StreamingEvents.Turn, on_turn)
@@ -305,11 +313,9 @@ async def websocket_audio_streaming(websocket: WebSocket):
     async def send_transcriptions():
         while True:
             try:
-                message = await asyncio.wait_for(transcription_queue.get(), timeout=0.1)
+                message = await transcription_queue.get()
                 await websocket.send_text(json.dumps(message))
                 transcription_queue.task_done()
-            except asyncio.TimeoutError:
-                continue
             except Exception:
                 break
 
@@ -323,6 +329,7 @@ async def websocket_audio_streaming(websocket: WebSocket):
                 sample_rate=16000,
                 format_turns=True,
                 enable_extra_session_information=True,
+                **endpointer.params,
             )
         )
         
@@ -341,11 +348,23 @@ async def websocket_audio_streaming(websocket: WebSocket):
                     pcm_data = message["bytes"]
                     f.write(pcm_data)  # Save to file for debugging
                     client.stream(pcm_data)  # Send to AssemblyAI for transcription
+                    endpointer.observe_audio(pcm_data)  # Local VAD for end-of-turn silence
                     
                 elif message.get("text") == "EOF":
                     print("Recording finished")
                     break
 
+                elif message.get("text"):
+                    try:
+                        control = json.loads(message["text"])
+                    except ValueError:
+                        continue
+                    if isinstance(control, dict) and control.get("type") == "endpointing":
+                        # Retune turn detection mid-session
+                        params = endpointing.session_parameters({**endpointer.params, **control})
+                        endpointer.params.update(params)
+                        client.set_params(StreamingSessionParameters(**params))
+
     except WebSocketDisconnect:
         print("Client disconnected")
     except Exception as e:
@@ -0,0 +1,235 @@
+# services/endpointing.py
+import os
+import math
+import time
+import logging
+import operator
+import threading
+from array import array
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# AssemblyAI turn detection, used for every session unless the client overrides it
+AAI_END_OF_TURN_CONFIDENCE_THRESHOLD = float(os.getenv("AAI_END_OF_TURN_CONFIDENCE_THRESHOLD", "0.4"))
+AAI_MIN_END_OF_TURN_SILENCE_WHEN_CONFIDENT = int(os.getenv("AAI_MIN_END_OF_TURN_SILENCE_WHEN_CONFIDENT", "400"))
+AAI_MAX_TURN_SILENCE = int(os.getenv("AAI_MAX_TURN_SILENCE", "1280"))
+
+# Local silence (ms) that must follow the last speech before an AssemblyAI end of turn is accepted
+ENDPOINT_SILENCE_MS = int(os.getenv("ENDPOINT_SILENCE_MS", "400"))
+# Learn the silence threshold from each user's pauses inside their turns
+ENDPOINT_ADAPTIVE = os.getenv("ENDPOINT_ADAPTIVE", "1") == "1"
+ENDPOINT_MIN_SILENCE_MS = int(os.getenv("ENDPOINT_MIN_SILENCE_MS", "200"))
+ENDPOINT_MAX_SILENCE_MS = int(os.getenv("ENDPOINT_MAX_SILENCE_MS", "1500"))
+# The same turn (or, without a turn number, the same words) is only handled once within this window
+ENDPOINT_DEDUPE_WINDOW_SECONDS = float(os.getenv("ENDPOINT_DEDUPE_WINDOW_SECONDS", "10"))
+ENDPOINT_DEDUPE_MAX = 64
+
+# Energy VAD: a 20 ms frame is speech when its RMS clears both the floor and
+# VAD_RATIO times the running noise estimate
+VAD_FRAME_MS = 20
+VAD_MIN_RMS = float(os.getenv("VAD_MIN_RMS", "400"))
+VAD_RATIO = float(os.getenv("VAD_RATIO", "3.0"))
+# Gaps shorter than this are part of a word, not a pause
+MIN_PAUSE_MS = 120
+PAUSE_HISTORY = 50
+PAUSE_PERCENTILE = 90
+PAUSE_MARGIN_MS = 100
+
+FILLER_WORDS = frozenset({"um", "uh", "umm", "uhh", "er", "erm", "hmm", "mm", "mhm", "ah"})
+
+_PARAMETER_TYPES = {
+    "end_of_turn_confidence_threshold": float,
+    "min_end_of_turn_silence_when_confident": int,
+    "max_turn_silence": int,
+}
+
+
+def session_parameters(overrides: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+    """
+    AssemblyAI turn detection parameters for one session: the defaults above,
+    with any of the three parameters overridden by the client (for example
+    from `/ws?max_turn_silence=1000`). Invalid values are ignored.
+    """
+    params: Dict[str, Any] = {
+        "end_of_turn_confidence_threshold": AAI_END_OF_TURN_CONFIDENCE_THRESHOLD,
+        "min_end_of_turn_silence_when_confident": AAI_MIN_END_OF_TURN_SILENCE_WHEN_CONFIDENT,
+        "max_turn_silence": AAI_MAX_TURN_SILENCE,
+    }
+    for name, cast in _PARAMETER_TYPES.items():
+        if overrides is None or overrides.get(name) in (None, ""):
+            continue
+        try:
+            params[name] = cast(overrides[name])
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring invalid {name}={overrides[name]!r}")
+    return params
+
+
+def normalize_transcript(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class RecentTurns:
+    """Keys seen in the last `window` seconds, holding at most `maxlen` of them."""
+
+    def __init__(self, window: float = ENDPOINT_DEDUPE_WINDOW_SECONDS, maxlen: int = ENDPOINT_DEDUPE_MAX):
+        self.window = window
+        self._entries: Deque[Tuple[float, Any]] = deque(maxlen=maxlen)
+
+    def seen(self, key: Any) -> bool:
+        """True when `key` was added within the window; otherwise adds it."""
+        now = time.monotonic()
+        while self._entries and now - self._entries[0][0] > self.window:
+            self._entries.popleft()
+        if any(existing == key for _, existing in self._entries):
+            return True
+        self._entries.append((now, key))
+        return False
+
+
+class Endpointer:
+    """
+    Decides when a user's turn is finished.
+
+    AssemblyAI's `end_of_turn` proposes the end of a turn. The local energy
+    VAD then checks how long the user has actually been silent. When the
+    silence is shorter than the threshold, the turn is held. If AssemblyAI
+    ends another turn first, the held text is joined to it. Otherwise the
+    audio path confirms the held turn once the threshold is reached. With
+    `adaptive`, the threshold follows the user's own pauses inside their
+    turns. AssemblyAI's confident-silence setting is kept in step through
+    `update_params`.
+
+    `on_turn_end(text)` runs on AssemblyAI's callback thread for a turn
+    accepted straight away. A turn confirmed by the audio path gets a new
+    thread, so the receive loop is never blocked.
+    """
+
+    def __init__(
+        self,
+        on_turn_end: Callable[[str], None],
+        params: Optional[Dict[str, Any]] = None,
+        update_params: Optional[Callable[[Dict[str, Any]], None]] = None,
+        sample_rate: int = 16000,
+        silence_ms: int = ENDPOINT_SILENCE_MS,
+        adaptive: bool = ENDPOINT_ADAPTIVE,
+    ):
+        self.on_turn_end = on_turn_end
+        self.params = params or session_parameters()
+        self.update_params = update_params
+        self.sample_rate = sample_rate
+        self.silence_ms = silence_ms
+        self.adaptive = adaptive
+        self.recent = RecentTurns()
+        self.pauses: Deque[float] = deque(maxlen=PAUSE_HISTORY)
+
+        self._lock = threading.Lock()
+        self._frame_samples = sample_rate * VAD_FRAME_MS // 1000
+        self._remainder = b""
+        self._noise_rms = VAD_MIN_RMS / VAD_RATIO
+        self._silence_ms = 0.0         # silence since the last speech frame
+        self._heard_speech = False
+        self._committed_since_speech = False
+        self._held: Optional[str] = None
+        self._held_resumed = False     # the user spoke again after the turn was held
+
+    # Audio path -----------------------------------------------------------
+
+    def observe_audio(self, pcm: bytes):
+        """Runs the VAD over 16-bit mono PCM and confirms a held turn once the user is quiet."""
+        data = self._remainder + pcm
+        frame_bytes = self._frame_samples * 2
+        usable = len(data) - len(data) % frame_bytes
+        self._remainder = data[usable:]
+        if not usable:
+            return
+        samples = array("h", data[:usable])
+        confirmed = None
+        with self._lock:
+            for start in range(0, len(samples), self._frame_samples):
+                frame = samples[start:start + self._frame_samples]
+                rms = math.sqrt(sum(map(operator.mul, frame, frame)) / len(frame))
+                self._observe_frame(rms)
+            if self._held is not None and self._silence_ms >= self._hold_limit_ms():
+                confirmed, self._held = self._held, None
+                self._committed_since_speech = True
+        if confirmed:
+            logger.info(f"Turn confirmed after {self._silence_ms:.0f} ms of silence")
+            threading.Thread(target=self._finish, args=(confirmed,), daemon=True).start()
+
+    def _observe_frame(self, rms: float):
+        if rms >= max(VAD_MIN_RMS, self._noise_rms * VAD_RATIO):
+            pause = self._silence_ms
+            if self._heard_speech and not self._committed_since_speech and pause >= MIN_PAUSE_MS:
+                self.pauses.append(pause)
+            if self._held is not None and pause >= MIN_PAUSE_MS:
+                self._held_resumed = True
+            self._heard_speech = True
+            self._committed_since_speech = False
+            self._silence_ms = 0.0
+        else:
+            # Track the background level on quiet frames only
+            self._noise_rms += (rms - self._noise_rms) * 0.05
+            self._silence_ms += VAD_FRAME_MS
+
+    def _hold_limit_ms(self) -> float:
+        if self._held_resumed:
+            # The user went on talking; AssemblyAI should end that turn, so
+            # only give up on it well after its own maximum silence
+            return self.params["max_turn_silence"] + 500
+        return self.threshold_ms()
+
+    # STT path -------------------------------------------------------------
+
+    def threshold_ms(self) -> float:
+        """Silence that ends a turn: learned from the user's pauses once there are enough of them."""
+        if not self.adaptive or len(self.pauses) < 5:
+            return self.silence_ms
+        ordered = sorted(self.pauses)
+        rank = max(1, math.ceil(PAUSE_PERCENTILE / 100 * len(ordered)))
+        learned = ordered[rank - 1] + PAUSE_MARGIN_MS
+        return min(ENDPOINT_MAX_SILENCE_MS, max(ENDPOINT_MIN_SILENCE_MS, learned))
+
+    def on_turn(self, event: Any):
+        """Feeds an AssemblyAI TurnEvent; partial transcripts are ignored."""
+        text = (event.transcript or "").strip()
+        if not event.end_of_turn or not text:
+            return
+        turn_order = getattr(event, "turn_order", None)
+        key = ("turn", turn_order) if turn_order is not None else ("text", normalize_transcript(text))
+        if self.recent.seen(key):
+            return
+        if all(word.strip(".,?!") in FILLER_WORDS for word in normalize_transcript(text).split()):
+            return
+
+        with self._lock:
+            if self._held is not None:
+                text = f"{self._held} {text}"
+                self._held = None
+            if self._heard_speech and self._silence_ms < self.threshold_ms():
+                # The VAD still hears the user, or heard them too recently
+                self._held = text
+                self._held_resumed = False
+                logger.info(f"Holding turn: {self._silence_ms:.0f} ms of silence < {self.threshold_ms():.0f} ms")
+                return
+            self._committed_since_speech = True
+        self._finish(text)
+
+    def _finish(self, text: str):
+        self.on_turn_end(text)
+        self._adapt_params()
+
+    def _adapt_params(self):
+        """Moves AssemblyAI's confident-silence setting toward the learned threshold."""
+        if not self.adaptive or self.update_params is None or len(self.pauses) < 5:
+            return
+        target = int(self.threshold_ms())
+        if abs(target - self.params["min_end_of_turn_silence_when_confident"]) < 80:
+            return
+        self.params["min_end_of_turn_silence_when_confident"] = target
+        try:
+            self.update_params({"min_end_of_turn_silence_when_confident": target})
+        except Exception as e:
+            logger.warning(f"Could not update turn detection: {e}")
@@ -7,7 +7,9 @@ import asyncio
 import re
 import logging
 import os
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
+
+from services.timeline import TurnTimeline
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -30,7 +32,7 @@ def get_llm_response(user_query: str, history: List[Dict[str, Any]]) -> Tuple[st
     response = chat.send_message(user_query)
     return response.text, chat.history
 
-async def receive_loop(ws):
+async def receive_loop(ws, timeline: Optional[TurnTimeline] = None):
     """Receive audio chunks from Murf WebSocket"""
     audio_chunks = []
     chunk_count = 1
@@ -48,9 +50,15 @@ async def receive_loop(ws):
                     truncated_chunk = base64_chunk
                 print(f"[murf ai][chunk {chunk_count}] {truncated_chunk}")
                 audio_chunks.append(base64_chunk)
+                if timeline is not None:
+                    if chunk_count == 1:
+                        timeline.mark("murf_first_chunk")
+                    timeline.add_bytes("audio_b64", len(base64_chunk))
                 chunk_count += 1
             
             if data.get("final"):
+                if timeline is not None:
+                    timeline.mark("murf_final", chunks=len(audio_chunks))
                 logger.info("Murf confirms final audio chunk received.")
                 break
     except websockets.exceptions.ConnectionClosed:
@@ -78,10 +86,11 @@ def get_llm_streaming_response(user_query: str, history: List[Dict[str, Any]]) -
     
     return accumulated_response, chat.history
 
-async def get_llm_streaming_response_with_murf(user_query: str, history: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]], List[str]]:
+async def get_llm_streaming_response_with_murf(user_query: str, history: List[Dict[str, Any]], timeline: Optional[TurnTimeline] = None) -> Tuple[str, List[Dict[str, Any]], List[str]]:
     """
     Gets a streaming response from Gemini LLM, sends sentences to Murf via WebSocket,
     and returns the text response, updated history, and audio chunks.
+    When a timeline is given, first token, sentence boundaries and Murf audio are marked on it.
     """
     if not GEMINI_API_KEY:
         raise ValueError("Gemini API key is missing.")
@@ -101,6 +110,8 @@ async def get_llm_streaming_response_with_murf(user_query: str, history: List[Di
         )
         
         async with websockets.connect(uri) as ws:
+            if timeline is not None:
+                timeline.mark("murf_connected")
             # Send voice configuration
             voice_config = {
                 "context_id": context_id,
@@ -112,7 +123,7 @@ async def get_llm_streaming_response_with_murf(user_query: str, history: List[Di
             await ws.send(json.dumps(voice_config))
             
             # Start the audio receiver task
-            receiver_task = asyncio.create_task(receive_loop(ws))
+            receiver_task = asyncio.create_task(receive_loop(ws, timeline))
             
             # Generate streaming response from Gemini
             model = genai.GenerativeModel('gemini-1.5-flash')
@@ -125,6 +136,8 @@ async def get_llm_streaming_response_with_murf(user_query: str, history: List[Di
             print("\nGEMINI STREAMING RESPONSE \n")
             for chunk in stream:
                 if chunk.text:
+                    if timeline is not None and not accumulated_response:
+                        timeline.mark("llm_first_token")
                     accumulated_response += chunk.text
                     sentence_buffer += chunk.text
                     print(chunk.text, end="", flush=True)
@@ -136,6 +149,8 @@ async def get_llm_streaming_response_with_murf(user_query: str, history: List[Di
                         # Send complete sentences to Murf
                         for sentence in sentences[:-1]:
                             if sentence.strip():
+                                if timeline is not None:
+                                    timeline.sentence(sentence.strip())
                                 text_msg = {
                                     "context_id": context_id,
                                     "text": sentence.strip(),
@@ -146,6 +161,8 @@ async def get_llm_streaming_response_with_murf(user_query: str, history: List[Di
 
             # Send final sentence buffer if any
             if sentence_buffer.strip():
+                if timeline is not None:
+                    timeline.sentence(sentence_buffer.strip())
                 text_msg = {
                     "context_id": context_id,
                     "text": sentence_buffer.strip(),
@@ -154,6 +171,8 @@ async def get_llm_streaming_response_with_murf(user_query: str, history: List[Di
                 await ws.send(json.dumps(text_msg))
 
             print("\nEND OF GEMINI STREAM\n")
+            if timeline is not None:
+                timeline.mark("llm_done", chars=len(accumulated_response))
 
             # Wait for all audio chunks from Murf
             audio_chunks = await receiver_task
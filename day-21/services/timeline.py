@@ -0,0 +1,103 @@
+# services/timeline.py
+import os
+import json
+import time
+import uuid
+import queue
+import atexit
+import logging
+import logging.handlers
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# JSONL file for per-turn timelines; recording is off when unset
+TIMELINE_PATH = os.getenv("TIMELINE_PATH")
+TIMELINE_MAX_BYTES = int(os.getenv("TIMELINE_MAX_BYTES", str(20 * 1024 * 1024)))
+TIMELINE_BACKUPS = int(os.getenv("TIMELINE_BACKUPS", "5"))
+
+_writer: Optional[logging.Logger] = None
+
+
+def _get_writer() -> Optional[logging.Logger]:
+    """
+    A logger whose records go through a queue to a RotatingFileHandler on a
+    background thread, so writing a timeline never blocks the caller.
+    """
+    global _writer
+    if _writer is None and TIMELINE_PATH:
+        Path(TIMELINE_PATH).parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            TIMELINE_PATH, maxBytes=TIMELINE_MAX_BYTES, backupCount=TIMELINE_BACKUPS, encoding="utf-8"
+        )
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        records = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(records, file_handler)
+        listener.start()
+        atexit.register(listener.stop)
+
+        writer = logging.getLogger("voice.timeline")
+        writer.propagate = False
+        writer.setLevel(logging.INFO)
+        writer.addHandler(logging.handlers.QueueHandler(records))
+        _writer = writer
+    return _writer
+
+
+class TurnTimeline:
+    """
+    Monotonic event timestamps for one turn, in ms since the turn started,
+    plus byte counts and sentence boundaries.
+    """
+
+    def __init__(self, session_id: str = "", text: str = ""):
+        self.turn_id = uuid.uuid4().hex[:12]
+        self.session_id = session_id
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.text_chars = len(text)
+        self.events: List[list] = []
+        self.bytes: Dict[str, int] = {}
+        self.sentences: List[Dict[str, Any]] = []
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self._start) * 1000, 1)
+
+    def mark(self, event: str, **data: Any) -> float:
+        """Records an event; extra keyword data is stored alongside it."""
+        ms = self.elapsed_ms()
+        self.events.append([event, ms, data] if data else [event, ms])
+        return ms
+
+    def first(self, event: str) -> Optional[float]:
+        """Time of the first occurrence of an event, if it happened."""
+        for entry in self.events:
+            if entry[0] == event:
+                return entry[1]
+        return None
+
+    def add_bytes(self, kind: str, count: int):
+        self.bytes[kind] = self.bytes.get(kind, 0) + count
+
+    def sentence(self, text: str) -> Dict[str, Any]:
+        """Opens a sentence boundary; callers fill in its timing fields."""
+        entry = {"index": len(self.sentences), "chars": len(text), "start_ms": self.elapsed_ms()}
+        self.sentences.append(entry)
+        return entry
+
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            "turn_id": self.turn_id,
+            "session_id": self.session_id,
+            "started_at": round(self.started_at, 3),
+            "total_ms": self.elapsed_ms(),
+            "text_chars": self.text_chars,
+            "events": self.events,
+            "bytes": self.bytes,
+            "sentences": self.sentences,
+        }
+
+    def write(self):
+        """Queues the record for the background writer (no-op when disabled)."""
+        writer = _get_writer()
+        if writer is not None:
+            writer.info(json.dumps(self.to_record(), separators=(",", ":")))
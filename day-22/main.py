@@ -5,10 +5,13 @@ from fastapi.templating import Jinja2Templates
 import logging
 import asyncio
 import base64
+import itertools
 
 # Import services and config
 import config
 from services import stt, llm, tts
+from services.segmenter import SentenceSegmenter
+from services.speech_text import SPEECH_NORMALIZE, SpeechNormalizer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -32,13 +35,18 @@ async def llm_tts_pipeline(text: str, websocket: WebSocket):
     """
     tts_queue = asyncio.Queue()
 
-    # Task to stream LLM text and push it to the TTS queue
+    # Task to stream LLM text and push speakable sentences to the TTS queue
     async def llm_worker():
+        normalizer = SpeechNormalizer() if SPEECH_NORMALIZE else None
+        segmenter = SentenceSegmenter(normalize=normalizer and normalizer.normalize)
         try:
             async for chunk in llm.stream_llm_response(text):
                 if chunk:
                     await websocket.send_json({"type": "llm", "text": chunk})
-                    await tts_queue.put(chunk)
+                    for sentence in segmenter.feed(chunk):
+                        await tts_queue.put(sentence)
+            for sentence in segmenter.flush():
+                await tts_queue.put(sentence)
         finally:
             await tts_queue.put(None)  # Signal that LLM is done
 
@@ -74,16 +82,34 @@ async def websocket_endpoint(websocket: WebSocket):
     # Get the current asyncio event loop
     loop = asyncio.get_event_loop()
 
+    # Numbers this session's turns, so formatted text reaches the right message
+    turn_ids = itertools.count(1)
+
     # Callback function for when final transcription is received
-    def on_final_transcript(text: str):
+    def on_final_transcript(text: str) -> int:
         logging.info(f"Final transcript received: {text}")
+        turn_id = next(turn_ids)
         # Use run_coroutine_threadsafe to schedule the coroutine from the callback thread
+        asyncio.run_coroutine_threadsafe(
+            websocket.send_json({"type": "final", "text": text, "turn_id": turn_id}), loop
+        )
         asyncio.run_coroutine_threadsafe(
             llm_tts_pipeline(text, websocket), loop
         )
+        return turn_id
+
+    def on_formatted_transcript(text: str, turn_id: int):
+        # Display only: the LLM already has the raw transcript
+        if turn_id:
+            asyncio.run_coroutine_threadsafe(
+                websocket.send_json({"type": "final_patch", "text": text, "turn_id": turn_id}), loop
+            )
 
     # Initialize the streaming transcriber
-    transcriber = stt.AssemblyAIStreamingTranscriber(on_final_callback=on_final_transcript)
+    transcriber = stt.AssemblyAIStreamingTranscriber(
+        on_final_callback=on_final_transcript,
+        on_formatted_callback=on_formatted_transcript,
+    )
 
     try:
         while True:
@@ -1,28 +1,32 @@
 # services/llm.py
 
-import google.generativeai as genai
-from google.generativeai import types
 import websockets
 import json
 import asyncio
-import re
 import logging
 import os
 from typing import List, Dict, Any, Tuple
 
+from services.segmenter import SentenceSegmenter
+from services.speech_text import SPEECH_NORMALIZE, SpeechNormalizer
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 MURF_API_KEY = os.getenv("MURF_API_KEY")
 
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-else:
-    print("Warning: GEMINI_API_KEY not found in .env file.")
+_genai = None
+
 
-if not MURF_API_KEY:
-    print("Warning: MURF_API_KEY not found in .env file.")
+def configure_gemini():
+    """Imports and configures the Gemini SDK on first use, and returns it."""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        genai.configure(api_key=GEMINI_API_KEY)
+        _genai = genai
+    return _genai
 
 system_instructions = """
 You are NEXUS, my personal voice AI assistant.
@@ -43,12 +47,13 @@ async def stream_llm_response(prompt: str):
     The Google GenAI streaming client is synchronous, but yielding from
     inside an async generator is fine for our usage.
     """
+    genai = configure_gemini()
     client = genai.GenerativeModel('gemini-1.5-flash')
 
     stream = client.generate_content(
         contents=prompt,
         stream=True,
-        generation_config=types.GenerationConfig(
+        generation_config=genai.types.GenerationConfig(
             candidate_count=1,
             stop_sequences=[],
             max_output_tokens=8192,
@@ -65,7 +70,7 @@ async def stream_llm_response(prompt: str):
 
 def get_llm_response(user_query: str, history: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
     """Gets a response from the Gemini LLM and updates chat history."""
-    model = genai.GenerativeModel('gemini-1.5-flash')
+    model = configure_gemini().GenerativeModel('gemini-1.5-flash')
     chat = model.start_chat(history=history)
     response = chat.send_message(user_query)
     return response.text, chat.history
@@ -103,7 +108,7 @@ async def receive_loop(ws):
 
 def get_llm_streaming_response(user_query: str, history: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
     """Gets a streaming response from the Gemini LLM, accumulates it, and returns final response with history."""
-    model = genai.GenerativeModel('gemini-1.5-flash')
+    model = configure_gemini().GenerativeModel('gemini-1.5-flash')
     chat = model.start_chat(history=history)
 
     # Generate streaming response
@@ -131,6 +136,7 @@ async def get_llm_streaming_response_with_murf(user_query: str, history: List[Di
     if not MURF_API_KEY:
         raise ValueError("Murf API key is missing.")
 
+    genai = configure_gemini()
     context_id = "day20-static-context"  # Static context_id for Murf to avoid context limit errors
 
     try:
@@ -162,39 +168,37 @@ async def get_llm_streaming_response_with_murf(user_query: str, history: List[Di
             chat = model.start_chat(history=history)
             stream = chat.send_message(user_query, stream=True)
 
-            sentence_buffer = ""
+            # Sentences reach Murf as plain speakable text, without markdown
+            normalizer = SpeechNormalizer() if SPEECH_NORMALIZE else None
+            segmenter = SentenceSegmenter(normalize=normalizer and normalizer.normalize)
             accumulated_response = ""
 
             print("\nGEMINI STREAMING RESPONSE \n")
             for chunk in stream:
                 if chunk.text:
                     accumulated_response += chunk.text
-                    sentence_buffer += chunk.text
                     print(chunk.text, end="", flush=True)
 
-                    # Split into sentences using regex
-                    sentences = re.split(r'(?<=[.?!])\s+', sentence_buffer)
-
-                    if len(sentences) > 1:
-                        # Send complete sentences to Murf
-                        for sentence in sentences[:-1]:
-                            if sentence.strip():
-                                text_msg = {
-                                    "context_id": context_id,
-                                    "text": sentence.strip(),
-                                    "end": False
-                                }
-                                await ws.send(json.dumps(text_msg))
-                        sentence_buffer = sentences[-1]
-
-            # Send final sentence buffer if any
-            if sentence_buffer.strip():
+                    # Send complete sentences to Murf as soon as they are known
+                    for sentence in segmenter.feed(chunk.text):
+                        text_msg = {
+                            "context_id": context_id,
+                            "text": sentence,
+                            "end": False
+                        }
+                        await ws.send(json.dumps(text_msg))
+
+            # Send what is left, then always close the context: a reply that
+            # ends on a sentence boundary leaves nothing to flush, and
+            # receive_loop waits for Murf's final message
+            for sentence in segmenter.flush():
                 text_msg = {
                     "context_id": context_id,
-                    "text": sentence_buffer.strip(),
-                    "end": True
+                    "text": sentence,
+                    "end": False
                 }
                 await ws.send(json.dumps(text_msg))
+            await ws.send(json.dumps({"context_id": context_id, "end": True}))
 
             print("\nEND OF GEMINI STREAM\n")
 
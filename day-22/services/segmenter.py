@@ -0,0 +1,203 @@
+# services/segmenter.py
+import os
+import re
+from typing import Callable, List, Optional
+
+# Chunks shorter than this are merged with the next sentence before they go to TTS
+SEGMENT_MIN_CHARS = int(os.getenv("SEGMENT_MIN_CHARS", "40"))
+# Sentences longer than this are split at a clause boundary (or a space)
+SEGMENT_MAX_CHARS = int(os.getenv("SEGMENT_MAX_CHARS", "200"))
+# The first chunk is cut sooner so synthesis can start while the LLM is still writing
+SEGMENT_FIRST_MAX_CHARS = int(os.getenv("SEGMENT_FIRST_MAX_CHARS", "80"))
+
+# Words that end in a period without ending the sentence ("Dr. Smith", "e.g. this")
+ABBREVIATIONS = frozenset(
+    "mr mrs ms dr prof sr jr mt ave vs etc eg ie cf al approx dept "
+    "fig inc ltd corp vol ca jan feb mar apr jun jul aug sep sept oct nov dec".split()
+)
+# Ordinary words that are also abbreviations ("call us.", "at 9 am."): only
+# taken as abbreviations before a number ("No. 5"), or written with dots ("a.m.")
+AMBIGUOUS_ABBREVIATIONS = frozenset("am pm us uk no st co min max est".split())
+
+_TERMINATORS = ".?!…"
+_CLOSERS = "\"')]*_”’"
+_CANDIDATE = re.compile(r"[.?!…\n]")
+# Places a long sentence can be cut without breaking a phrase
+_CLAUSE = re.compile(r"[,;:)]\s|\s[-–—]\s|—")
+
+
+class SentenceSegmenter:
+    """
+    Splits streamed LLM text into chunks for TTS.
+
+    `feed()` returns the chunks completed by the new text and `flush()` the
+    rest once the stream ends. Only unscanned characters are searched on each
+    call, so the cost is linear in the length of the reply.
+
+    The first sentence goes out as soon as it is complete. Later sentences
+    are merged until they reach `min_chars`, and any sentence longer than
+    `max_chars` (`first_max_chars` for the first chunk) is cut at a clause.
+    `normalize`, when given, rewrites each sentence before it is merged, and
+    sentences it empties are dropped.
+    """
+
+    def __init__(
+        self,
+        min_chars: int = SEGMENT_MIN_CHARS,
+        max_chars: int = SEGMENT_MAX_CHARS,
+        first_max_chars: int = SEGMENT_FIRST_MAX_CHARS,
+        normalize: Optional[Callable[[str], str]] = None,
+    ):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.first_max_chars = first_max_chars
+        self.normalize = normalize
+        self._buffer = ""   # text of the sentence in progress
+        self._pos = 0       # first character of the buffer not yet scanned
+        self._held = ""     # complete sentences waiting to reach min_chars
+        self.chunks = 0     # chunks emitted so far
+
+    def feed(self, text: str) -> List[str]:
+        out: List[str] = []
+        self._buffer += text
+        while True:
+            match = _CANDIDATE.search(self._buffer, self._pos)
+            if match is None:
+                self._pos = len(self._buffer)
+                break
+            end = self._boundary_end(match.start())
+            if end < 0:
+                # Need to see what follows before deciding
+                self._pos = match.start()
+                break
+            if end == 0:
+                self._pos = match.start() + 1
+                continue
+            end -= self._cut_long(out, end)
+            self._add_sentence(self._buffer[:end], out)
+            self._buffer = self._buffer[end:]
+            self._pos = 0
+        self._cut_long(out)
+        return out
+
+    def flush(self) -> List[str]:
+        out: List[str] = []
+        self._cut_long(out)
+        self._add_sentence(self._buffer, out)
+        self._buffer, self._pos = "", 0
+        if self._held:
+            self._emit(self._held, out)
+        return out
+
+    def split(self, text: str) -> List[str]:
+        """Segments a complete reply."""
+        return self.feed(text) + self.flush()
+
+    def _boundary_end(self, i: int) -> int:
+        """
+        End of the sentence whose terminator is at `i`: 0 when it is not a
+        boundary, -1 when that depends on text that has not arrived yet.
+        """
+        buf, n = self._buffer, len(self._buffer)
+        ch = buf[i]
+        if ch == "\n":
+            # Lines in markdown (list items, headings, paragraphs) stand alone
+            return i + 1
+
+        j = i + 1
+        while j < n and buf[j] in _TERMINATORS:
+            j += 1
+        while j < n and buf[j] in _CLOSERS:
+            j += 1
+        if j >= n:
+            return -1
+        if not buf[j].isspace():
+            # "3.14", "example.com", "e.g.x"
+            return 0
+        if ch != ".":
+            return j
+
+        k = j
+        while k < n and buf[k] in " \t":
+            k += 1
+        if k >= n:
+            return -1
+        if buf[k].islower():
+            # "e.g. the", "... and then"
+            return 0
+        if j > i + 1 and buf[i + 1] == ".":
+            return j
+
+        start = i
+        while start > 0 and (buf[start - 1].isalpha() or buf[start - 1] == "."):
+            start -= 1
+        word = buf[start:i]
+        letters = word.replace(".", "").lower()
+        if letters in ABBREVIATIONS:
+            return 0
+        if letters in AMBIGUOUS_ABBREVIATIONS and ("." in word or buf[k].isdigit()):
+            return 0
+        if len(word) == 1 and word.isupper():
+            # An initial, as in "J. R. R. Tolkien"
+            return 0
+        if not word:
+            # "1." opening a numbered list item
+            line_start = buf.rfind("\n", 0, i) + 1
+            if buf[line_start:i].strip().isdigit():
+                return 0
+        return j
+
+    def _add_sentence(self, text: str, out: List[str]):
+        sentence = self._clean(text)
+        if not sentence:
+            return
+        if not self.chunks and not self._held:
+            self._emit(sentence, out)
+            return
+        if self._held and len(self._held) + len(sentence) >= self.max_chars:
+            self._emit(self._held, out)
+        if self._held:
+            # List items and headings carry no punctuation of their own
+            separator = " " if self._held[-1] in _TERMINATORS + ",;:" else ", "
+            self._held = self._held + separator + sentence
+        else:
+            self._held = sentence
+        if len(self._held) >= self.min_chars:
+            self._emit(self._held, out)
+
+    def _cut_long(self, out: List[str], length: int = None) -> int:
+        """
+        Emits clause-sized pieces from the front of the buffer until the first
+        `length` characters (all of it by default) fit in a chunk. Returns the
+        number of characters removed.
+        """
+        if length is None:
+            length = len(self._buffer)
+        removed = 0
+        limit = self.max_chars if self.chunks else self.first_max_chars
+        while length - removed > limit:
+            window = self._buffer[:limit]
+            cut = 0
+            for match in _CLAUSE.finditer(window):
+                cut = match.end()
+            if cut < limit // 3:
+                cut = window.rfind(" ") + 1 or limit
+            if self._held:
+                self._emit(self._held, out)
+            self._emit(self._clean(self._buffer[:cut]), out)
+            self._buffer = self._buffer[cut:]
+            self._pos = max(0, self._pos - cut)
+            removed += cut
+            limit = self.max_chars
+        return removed
+
+    def _clean(self, text: str) -> str:
+        if self.normalize is not None:
+            text = self.normalize(text)
+        return text.strip()
+
+    def _emit(self, chunk: str, out: List[str]):
+        self._held = ""
+        if chunk:
+            out.append(chunk)
+            self.chunks += 1
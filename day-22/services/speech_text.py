@@ -0,0 +1,138 @@
+# services/speech_text.py
+import os
+import re
+from typing import List
+
+# Rewrite markdown and symbols in replies before they are synthesized
+SPEECH_NORMALIZE = os.getenv("SPEECH_NORMALIZE", "1") == "1"
+
+# Spoken in place of a fenced code block; the UI still shows the code
+CODE_PLACEHOLDER = "I've put the code on screen."
+# Spoken in place of inline code too long to read out
+SNIPPET_PLACEHOLDER = "this snippet"
+INLINE_CODE_MAX_CHARS = 40
+
+_FENCE = re.compile(r"\s*(?:```|~~~)")
+_RULE = re.compile(r"\s*(?:[-*_]\s*){3,}")
+_TABLE_SEPARATOR = re.compile(r"\|?(?:\s*:?-+:?\s*\|)+\s*:?-*:?\s*")
+# Headings, block quotes and bullets at the start of a line ("## ", "> ", "- ", "* ")
+_BLOCK_PREFIX = re.compile(r"^\s*(?:(?:#{1,6}|>|[-*+•])\s+){1,4}")
+_SPACES = re.compile(r"[ \t]{2,}")
+_SPACE_BEFORE_PUNCTUATION = re.compile(r" +(?=[,.;:?!])")
+
+# One pass over a line. Every quantifier is bounded, so a line is scanned in
+# linear time however many unmatched brackets or backticks it has.
+_INLINE = re.compile(
+    r"(?P<code>`([^`\n]{1,200})`)"
+    r"|(?P<image>!\[([^\]\n]{0,200})\]\([^)\s]{0,500}\))"
+    r"|(?P<link>\[([^\]\n]{1,200})\]\([^)\s]{0,500}\))"
+    r"|(?P<url>(?:https?://|www\.)[^\s<>()\[\]]{1,500}(?:\([^\s()]{0,100}\)[^\s<>()\[\]]{0,100})?)"
+    r"|(?P<tag></?[A-Za-z][^<>\n]{0,40}>)"
+    r"|(?P<money>([$€£])(\d[\d,]{0,20}(?:\.\d{1,2})?)(\s?(?:thousand|million|billion|trillion)\b)?)"
+    r"|(?P<abbreviation>\b[eE]\.[gG]\.|\b[iI]\.[eE]\.)"
+    r"|(?P<sharp>\b[CcFf]#(?!\w))"
+    r"|(?P<number_sign>#(?=\d))"
+    r"|(?P<markup>`+|(?<!\w)[*_]{1,3}(?=\S)|(?<=\S)[*_]{1,3}(?!\w))"
+    r"|(?P<symbol>->|=>|→|°[CF]?|[&%@=+~|<>#])"
+    r"|(?P<emoji>[\U0001F000-\U0001FAFF\u2600-\u27BF\uFE0F\u200D])"
+)
+
+_CURRENCIES = {"$": "dollars", "€": "euros", "£": "pounds"}
+_ABBREVIATIONS = {"e.g.": "for example", "i.e.": "that is"}
+_SYMBOLS = {
+    "->": " to ", "=>": " to ", "→": " to ",
+    "°": " degrees", "°C": " degrees Celsius", "°F": " degrees Fahrenheit",
+    "&": " and ", "%": " percent", "@": " at ", "=": " equals ", "+": " plus ",
+    "~": " about ", "|": ", ", "<": " less than ", ">": " greater than ", "#": "",
+}
+
+
+def _host(url: str) -> str:
+    """'https://www.example.com/a?b=c' -> 'example.com'"""
+    host = url.split("://", 1)[-1].split("/", 1)[0].split("?", 1)[0]
+    host = host[4:] if host.startswith("www.") else host
+    return host.rstrip(".,;:!?")
+
+
+def _inline(match: "re.Match") -> str:
+    kind = match.lastgroup
+    if kind == "code":
+        code = match.group(2).strip()
+        return code if len(code) <= INLINE_CODE_MAX_CHARS else SNIPPET_PLACEHOLDER
+    if kind == "image":
+        return match.group(4)
+    if kind == "link":
+        return match.group(6)
+    if kind == "url":
+        url = match.group("url")
+        # Keep sentence punctuation that ended up glued to the URL
+        tail = url[len(url.rstrip(".,;:!?")):]
+        return _host(url) + tail
+    if kind == "tag":
+        return " "
+    if kind == "money":
+        currency, amount, scale = match.group(10), match.group(11), match.group(12) or ""
+        return f"{amount}{scale} {_CURRENCIES[currency]}"
+    if kind == "abbreviation":
+        return _ABBREVIATIONS[match.group().lower()]
+    if kind == "sharp":
+        return match.group()[0].upper() + " sharp"
+    if kind == "number_sign":
+        return "number "
+    if kind in ("markup", "emoji"):
+        return ""
+    return _SYMBOLS[match.group()]
+
+
+class SpeechNormalizer:
+    """
+    Rewrites markdown-formatted LLM text as plain text to speak.
+
+    Emphasis, headings, bullets and quotes are dropped, links keep their
+    label, bare URLs shrink to their host, tables are read row by row and
+    common symbols are spelled out. A fenced code block becomes one short
+    placeholder. The fence state is kept between calls, so a streamed
+    reply can be fed a sentence at a time.
+    """
+
+    def __init__(self):
+        self.in_code = False
+
+    def normalize(self, text: str) -> str:
+        spoken: List[str] = []
+        for line in text.split("\n"):
+            line = self._line(line)
+            if line:
+                spoken.append(line)
+        return join_spoken(spoken)
+
+    def _line(self, line: str) -> str:
+        if _FENCE.match(line):
+            self.in_code = not self.in_code
+            return CODE_PLACEHOLDER if self.in_code else ""
+        if self.in_code or _RULE.fullmatch(line):
+            return ""
+        stripped = line.strip()
+        if stripped.startswith("|"):
+            if _TABLE_SEPARATOR.fullmatch(stripped):
+                return ""
+            line = ", ".join(cell.strip() for cell in stripped.strip("|").split("|") if cell.strip())
+        line = _BLOCK_PREFIX.sub("", line, count=1)
+        line = _INLINE.sub(_inline, line)
+        line = _SPACES.sub(" ", line)
+        return _SPACE_BEFORE_PUNCTUATION.sub("", line).strip()
+
+
+def join_spoken(parts: List[str]) -> str:
+    """Joins lines into one utterance, adding a comma where a line has no punctuation."""
+    text = ""
+    for part in parts:
+        if text:
+            text += " " if text[-1] in ".?!…,;:" else ", "
+        text += part
+    return text
+
+
+def normalize(text: str) -> str:
+    """Normalizes a complete piece of text on its own."""
+    return SpeechNormalizer().normalize(text)
@@ -12,6 +12,8 @@ document.addEventListener("DOMContentLoaded", () => {
     let audioQueue = [];
     let isPlaying = false;
     let assistantMessageDiv = null;
+    let lastUserMessage = null;
+    let lastUserTurnId = null;
     const BUFFER_SIZE = 2; // Wait for this many chunks before starting playback
 
     const addOrUpdateMessage = (text, type) => {
@@ -28,6 +30,7 @@ document.addEventListener("DOMContentLoaded", () => {
             messageDiv.className = 'message user';
             messageDiv.textContent = text;
             chatLog.appendChild(messageDiv);
+            lastUserMessage = messageDiv;
         }
         chatLog.scrollTop = chatLog.scrollHeight;
     };
@@ -75,6 +78,11 @@ document.addEventListener("DOMContentLoaded", () => {
                     addOrUpdateMessage(msg.text, "assistant");
                 } else if (msg.type === "final") {
                     addOrUpdateMessage(msg.text, "user");
+                    lastUserTurnId = msg.turn_id;
+                } else if (msg.type === "final_patch") {
+                    if (lastUserMessage && msg.turn_id === lastUserTurnId) {
+                        lastUserMessage.textContent = msg.text;
+                    }
                 } else if (msg.type === "audio") {
                     const audioData = Uint8Array.from(atob(msg.b64), c => c.charCodeAt(0)).buffer;
                     audioContext.decodeAudioData(audioData).then(buffer => {
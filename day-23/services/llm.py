@@ -1,5 +1,4 @@
 # services/llm.py
-import google.generativeai as genai
 import os
 from typing import List, Dict, Any, Tuple
 
@@ -9,10 +8,17 @@ logger = logging.getLogger(__name__)
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-else:
-    print("Warning: GEMINI_API_KEY not found in .env file.")
+_genai = None
+
+
+def configure_gemini():
+    """Imports and configures the Gemini SDK on first use, and returns it."""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        genai.configure(api_key=GEMINI_API_KEY)
+        _genai = genai
+    return _genai
 
 system_instructions = """
 You are NEXUS, my personal voice AI assistant.
@@ -29,7 +35,7 @@ Goal: Be a fast, reliable, and efficient assistant for everyday tasks, coding he
 def get_llm_response(user_query: str, history: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
     """Gets a response from the Gemini LLM and updates chat history."""
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash', system_instruction=system_instructions)
+        model = configure_gemini().GenerativeModel('gemini-1.5-flash', system_instruction=system_instructions)
         chat = model.start_chat(history=history)
         response = chat.send_message(user_query)
         return response.text, chat.history
@@ -1,8 +1,6 @@
 # config.py
 import os
 from dotenv import load_dotenv
-import assemblyai as aai
-import google.generativeai as genai
 import logging
 
 # Load environment variables from .env file
@@ -13,15 +11,12 @@ MURF_API_KEY = os.getenv("MURF_API_KEY")
 ASSEMBLYAI_API_KEY = os.getenv("ASSEMBLYAI_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-# Configure APIs and log warnings if keys are missing
-if ASSEMBLYAI_API_KEY:
-    aai.settings.api_key = ASSEMBLYAI_API_KEY
-else:
+# Log warnings if keys are missing. The SDKs are configured by the services
+# that use them, so importing config stays cheap.
+if not ASSEMBLYAI_API_KEY:
     logging.warning("ASSEMBLYAI_API_KEY not found in .env file.")
 
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-else:
+if not GEMINI_API_KEY:
     logging.warning("GEMINI_API_KEY not found in .env file.")
 
 if not MURF_API_KEY:
@@ -2,7 +2,6 @@
 import requests
 from typing import List, Dict, Any
 from config import MURF_API_KEY # Import the key from config
-from murf import Murf
 from pathlib import Path
 import logging
 import os
@@ -20,6 +19,7 @@ def speak(text: str, output_file: str = "stream_output.wav"):
     """
     Convert text to speech using Murf API and save audio in uploads folder.
     """
+    from murf import Murf
     client = Murf(api_key=MURF_API_KEY)
 
     file_path = UPLOADS_DIR / output_file
@@ -5,6 +5,7 @@ from fastapi.templating import Jinja2Templates
 import logging
 import asyncio
 import base64
+import itertools
 import re
 
 # Import services and config
@@ -36,9 +37,9 @@ async def websocket_endpoint(websocket: WebSocket):
     loop = asyncio.get_event_loop()
     chat_history = []
 
-    async def handle_transcript(text: str):
+    async def handle_transcript(text: str, turn_id: int):
         """Processes the final transcript, gets LLM and TTS responses, and streams audio."""
-        await websocket.send_json({"type": "final", "text": text})
+        await websocket.send_json({"type": "final", "text": text, "turn_id": turn_id})
         try:
             # 1. Decide whether to search the web
             if llm.should_search_web(text):
@@ -72,11 +73,26 @@ async def websocket_endpoint(websocket: WebSocket):
             await websocket.send_json({"type": "llm", "text": "Sorry, I encountered an error."})
 
 
-    def on_final_transcript(text: str):
-        logging.info(f"Final transcript received: {text}")
-        asyncio.run_coroutine_threadsafe(handle_transcript(text), loop)
+    # Numbers this session's turns, so formatted text reaches the right message
+    turn_ids = itertools.count(1)
 
-    transcriber = stt.AssemblyAIStreamingTranscriber(on_final_callback=on_final_transcript)
+    def on_final_transcript(text: str) -> int:
+        logging.info(f"Final transcript received: {text}")
+        turn_id = next(turn_ids)
+        asyncio.run_coroutine_threadsafe(handle_transcript(text, turn_id), loop)
+        return turn_id
+
+    def on_formatted_transcript(text: str, turn_id: int):
+        # Display only: the LLM already has the raw transcript
+        if turn_id:
+            asyncio.run_coroutine_threadsafe(
+                websocket.send_json({"type": "final_patch", "text": text, "turn_id": turn_id}), loop
+            )
+
+    transcriber = stt.AssemblyAIStreamingTranscriber(
+        on_final_callback=on_final_transcript,
+        on_formatted_callback=on_formatted_transcript,
+    )
 
     try:
         while True:
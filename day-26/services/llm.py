@@ -1,8 +1,6 @@
 # services/llm.py
-import google.generativeai as genai
 import os
 from typing import List, Dict, Any, Tuple
-from serpapi import GoogleSearch
 
 # Configure logging
 import logging
@@ -11,10 +9,17 @@ logger = logging.getLogger(__name__)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY")
 
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-else:
-    print("Warning: GEMINI_API_KEY not found in .env file.")
+_genai = None
+
+
+def configure_gemini():
+    """Imports and configures the Gemini SDK on first use, and returns it."""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        genai.configure(api_key=GEMINI_API_KEY)
+        _genai = genai
+    return _genai
 
 system_instructions = """
 You are MARVIS (Machine-based Assistant for Research, Voice, and Interactive Services), my personal voice AI assistant, inspired by JARVIS.
@@ -35,7 +40,7 @@ def should_search_web(user_query: str) -> bool:
     Uses a lightweight LLM prompt to decide if a web search is necessary.
     """
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        model = configure_gemini().GenerativeModel('gemini-1.5-flash')
         prompt = f"Does the following query require a web search to answer accurately? Respond with only 'yes' or 'no'.\n\nQuery: '{user_query}'"
         response = model.generate_content(prompt)
         return response.text.strip().lower() == "yes"
@@ -46,7 +51,7 @@ def should_search_web(user_query: str) -> bool:
 def get_llm_response(user_query: str, history: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
     """Gets a response from the Gemini LLM and updates chat history."""
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash', system_instruction=system_instructions)
+        model = configure_gemini().GenerativeModel('gemini-1.5-flash', system_instruction=system_instructions)
         chat = model.start_chat(history=history)
         response = chat.send_message(user_query)
         return response.text, chat.history
@@ -57,6 +62,7 @@ def get_llm_response(user_query: str, history: List[Dict[str, Any]]) -> Tuple[st
 def get_web_response(user_query: str, history: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
     """Gets a response from the Gemini LLM after performing a web search."""
     try:
+        from serpapi import GoogleSearch
         params = {
             "q": user_query,
             "api_key": SERPAPI_API_KEY,
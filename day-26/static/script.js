@@ -12,6 +12,8 @@ document.addEventListener("DOMContentLoaded", () => {
     let audioQueue = [];
     let isPlaying = false;
     let assistantMessageDiv = null;
+    let lastUserMessage = null;
+    let lastUserTurnId = null;
 
     const addOrUpdateMessage = (text, type) => {
         if (type === "assistant") {
@@ -26,6 +28,7 @@ document.addEventListener("DOMContentLoaded", () => {
             messageDiv.className = 'message user';
             messageDiv.textContent = text;
             chatLog.appendChild(messageDiv);
+            lastUserMessage = messageDiv;
         }
         chatLog.scrollTop = chatLog.scrollHeight;
     };
@@ -80,6 +83,11 @@ document.addEventListener("DOMContentLoaded", () => {
                     addOrUpdateMessage(msg.text, "assistant");
                 } else if (msg.type === "final") {
                     addOrUpdateMessage(msg.text, "user");
+                    lastUserTurnId = msg.turn_id;
+                } else if (msg.type === "final_patch") {
+                    if (lastUserMessage && msg.turn_id === lastUserTurnId) {
+                        lastUserMessage.textContent = msg.text;
+                    }
                 } else if (msg.type === "audio") {
                     audioQueue.push(msg.b64);
                     if (!isPlaying) {
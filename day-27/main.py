@@ -5,6 +5,7 @@ from fastapi.templating import Jinja2Templates
 import logging
 import asyncio
 import base64
+import itertools
 import re
 import json
 
@@ -37,9 +38,9 @@ async def websocket_endpoint(websocket: WebSocket):
     chat_history = []
     api_keys = {}
 
-    async def handle_transcript(text: str):
+    async def handle_transcript(text: str, turn_id: int):
         """Processes the final transcript, gets LLM and TTS responses, and streams audio."""
-        await websocket.send_json({"type": "final", "text": text})
+        await websocket.send_json({"type": "final", "text": text, "turn_id": turn_id})
         try:
             # 1. Decide whether to search the web
             if llm.should_search_web(text, api_keys.get("gemini")):
@@ -73,9 +74,21 @@ async def websocket_endpoint(websocket: WebSocket):
             await websocket.send_json({"type": "llm", "text": "Sorry, I encountered an error."})
 
 
-    def on_final_transcript(text: str):
+    # Numbers this session's turns, so formatted text reaches the right message
+    turn_ids = itertools.count(1)
+
+    def on_final_transcript(text: str) -> int:
         logging.info(f"Final transcript received: {text}")
-        asyncio.run_coroutine_threadsafe(handle_transcript(text), loop)
+        turn_id = next(turn_ids)
+        asyncio.run_coroutine_threadsafe(handle_transcript(text, turn_id), loop)
+        return turn_id
+
+    def on_formatted_transcript(text: str, turn_id: int):
+        # Display only: the LLM already has the raw transcript
+        if turn_id:
+            asyncio.run_coroutine_threadsafe(
+                websocket.send_json({"type": "final_patch", "text": text, "turn_id": turn_id}), loop
+            )
 
     try:
         # The first message from the client should be the API keys
@@ -86,6 +99,7 @@ async def websocket_endpoint(websocket: WebSocket):
 
         transcriber = stt.AssemblyAIStreamingTranscriber(
             on_final_callback=on_final_transcript, 
+            on_formatted_callback=on_formatted_transcript,
             api_key=api_keys.get("assemblyai")
         )
 
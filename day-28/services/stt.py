@@ -1,10 +1,10 @@
 # services/stt.py
+import os
 import assemblyai as aai
 from assemblyai.streaming.v3 import (
     StreamingClient,
     StreamingClientOptions,
     StreamingParameters,
-    StreamingSessionParameters,
     StreamingEvents,
     BeginEvent,
     TurnEvent,
@@ -12,6 +12,31 @@ from assemblyai.streaming.v3 import (
     StreamingError,
 )
 
+# How a finished turn's text is formatted:
+#   local - the raw transcript goes to the LLM at once; punctuation and casing
+#           for display are added locally
+#   patch - as local, and AssemblyAI's formatted turn is requested too and
+#           passed to on_formatted_callback to correct the display
+#   wait  - the LLM waits for AssemblyAI's formatted turn (slowest)
+STT_FORMAT_TURNS = os.getenv("STT_FORMAT_TURNS", "local")
+
+_QUESTION_STARTS = frozenset(
+    "what who whom whose where when why how which is are am was were do does did "
+    "can could would will should shall may might have has had".split()
+)
+
+def format_locally(text: str) -> str:
+    """Capitalizes and punctuates a raw transcript: 'what time is it' -> 'What time is it?'"""
+    words = text.split()
+    if not words:
+        return text
+    words = ["I" + word[1:] if word == "i" or word.startswith("i'") else word for word in words]
+    formatted = " ".join(words)
+    formatted = formatted[0].upper() + formatted[1:]
+    if formatted[-1] not in ".?!":
+        formatted += "?" if words[0].lower() in _QUESTION_STARTS else "."
+    return formatted
+
 def _on_begin(client: StreamingClient, event: BeginEvent):
     print(f"AAI session started: {event.id}")
 
@@ -25,7 +50,11 @@ class AssemblyAIStreamingTranscriber:
     """
     Wrapper around AAI StreamingClient that exposes:
       - on_partial_callback(text) for interim results
-      - on_final_callback(text)   when end_of_turn=True
+      - on_final_callback(text)   once per turn, when end_of_turn=True;
+        whatever it returns identifies the turn
+      - on_formatted_callback(text, turn) with the text to display for that
+        turn, where `turn` is what on_final_callback returned for it
+        (see STT_FORMAT_TURNS)
     """
 
     def __init__(
@@ -33,10 +62,14 @@ class AssemblyAIStreamingTranscriber:
         sample_rate: int = 16000,
         on_partial_callback=None,
         on_final_callback=None,
+        on_formatted_callback=None,
         api_key: str = None
     ):
         self.on_partial_callback = on_partial_callback
         self.on_final_callback = on_final_callback
+        self.on_formatted_callback = on_formatted_callback
+        # turn_order -> on_final_callback's result, until the formatted turn arrives
+        self._turns = {}
 
         self.client = StreamingClient(
             StreamingClientOptions(
@@ -57,7 +90,8 @@ class AssemblyAIStreamingTranscriber:
         self.client.connect(
             StreamingParameters(
                 sample_rate=sample_rate,
-                format_turns=False,
+                # Set once per session; toggling it per turn doubles the end-of-turn events
+                format_turns=STT_FORMAT_TURNS in ("patch", "wait"),
             )
         )
 
@@ -66,18 +100,35 @@ class AssemblyAIStreamingTranscriber:
         if not text:
             return
 
-        if event.end_of_turn:
-            if self.on_final_callback:
-                self.on_final_callback(text)
-
-            if not event.turn_is_formatted:
-                try:
-                    client.set_params(StreamingSessionParameters(format_turns=True))
-                except Exception as set_err:
-                    print("set_params error:", set_err)
-        else:
+        if not event.end_of_turn:
             if self.on_partial_callback:
                 self.on_partial_callback(text)
+            return
+
+        # With format_turns on, each turn ends twice: unformatted, then formatted
+        if event.turn_is_formatted:
+            if STT_FORMAT_TURNS == "wait":
+                self._final(text)
+            elif self.on_formatted_callback:
+                # By turn_order: a later turn may have ended in the meantime
+                self.on_formatted_callback(text, self._turns.pop(event.turn_order, None))
+        elif STT_FORMAT_TURNS != "wait":
+            turn = self._final(text)
+            self._remember(event, turn)
+            if self.on_formatted_callback:
+                self.on_formatted_callback(format_locally(text), turn)
+
+    def _final(self, text: str):
+        if self.on_final_callback:
+            return self.on_final_callback(text)
+
+    def _remember(self, event: TurnEvent, turn):
+        if STT_FORMAT_TURNS != "patch":
+            return
+        self._turns[event.turn_order] = turn
+        # A formatted turn that never arrives must not pin its entry forever
+        while len(self._turns) > 8:
+            self._turns.pop(next(iter(self._turns)))
 
     def stream_audio(self, audio_chunk: bytes):
         self.client.stream(audio_chunk)
@@ -0,0 +1,7 @@
+# benchmarks/__init__.py
+"""
+Latency and load tooling that drives the `/ws` endpoint like the browser does.
+
+    python -m benchmarks.latency run --spawn --turns 20 --out base.json
+    python -m benchmarks.latency compare base.json new.json
+"""
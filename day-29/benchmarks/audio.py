@@ -0,0 +1,54 @@
+# benchmarks/audio.py
+import math
+import wave
+from array import array
+from typing import Iterator, List
+
+SAMPLE_RATE = 16000
+# Int16 RMS above this counts as speech (matches the AssemblyAI emulator)
+SPEECH_RMS_THRESHOLD = 500
+
+
+def load_wav(path: str) -> bytes:
+    """Reads a 16 kHz, mono, 16-bit PCM WAV file and returns the raw frames."""
+    with wave.open(path, "rb") as wav:
+        if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != (SAMPLE_RATE, 1, 2):
+            raise ValueError(f"{path}: expected 16 kHz mono 16-bit PCM")
+        return wav.readframes(wav.getnframes())
+
+
+def synthetic_utterance(seconds: float = 1.5) -> bytes:
+    """A voiced-looking tone burst for runs without recorded utterances."""
+    samples = int(seconds * SAMPLE_RATE)
+    return array("h", (int(6000 * math.sin(2 * math.pi * 180 * i / SAMPLE_RATE)) for i in range(samples))).tobytes()
+
+
+def silence(seconds: float) -> bytes:
+    return bytes(int(seconds * SAMPLE_RATE) * 2)
+
+
+def rms(chunk: bytes) -> float:
+    samples = array("h")
+    samples.frombytes(chunk[: len(chunk) - len(chunk) % 2])
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+
+def frames(pcm: bytes, frame_ms: int) -> List[bytes]:
+    size = SAMPLE_RATE * 2 * frame_ms // 1000
+    return [pcm[i:i + size] for i in range(0, len(pcm), size)]
+
+
+def last_voiced_frame(chunks: List[bytes]) -> int:
+    """Index of the last frame above the speech threshold (end of speech)."""
+    for index in range(len(chunks) - 1, -1, -1):
+        if rms(chunks[index]) >= SPEECH_RMS_THRESHOLD:
+            return index
+    return len(chunks) - 1
+
+
+def silence_frames(frame_ms: int) -> Iterator[bytes]:
+    frame = silence(frame_ms / 1000)
+    while True:
+        yield frame
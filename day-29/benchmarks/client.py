@@ -0,0 +1,132 @@
+# benchmarks/client.py
+import json
+import time
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from .audio import frames, last_voiced_frame, silence_frames
+
+# Keys are only forwarded to the (emulated) vendors
+CONFIG_MESSAGE = {"type": "config", "keys": {"murf": "bench", "assemblyai": "bench", "gemini": "bench", "serpapi": "bench"}}
+
+
+class TurnResult:
+    """Client-observed timestamps for one utterance plus the server's stage timings."""
+
+    def __init__(self):
+        self.eos_at: Optional[float] = None
+        self.final_at: Optional[float] = None
+        self.first_audio_at: Optional[float] = None
+        self.audio_messages = 0
+        self.stages: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self.completed = asyncio.Event()
+
+    def _since(self, start: Optional[float], end: Optional[float]) -> Optional[float]:
+        if start is None or end is None:
+            return None
+        return round((end - start) * 1000, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        stages = self.stages
+        llm = stages.get("llm_first_token")
+        tts = stages.get("tts_first_byte")
+        sent = stages.get("first_audio_sent")
+        return {
+            "eos_to_final_ms": self._since(self.eos_at, self.final_at),
+            "transcript_to_llm_first_token_ms": llm,
+            "llm_first_token_to_tts_first_byte_ms": round(tts - llm, 1) if tts is not None and llm is not None else None,
+            "tts_first_byte_to_audio_sent_ms": round(sent - tts, 1) if sent is not None and tts is not None else None,
+            "final_to_first_audio_ms": self._since(self.final_at, self.first_audio_at),
+            "time_to_first_audio_ms": self._since(self.eos_at, self.first_audio_at),
+            "audio_messages": self.audio_messages,
+            "error": self.error,
+        }
+
+
+class VoiceSession:
+    """One browser-like client: sends the config handshake, then real-time paced PCM."""
+
+    def __init__(self, url: str, frame_ms: int = 100, turn_timeout: float = 20.0, late_threshold_ms: float = 50.0):
+        self.url = url
+        self.frame_ms = frame_ms
+        self.turn_timeout = turn_timeout
+        self.late_threshold_ms = late_threshold_ms
+        self.frames_sent = 0
+        self.late_frames = 0
+        self.max_send_lag_ms = 0.0
+        self.turns: List[TurnResult] = []
+        self._ws = None
+        self._receiver = None
+        self._current: Optional[TurnResult] = None
+        self._silence = silence_frames(frame_ms)
+
+    async def __aenter__(self) -> "VoiceSession":
+        import websockets
+
+        self._ws = await websockets.connect(self.url, max_size=None)
+        await self._ws.send(json.dumps(CONFIG_MESSAGE))
+        self._receiver = asyncio.create_task(self._receive())
+        return self
+
+    async def __aexit__(self, *exc):
+        self._receiver.cancel()
+        await self._ws.close()
+
+    async def _receive(self):
+        async for raw in self._ws:
+            now = time.perf_counter()
+            turn = self._current
+            if turn is None:
+                continue
+            message = json.loads(raw)
+            kind = message.get("type")
+            if kind == "final" and turn.final_at is None:
+                turn.final_at = now
+            elif kind == "audio":
+                turn.audio_messages += 1
+                if turn.first_audio_at is None:
+                    turn.first_audio_at = now
+            elif kind == "turn_timing":
+                turn.stages = message.get("stages", {})
+                turn.completed.set()
+            elif kind in ("llm", "error"):
+                turn.error = message.get("text") or message.get("message")
+                turn.completed.set()
+
+    async def _send_paced(self, chunk: bytes, due: float):
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        lag_ms = (time.perf_counter() - due) * 1000
+        self.max_send_lag_ms = max(self.max_send_lag_ms, lag_ms)
+        if lag_ms > self.late_threshold_ms:
+            self.late_frames += 1
+        await self._ws.send(chunk)
+        self.frames_sent += 1
+
+    async def speak(self, pcm: bytes) -> TurnResult:
+        """Streams one utterance in real time, then silence until the reply completes."""
+        turn = TurnResult()
+        self._current = turn
+        self.turns.append(turn)
+
+        chunks = frames(pcm, self.frame_ms)
+        eos_index = last_voiced_frame(chunks)
+        start = time.perf_counter()
+        step = self.frame_ms / 1000
+        for index, chunk in enumerate(chunks):
+            await self._send_paced(chunk, start + index * step)
+            if index == eos_index:
+                turn.eos_at = time.perf_counter()
+
+        # Keep the mic "open" with silence, like the browser does, until the turn completes
+        index = len(chunks)
+        deadline = time.perf_counter() + self.turn_timeout
+        while not turn.completed.is_set():
+            if time.perf_counter() > deadline:
+                turn.error = turn.error or "timeout"
+                break
+            await self._send_paced(next(self._silence), start + index * step)
+            index += 1
+        return turn
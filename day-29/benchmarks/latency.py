@@ -0,0 +1,145 @@
+# benchmarks/latency.py
+"""
+End-to-end latency benchmark for the voice pipeline.
+
+Drives `/ws` with real-time paced 16 kHz PCM utterances and reports per-stage
+timings with p50/p95/p99 time-to-first-audio.
+
+    # start emulators + app locally and run 20 turns
+    python -m benchmarks.latency run --spawn --wav hello.wav --turns 20 --out base.json
+
+    # against an app already running with SEND_TURN_TIMINGS=1
+    python -m benchmarks.latency run --url ws://127.0.0.1:8000/ws --out new.json
+
+    python -m benchmarks.latency compare base.json new.json
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import subprocess
+from typing import Any, Dict, List
+
+from .audio import load_wav, synthetic_utterance, silence
+from .client import VoiceSession
+from .stack import LocalStack, APP_DIR
+from .stats import summarize, format_ms
+
+METRICS = [
+    "eos_to_final_ms",
+    "transcript_to_llm_first_token_ms",
+    "llm_first_token_to_tts_first_byte_ms",
+    "tts_first_byte_to_audio_sent_ms",
+    "final_to_first_audio_ms",
+    "time_to_first_audio_ms",
+]
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+async def run_turns(url: str, utterances: List[bytes], turns: int, frame_ms: int, pause: float) -> List[Dict[str, Any]]:
+    results = []
+    async with VoiceSession(url, frame_ms=frame_ms) as session:
+        for index in range(turns):
+            turn = await session.speak(utterances[index % len(utterances)])
+            results.append(turn.to_dict())
+            print(f"turn {index + 1}/{turns}: TTFA {format_ms(results[-1]['time_to_first_audio_ms'])} ms"
+                  + (f" ({turn.error})" if turn.error else ""))
+            await asyncio.sleep(pause)
+    return results
+
+
+def print_summary(summary: Dict[str, Dict[str, Any]]):
+    print(f"\n{'metric':<42}{'count':>7}{'p50':>8}{'p95':>8}{'p99':>8}")
+    for metric in METRICS:
+        stats = summary[metric]
+        print(f"{metric:<42}{stats['count']:>7}{format_ms(stats['p50']):>8}{format_ms(stats['p95']):>8}{format_ms(stats['p99']):>8}")
+
+
+def command_run(args):
+    utterances = [load_wav(path) for path in args.wav] or [synthetic_utterance()]
+    # A little lead-in silence so the end-of-speech detector sees a clean start
+    utterances = [silence(0.3) + pcm for pcm in utterances]
+    profile = json.load(open(args.profile)) if args.profile else None
+
+    started = time.time()
+    if args.spawn:
+        with LocalStack(profile=profile) as stack:
+            results = asyncio.run(run_turns(stack.ws_url, utterances, args.turns, args.frame_ms, args.pause))
+            url = stack.ws_url
+    else:
+        results = asyncio.run(run_turns(args.url, utterances, args.turns, args.frame_ms, args.pause))
+        url = args.url
+
+    summary = {metric: summarize(result[metric] for result in results) for metric in METRICS}
+    report = {
+        "meta": {
+            "started_at": started,
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "url": url,
+            "spawned": args.spawn,
+            "wavs": args.wav,
+            "turns": args.turns,
+            "errors": sum(1 for result in results if result["error"]),
+        },
+        "summary": summary,
+        "turns": results,
+    }
+    print_summary(summary)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.out}")
+
+
+def command_compare(args):
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    print(f"base: {args.base} ({base['meta']['revision']}, {base['meta']['turns']} turns)")
+    print(f"new:  {args.new} ({new['meta']['revision']}, {new['meta']['turns']} turns)\n")
+    print(f"{'metric':<42}{'pct':>5}{'base':>8}{'new':>8}{'delta':>9}")
+    for metric in METRICS:
+        for pct in ("p50", "p95", "p99"):
+            before = base["summary"].get(metric, {}).get(pct)
+            after = new["summary"].get(metric, {}).get(pct)
+            delta = f"{(after - before) / before * 100:+.0f}%" if before and after is not None else "-"
+            print(f"{metric if pct == 'p50' else '':<42}{pct:>5}{format_ms(before):>8}{format_ms(after):>8}{delta:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voice pipeline latency benchmark.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="drive /ws and record per-stage timings")
+    target = run.add_mutually_exclusive_group(required=True)
+    target.add_argument("--spawn", action="store_true", help="start emulators and the app locally")
+    target.add_argument("--url", help="WebSocket URL of a running app (started with SEND_TURN_TIMINGS=1)")
+    run.add_argument("--wav", action="append", default=[], help="16 kHz mono 16-bit utterance (repeatable)")
+    run.add_argument("--turns", type=int, default=20)
+    run.add_argument("--frame-ms", type=int, default=100, help="audio frame size sent per message")
+    run.add_argument("--pause", type=float, default=0.5, help="seconds between turns")
+    run.add_argument("--profile", help="emulator latency/fault profile JSON (with --spawn)")
+    run.add_argument("--out", help="write the JSON result file here")
+    run.set_defaults(func=command_run)
+
+    compare = sub.add_parser("compare", help="compare two result files")
+    compare.add_argument("base")
+    compare.add_argument("new")
+    compare.set_defaults(func=command_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+# benchmarks/load.py
+"""
+Concurrent-session load generator with capacity reporting.
+
+Ramps the number of simultaneous /ws sessions. Each session sends the config
+handshake, streams real-time 16 kHz PCM and consumes the audio replies. Every
+level reports time-to-first-audio, event-loop lag, threads, RSS and
+late/dropped frames, then the knee of the latency curve.
+
+    python -m benchmarks.load --spawn --cpus 0 --levels 1,2,4,8,16,32 --out load.json
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import Any, Dict, List, Optional
+
+from .audio import load_wav, synthetic_utterance, silence
+from .client import VoiceSession
+from .stack import LocalStack
+from .stats import summarize, format_ms
+
+
+async def fetch_stats(http_url: Optional[str], reset: bool = False) -> Optional[Dict[str, Any]]:
+    """Reads /debug/stats from the app (needs ENABLE_DEBUG_STATS=1)."""
+    if not http_url:
+        return None
+
+    def get():
+        import requests
+        response = requests.get(f"{http_url}/debug/stats", params={"reset": reset}, timeout=5)
+        response.raise_for_status()
+        return response.json()
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, get)
+    except Exception:
+        return None
+
+
+async def run_session(url: str, utterances: List[bytes], turns: int, stagger: float) -> VoiceSession:
+    await asyncio.sleep(random.uniform(0, stagger))
+    session = VoiceSession(url)
+    try:
+        async with session:
+            for index in range(turns):
+                await session.speak(utterances[index % len(utterances)])
+    except Exception as e:
+        session.turns.append(None)  # connection-level failure counts as a dropped turn
+        session.connect_error = str(e)
+    return session
+
+
+async def sample_stats(http_url: Optional[str], samples: List[Dict[str, Any]], interval: float = 1.0):
+    while True:
+        stats = await fetch_stats(http_url)
+        if stats:
+            samples.append(stats)
+        await asyncio.sleep(interval)
+
+
+async def run_level(url: str, http_url: Optional[str], sessions: int, utterances: List[bytes], turns: int) -> Dict[str, Any]:
+    await fetch_stats(http_url, reset=True)
+    samples: List[Dict[str, Any]] = []
+    sampler = asyncio.create_task(sample_stats(http_url, samples))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(run_session(url, utterances, turns, stagger=1.0) for _ in range(sessions)))
+    elapsed = time.perf_counter() - started
+    sampler.cancel()
+    final = await fetch_stats(http_url)
+    if final:
+        samples.append(final)
+
+    turn_results = [turn for session in results for turn in session.turns]
+    completed = [turn.to_dict() for turn in turn_results if turn is not None]
+    dropped = sum(1 for turn in turn_results if turn is None) + sum(
+        1 for turn in completed if turn["error"] or not turn["audio_messages"]
+    )
+    frames_sent = sum(session.frames_sent for session in results)
+    late_frames = sum(session.late_frames for session in results)
+
+    return {
+        "sessions": sessions,
+        "elapsed_s": round(elapsed, 1),
+        "turns": len(turn_results),
+        "dropped_turns": dropped,
+        "frames_sent": frames_sent,
+        "late_frames": late_frames,
+        "max_send_lag_ms": round(max((session.max_send_lag_ms for session in results), default=0.0), 1),
+        "time_to_first_audio_ms": summarize(turn["time_to_first_audio_ms"] for turn in completed),
+        "eos_to_final_ms": summarize(turn["eos_to_final_ms"] for turn in completed),
+        "loop_lag_max_ms": max((sample["loop_lag"]["max_ms"] for sample in samples), default=None),
+        "loop_lag_p99_ms": max((sample["loop_lag"]["p99_ms"] for sample in samples), default=None),
+        "threads_max": max((sample["threads"] for sample in samples), default=None),
+        "thread_groups": samples[-1]["thread_groups"] if samples else None,
+        "rss_max_mb": round(max(sample["rss_bytes"] for sample in samples) / 2**20, 1) if samples else None,
+    }
+
+
+def find_knee(levels: List[Dict[str, Any]], factor: float, max_drop_rate: float) -> Dict[str, Any]:
+    """
+    The knee is the first level whose p95 TTFA exceeds `factor` x the single-session
+    baseline or whose dropped-turn rate exceeds `max_drop_rate`. Capacity is the
+    level before it.
+    """
+    baseline = levels[0]["time_to_first_audio_ms"]["p95"] if levels else None
+    capacity = None
+    for level in levels:
+        p95 = level["time_to_first_audio_ms"]["p95"]
+        drop_rate = level["dropped_turns"] / level["turns"] if level["turns"] else 1.0
+        if p95 is None or (baseline and p95 > baseline * factor) or drop_rate > max_drop_rate:
+            return {"knee_sessions": level["sessions"], "capacity_sessions": capacity, "baseline_p95_ms": baseline}
+        capacity = level["sessions"]
+    return {"knee_sessions": None, "capacity_sessions": capacity, "baseline_p95_ms": baseline}
+
+
+def print_level(level: Dict[str, Any]):
+    ttfa = level["time_to_first_audio_ms"]
+    print(
+        f"{level['sessions']:>8}{format_ms(ttfa['p50']):>8}{format_ms(ttfa['p95']):>8}"
+        f"{level['dropped_turns']:>9}{level['late_frames']:>7}"
+        f"{format_ms(level['loop_lag_max_ms']):>10}{level['threads_max'] or '-':>9}{level['rss_max_mb'] or '-':>9}"
+    )
+
+
+async def ramp(args, url: str, http_url: Optional[str], utterances: List[bytes]) -> List[Dict[str, Any]]:
+    print(f"{'sessions':>8}{'p50':>8}{'p95':>8}{'dropped':>9}{'late':>7}{'lag max':>10}{'threads':>9}{'rss MB':>9}")
+    levels = []
+    for sessions in args.levels:
+        level = await run_level(url, http_url, sessions, utterances, args.turns)
+        levels.append(level)
+        print_level(level)
+        if find_knee(levels, args.knee_factor, args.max_drop_rate)["knee_sessions"] and args.stop_at_knee:
+            break
+        await asyncio.sleep(args.cooldown)
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent voice session load generator.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--spawn", action="store_true", help="start emulators and the app locally")
+    target.add_argument("--url", help="WebSocket URL of a running app")
+    parser.add_argument("--stats-url", help="HTTP base URL for /debug/stats when using --url")
+    parser.add_argument("--cpus", help="with --spawn, pin the app to these cores, e.g. '0' or '0,1'")
+    parser.add_argument("--levels", default="1,2,4,8,16,32", help="comma-separated session counts")
+    parser.add_argument("--turns", type=int, default=3, help="turns per session at each level")
+    parser.add_argument("--wav", action="append", default=[], help="16 kHz mono 16-bit utterance (repeatable)")
+    parser.add_argument("--knee-factor", type=float, default=1.5, help="p95 TTFA growth over baseline that marks the knee")
+    parser.add_argument("--max-drop-rate", type=float, default=0.01)
+    parser.add_argument("--stop-at-knee", action="store_true")
+    parser.add_argument("--cooldown", type=float, default=2.0, help="seconds between levels")
+    parser.add_argument("--profile", help="emulator latency/fault profile JSON (with --spawn)")
+    parser.add_argument("--out", help="write the JSON report here")
+    args = parser.parse_args()
+    args.levels = [int(value) for value in args.levels.split(",")]
+
+    utterances = [silence(0.3) + pcm for pcm in ([load_wav(path) for path in args.wav] or [synthetic_utterance()])]
+
+    if args.spawn:
+        cpus = {int(cpu) for cpu in args.cpus.split(",")} if args.cpus else None
+        profile = json.load(open(args.profile)) if args.profile else None
+        with LocalStack(profile=profile, app_cpus=cpus) as stack:
+            levels = asyncio.run(ramp(args, stack.ws_url, stack.http_url, utterances))
+    else:
+        levels = asyncio.run(ramp(args, args.url, args.stats_url, utterances))
+
+    knee = find_knee(levels, args.knee_factor, args.max_drop_rate)
+    print(f"\nbaseline p95 TTFA: {format_ms(knee['baseline_p95_ms'])} ms")
+    print(f"knee at: {knee['knee_sessions'] or 'not reached'} sessions; capacity: {knee['capacity_sessions'] or 0} sessions")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"meta": {"cpus": args.cpus, "spawned": args.spawn, "turns": args.turns}, "knee": knee, "levels": levels}, f, indent=2)
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+# benchmarks/segmenter.py
+"""
+Micro-benchmark for the streaming sentence segmenter.
+
+Streams synthetic LLM replies in small chunks through the old approach
+(`re.split` over the whole buffer on every chunk) and through
+`services.segmenter.SentenceSegmenter`, and reports time per reply and the
+shape of the chunks each one would send to TTS.
+
+    python -m benchmarks.segmenter --sizes 1000,10000,100000 --chunk 24
+"""
+import sys
+import re
+import time
+import random
+import argparse
+from typing import Callable, Dict, Iterable, List
+
+from services.segmenter import SentenceSegmenter
+
+from .stats import percentile
+
+SENTENCES = [
+    "Sure!",
+    "Dr. Patel recommends about 2.5 liters of water a day, e.g. eight glasses.",
+    "The train leaves at 9 a.m. and arrives around noon.",
+    "Pi is roughly 3.14159, which is close enough for most estimates.",
+    "Wait... that is not quite right.",
+    "Here are a few options:\n1. Take the bus.\n2. Walk along the river.\n3. Rent a bike.\n",
+    "- **Cost:** low\n- **Time:** about 40 min\n",
+    "It depends on the weather, the traffic, and how early you want to get there; "
+    "if you leave before rush hour, the drive is short, but if you wait until the "
+    "afternoon, it can easily take twice as long as the map suggests.",
+    "Is that what you were looking for?",
+    "Mr. and Mrs. Smith moved to St. Louis in Jan. 2020.",
+]
+
+
+def make_reply(size: int, seed: int = 0) -> str:
+    """Prose with abbreviations, decimals, ellipses and markdown lists."""
+    rng = random.Random(seed)
+    parts, length = [], 0
+    while length < size:
+        sentence = rng.choice(SENTENCES)
+        parts.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(parts)
+
+
+def make_run_on(size: int) -> str:
+    """A reply with no sentence punctuation, such as a long unpunctuated list."""
+    words = "and then the next step covers the details of the plan for the day".split()
+    return " ".join(words[i % len(words)] for i in range(size // 4))[:size]
+
+
+def stream(text: str, chunk: int) -> Iterable[str]:
+    return (text[i:i + chunk] for i in range(0, len(text), chunk))
+
+
+def regex_split(chunks: Iterable[str]) -> List[str]:
+    """The loop this replaced: re-splits the whole buffer on every chunk."""
+    out, buffer = [], ""
+    for chunk in chunks:
+        buffer += chunk
+        sentences = re.split(r'(?<=[.?!])\s+', buffer)
+        if len(sentences) > 1:
+            out.extend(sentence.strip() for sentence in sentences[:-1] if sentence.strip())
+            buffer = sentences[-1]
+    if buffer.strip():
+        out.append(buffer.strip())
+    return out
+
+
+def incremental(chunks: Iterable[str]) -> List[str]:
+    segmenter = SentenceSegmenter()
+    out = []
+    for chunk in chunks:
+        out.extend(segmenter.feed(chunk))
+    out.extend(segmenter.flush())
+    return out
+
+
+def measure(split: Callable[[Iterable[str]], List[str]], text: str, chunk: int, repeat: int) -> Dict[str, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pieces = split(stream(text, chunk))
+        best = min(best, time.perf_counter() - start)
+    lengths = [len(piece) for piece in pieces]
+    return {
+        "ms": best * 1000,
+        "chunks": len(pieces),
+        "fragments": sum(1 for length in lengths if length < 20),
+        "first": lengths[0] if lengths else 0,
+        "p50": percentile(lengths, 50) or 0,
+        "max": max(lengths, default=0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming sentence segmenter micro-benchmark.")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated reply lengths in characters")
+    parser.add_argument("--chunk", type=int, default=24, help="characters per streamed LLM chunk")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'reply':<7} {'chars':>7} {'method':<12} {'ms':>9} {'chunks':>7} {'<20ch':>6} {'first':>6} {'p50':>5} {'max':>5}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        for kind, text in (("prose", make_reply(size)), ("run-on", make_run_on(size))):
+            for name, split in (("re.split", regex_split), ("incremental", incremental)):
+                row = measure(split, text, args.chunk, args.repeat)
+                print(
+                    f"{kind:<7} {size:>7} {name:<12} {row['ms']:>9.2f} {row['chunks']:>7} {row['fragments']:>6} "
+                    f"{row['first']:>6} {row['p50']:>5} {row['max']:>5}"
+                )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+# benchmarks/speech_text.py
+"""
+Micro-benchmark for the speech text normalizer.
+
+Normalizes markdown-heavy replies like the ones Gemini writes and reports the
+time per reply, the cost per character and how many characters stop reaching
+TTS. Scaled and adversarial inputs (unclosed brackets, stray backticks) show
+the cost stays linear in the length of the text.
+
+    python -m benchmarks.speech_text --repeat 200
+"""
+import sys
+import time
+import argparse
+from typing import Callable, List
+
+from services.segmenter import SentenceSegmenter
+from services.speech_text import SpeechNormalizer, normalize
+
+REPLIES = {
+    "plain": (
+        "Sure! The museum opens at nine in the morning and closes at six. "
+        "Tickets are cheaper on weekdays, so a Tuesday visit is a good idea. "
+        "Would you like directions from your hotel?"
+    ),
+    "list": (
+        "Here are **three** easy dinner ideas:\n\n"
+        "1. **Pasta aglio e olio** – garlic, olive oil & chili; about 15 min.\n"
+        "2. **Sheet-pan chicken** with veggies at 220°C for ~30 minutes.\n"
+        "3. *Stir-fry*: rice + whatever is in the fridge.\n\n"
+        "Want the full recipe for any of these? 😊"
+    ),
+    "links": (
+        "### Sources\n"
+        "- [Paris travel guide](https://www.example.com/travel/paris?utm_source=chat&ref=abc123)\n"
+        "- Official site: https://www.louvre.fr/en/visit/hours-admission\n"
+        "- See also https://en.wikipedia.org/wiki/Louvre_(museum) for history.\n\n"
+        "Entry is $22 (about €20), e.g. free for under-18s."
+    ),
+    "code": (
+        "You can read the file with `pathlib`:\n\n"
+        "```python\n"
+        "from pathlib import Path\n"
+        "text = Path('notes.txt').read_text(encoding='utf-8')\n"
+        "print(len(text.split()))\n"
+        "```\n\n"
+        "That prints the **word count**. Use `open(path, 'rb')` for binary files."
+    ),
+    "table": (
+        "| City | High | Low |\n"
+        "|------|-----:|----:|\n"
+        "| Paris | 21°C | 12°C |\n"
+        "| Rome | 27°C | 16°C |\n"
+        "| Oslo | 14°C | 6°C |\n\n"
+        "> Rome is the warmest -> pack light."
+    ),
+}
+
+ADVERSARIAL = {
+    "brackets": "[" * 500 + " text",
+    "backticks": "`a " * 300,
+    "stars": "*a* **b " * 200,
+}
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def streamed(text: str, chunk: int, normalize_sentences: bool) -> List[str]:
+    normalizer = SpeechNormalizer()
+    segmenter = SentenceSegmenter(normalize=normalizer.normalize if normalize_sentences else None)
+    out = []
+    for i in range(0, len(text), chunk):
+        out.extend(segmenter.feed(text[i:i + chunk]))
+    out.extend(segmenter.flush())
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speech text normalizer micro-benchmark.")
+    parser.add_argument("--repeat", type=int, default=200, help="runs per measurement (best is reported)")
+    parser.add_argument("--chunk", type=int, default=24, help="characters per streamed LLM chunk")
+    parser.add_argument("--show", action="store_true", help="print each reply as it would be spoken")
+    args = parser.parse_args()
+
+    print(f"{'reply':<10} {'chars':>6} {'spoken':>6} {'saved':>6} {'us':>8} {'ns/ch':>6} {'stream us':>10} {'+norm us':>9}")
+    total_in = total_out = 0
+    for name, text in REPLIES.items():
+        spoken = streamed(text, args.chunk, True)
+        out_chars = sum(len(sentence) for sentence in spoken)
+        seconds = best_of(lambda: normalize(text), args.repeat)
+        plain = best_of(lambda: streamed(text, args.chunk, False), args.repeat)
+        with_norm = best_of(lambda: streamed(text, args.chunk, True), args.repeat)
+        total_in += len(text)
+        total_out += out_chars
+        print(
+            f"{name:<10} {len(text):>6} {out_chars:>6} {1 - out_chars / len(text):>6.0%} {seconds * 1e6:>8.1f} "
+            f"{seconds * 1e9 / len(text):>6.0f} {plain * 1e6:>10.1f} {(with_norm - plain) * 1e6:>9.1f}"
+        )
+        if args.show:
+            for sentence in spoken:
+                print(f"    {sentence}")
+    print(f"{'total':<10} {total_in:>6} {total_out:>6} {1 - total_out / total_in:>6.0%}")
+
+    print(f"\n{'scaling':<10} {'chars':>8} {'ms':>8} {'ns/ch':>6}")
+    corpus = "\n\n".join(REPLIES.values())
+    for scale in (1, 10, 100):
+        text = "\n\n".join([corpus] * scale)
+        seconds = best_of(lambda: normalize(text), max(1, args.repeat // scale))
+        print(f"{'x' + str(scale):<10} {len(text):>8} {seconds * 1e3:>8.2f} {seconds * 1e9 / len(text):>6.0f}")
+    for name, unit in ADVERSARIAL.items():
+        for scale in (1, 10):
+            text = "\n".join([unit] * scale)
+            seconds = best_of(lambda: normalize(text), max(1, args.repeat // scale))
+            print(f"{name + ' x' + str(scale):<10} {len(text):>8} {seconds * 1e3:>8.2f} {seconds * 1e9 / len(text):>6.0f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
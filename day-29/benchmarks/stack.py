@@ -0,0 +1,126 @@
+# benchmarks/stack.py
+import os
+import sys
+import time
+import json
+import socket
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"Nothing listening on port {port} after {timeout:.0f}s")
+
+
+# Every benchmark session sends the same "bench" key, and the emulators
+# have no quotas: with the app's admission cap and rate limits in place, a
+# load run would measure the limiter instead of the server. app_env can
+# turn them back on.
+UNLIMITED_ENV = {
+    "MAX_SESSIONS": "0",
+    **{
+        f"RATE_LIMIT_{provider}{scope}": "0"
+        for provider in ("GEMINI", "MURF", "SERPAPI", "ASSEMBLYAI")
+        for scope in ("", "_PER_KEY")
+    },
+}
+
+
+class LocalStack:
+    """
+    Starts the vendor emulators and the app (uvicorn main:app) as subprocesses,
+    with the app's endpoint overrides pointed at the emulators.
+    """
+
+    def __init__(
+        self,
+        profile: Optional[Dict[str, Any]] = None,
+        transcripts: Optional[List[str]] = None,
+        app_env: Optional[Dict[str, str]] = None,
+        workers: int = 1,
+        app_cpus: Optional[Set[int]] = None,
+    ):
+        self.profile = profile
+        self.transcripts = transcripts
+        self.app_env = app_env or {}
+        self.workers = workers
+        self.app_cpus = app_cpus
+        self.emulator_port = free_port()
+        self.app_port = free_port()
+        self.processes: List[subprocess.Popen] = []
+        self._tempdir = tempfile.TemporaryDirectory()
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://127.0.0.1:{self.app_port}/ws"
+
+    @property
+    def http_url(self) -> str:
+        return f"http://127.0.0.1:{self.app_port}"
+
+    def __enter__(self) -> "LocalStack":
+        emulator_args = [sys.executable, "-m", "emulators", "--port", str(self.emulator_port), "--log-level", "warning"]
+        if self.profile:
+            profile_path = Path(self._tempdir.name) / "profile.json"
+            profile_path.write_text(json.dumps(self.profile))
+            emulator_args += ["--profile", str(profile_path)]
+        if self.transcripts:
+            transcripts_path = Path(self._tempdir.name) / "transcripts.txt"
+            transcripts_path.write_text("\n".join(self.transcripts))
+            emulator_args += ["--transcripts", str(transcripts_path)]
+        # Keep the emulators off the cores reserved for the app
+        emulator_cpus = os.sched_getaffinity(0) - self.app_cpus if self.app_cpus else None
+        self._start(emulator_args, os.environ.copy(), emulator_cpus)
+        wait_for_port(self.emulator_port)
+
+        emulator_host = f"127.0.0.1:{self.emulator_port}"
+        env = {
+            **os.environ,
+            "GEMINI_API_ENDPOINT": f"http://{emulator_host}",
+            "ASSEMBLYAI_STREAMING_URL": f"ws://{emulator_host}/v3/ws",
+            "MURF_BASE_URL": f"http://{emulator_host}",
+            "SERPAPI_BASE_URL": f"http://{emulator_host}",
+            "OPENAI_BASE_URL": f"http://{emulator_host}/v1",
+            "SEND_TURN_TIMINGS": "1",
+            "ENABLE_DEBUG_STATS": "1",
+            **UNLIMITED_ENV,
+            **self.app_env,
+        }
+        self._start([
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--port", str(self.app_port), "--workers", str(self.workers), "--log-level", "warning",
+        ], env, self.app_cpus)
+        wait_for_port(self.app_port)
+        return self
+
+    def _start(self, args: List[str], env: Dict[str, str], cpus: Optional[Set[int]] = None):
+        # Pin before exec so every thread the process starts inherits the affinity
+        pin = (lambda: os.sched_setaffinity(0, cpus)) if cpus else None
+        self.processes.append(subprocess.Popen(args, cwd=APP_DIR, env=env, preexec_fn=pin))
+
+    def __exit__(self, *exc):
+        for process in reversed(self.processes):
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self._tempdir.cleanup()
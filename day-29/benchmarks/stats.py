@@ -0,0 +1,27 @@
+# benchmarks/stats.py
+import math
+from typing import Dict, Iterable, List, Optional
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile; None for an empty list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values: Iterable[Optional[float]]) -> Dict[str, Optional[float]]:
+    present = [value for value in values if value is not None]
+    return {
+        "count": len(present),
+        "mean": round(sum(present) / len(present), 1) if present else None,
+        "p50": percentile(present, 50),
+        "p95": percentile(present, 95),
+        "p99": percentile(present, 99),
+    }
+
+
+def format_ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.0f}"
@@ -0,0 +1,44 @@
+# emulators/__init__.py
+"""
+Local stand-ins for AssemblyAI streaming, Gemini, Murf and SerpAPI, plus an
+OpenAI-compatible chat completions server for the extra LLM backend.
+
+All vendors are served from one FastAPI app on distinct paths, so a
+single base URL can be given to every service override:
+
+    python -m emulators --port 8765
+
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8765
+    ASSEMBLYAI_STREAMING_URL=ws://127.0.0.1:8765/v3/ws
+    MURF_BASE_URL=http://127.0.0.1:8765
+    SERPAPI_BASE_URL=http://127.0.0.1:8765
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+"""
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI
+
+from .faults import load_profiles
+from . import assemblyai, gemini, murf, openai, serpapi
+
+DEFAULT_TRANSCRIPTS = [
+    "what can you do",
+    "tell me a joke",
+    "what is the weather in london today",
+]
+
+
+def create_app(
+    profiles: Optional[Dict[str, Dict[str, Any]]] = None,
+    transcripts: Optional[List[str]] = None,
+    replies: Optional[Dict[str, str]] = None,
+) -> FastAPI:
+    """Builds the combined emulator app. `profiles` overrides the per-provider defaults."""
+    provider_profiles = load_profiles(profiles)
+    app = FastAPI(title="Voice agent vendor emulators")
+    app.include_router(assemblyai.create_router(provider_profiles["assemblyai"], transcripts or DEFAULT_TRANSCRIPTS))
+    app.include_router(gemini.create_router(provider_profiles["gemini"], replies or {}))
+    app.include_router(murf.create_router(provider_profiles["murf"]))
+    app.include_router(serpapi.create_router(provider_profiles["serpapi"]))
+    app.include_router(openai.create_router(provider_profiles["openai"], replies or {}))
+    return app
@@ -0,0 +1,31 @@
+# emulators/__main__.py
+import json
+import argparse
+
+import uvicorn
+
+from . import create_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline vendor emulators.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--profile", help="JSON file with per-provider latency and fault settings")
+    parser.add_argument("--transcripts", help="text file with one scripted transcript per line")
+    parser.add_argument("--replies", help="JSON file mapping regex patterns to Gemini replies")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    profiles = json.load(open(args.profile)) if args.profile else None
+    transcripts = None
+    if args.transcripts:
+        with open(args.transcripts) as f:
+            transcripts = [line.strip() for line in f if line.strip()]
+    replies = json.load(open(args.replies)) if args.replies else None
+
+    uvicorn.run(create_app(profiles, transcripts, replies), host=args.host, port=args.port, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# emulators/assemblyai.py
+import json
+import math
+import time
+import uuid
+import logging
+from array import array
+from typing import List
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from .faults import ProviderProfile
+
+logger = logging.getLogger(__name__)
+
+# Int16 RMS above this counts as speech
+SPEECH_RMS_THRESHOLD = 500
+# Pace at which partial transcripts reveal scripted words
+SECONDS_PER_WORD = 0.35
+
+
+def pcm_rms(chunk: bytes) -> float:
+    """RMS energy of a little-endian 16-bit mono PCM chunk."""
+    samples = array("h")
+    samples.frombytes(chunk[: len(chunk) - len(chunk) % 2])
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+
+def format_transcript(text: str) -> str:
+    text = text.strip()
+    if not text:
+        return text
+    text = text[0].upper() + text[1:]
+    return text if text[-1] in ".?!" else text + "."
+
+
+def word_timings(words: List[str], end_ms: int, final: bool) -> List[dict]:
+    """Evenly spaced word timestamps ending where speech was last heard."""
+    step = int(SECONDS_PER_WORD * 1000)
+    start_ms = max(0, end_ms - step * len(words))
+    return [
+        {"text": word, "start": start_ms + i * step, "end": start_ms + (i + 1) * step, "confidence": 0.95, "word_is_final": final}
+        for i, word in enumerate(words)
+    ]
+
+
+def create_router(profile: ProviderProfile, transcripts: List[str]) -> APIRouter:
+    """
+    AssemblyAI Universal Streaming v3 (`/v3/ws`).
+
+    Speech is detected with a simple energy VAD over the incoming PCM. Each
+    detected utterance is answered with the next scripted transcript: word by
+    word partial Turn events while speech continues, then an end_of_turn Turn
+    once silence exceeds `max_turn_silence` (ms).
+    """
+    router = APIRouter()
+    script = {"index": 0}
+
+    def next_transcript() -> str:
+        text = transcripts[script["index"] % len(transcripts)]
+        script["index"] += 1
+        return text
+
+    @router.websocket("/v3/ws")
+    async def streaming(websocket: WebSocket):
+        params = websocket.query_params
+        sample_rate = int(params.get("sample_rate", 16000))
+        format_turns = params.get("format_turns", "false").lower() == "true"
+        max_turn_silence = float(params.get("max_turn_silence", 700)) / 1000
+        partial_interval = profile.chunk_interval.sample() or 0.5
+
+        fault = profile.roll_fault()
+        if fault == "error":
+            await websocket.close(code=3005 if profile.error_status >= 500 else 1008)
+            return
+
+        await websocket.accept()
+        await profile.first_byte.wait()
+        started = time.monotonic()
+        await websocket.send_json({"type": "Begin", "id": str(uuid.uuid4()), "expires_at": int(time.time()) + 3600})
+
+        audio_seconds = 0.0
+        turn_order = 0
+        speech_seconds = 0.0
+        silence_seconds = 0.0
+        last_partial_at = 0.0
+        words: List[str] = []
+        in_speech = False
+        speech_end_ms = 0
+
+        async def send_turn(text: str, end_of_turn: bool, formatted: bool):
+            await websocket.send_json({
+                "type": "Turn",
+                "turn_order": turn_order,
+                "turn_is_formatted": formatted,
+                "end_of_turn": end_of_turn,
+                "transcript": text,
+                "end_of_turn_confidence": 0.9 if end_of_turn else 0.1,
+                "words": word_timings(text.split(), speech_end_ms, end_of_turn),
+            })
+
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+
+                if message.get("text"):
+                    data = json.loads(message["text"])
+                    if data.get("type") == "Terminate":
+                        break
+                    if data.get("type") == "UpdateConfiguration" and "format_turns" in data:
+                        format_turns = bool(data["format_turns"])
+                    if data.get("type") == "ForceEndpoint" and in_speech:
+                        silence_seconds = max_turn_silence
+                    else:
+                        continue
+                else:
+                    chunk = message.get("bytes") or b""
+                    duration = len(chunk) / 2 / sample_rate
+                    audio_seconds += duration
+                    if fault == "timeout":
+                        continue
+                    if pcm_rms(chunk) >= SPEECH_RMS_THRESHOLD:
+                        if not in_speech:
+                            in_speech, words, speech_seconds, last_partial_at = True, next_transcript().split(), 0.0, 0.0
+                        speech_seconds += duration
+                        silence_seconds = 0.0
+                        speech_end_ms = int(audio_seconds * 1000)
+                    elif in_speech:
+                        silence_seconds += duration
+
+                if not in_speech:
+                    continue
+
+                # Reveal words in proportion to speech heard so far
+                if speech_seconds - last_partial_at >= partial_interval and silence_seconds == 0.0:
+                    last_partial_at = speech_seconds
+                    shown = max(1, min(len(words), int(speech_seconds / SECONDS_PER_WORD)))
+                    await send_turn(" ".join(words[:shown]), False, False)
+
+                if silence_seconds >= max_turn_silence:
+                    text = " ".join(words).lower().rstrip(".?!")
+                    await send_turn(text, True, False)
+                    if format_turns:
+                        await profile.first_byte.wait()
+                        await send_turn(format_transcript(text), True, True)
+                    turn_order += 1
+                    in_speech, silence_seconds = False, 0.0
+
+            await websocket.send_json({
+                "type": "Termination",
+                "audio_duration_seconds": round(audio_seconds),
+                "session_duration_seconds": round(time.monotonic() - started),
+            })
+            await websocket.close()
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+
+    return router
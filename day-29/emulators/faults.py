@@ -0,0 +1,97 @@
+# emulators/faults.py
+import math
+import random
+import asyncio
+from typing import Any, Dict, Optional
+
+
+class LatencyModel:
+    """
+    A latency distribution in seconds, written as "<kind>:<params>":
+      - "fixed:0.2"
+      - "uniform:0.1,0.4"
+      - "lognormal:0.35,0.5"  (median, sigma)
+    """
+
+    def __init__(self, spec: str = "fixed:0"):
+        kind, _, params = spec.partition(":")
+        self.spec = spec
+        self.kind = kind.strip().lower()
+        self.params = [float(value) for value in params.split(",") if value.strip()]
+        if self.kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.params[0] if self.params else 0.0
+        if self.kind == "uniform":
+            low, high = self.params
+            return random.uniform(low, high)
+        median, sigma = self.params
+        return random.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+    async def wait(self):
+        delay = self.sample()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def __repr__(self):
+        return f"LatencyModel({self.spec!r})"
+
+
+class ProviderProfile:
+    """Latency, chunking and fault-injection settings for one emulated provider."""
+
+    def __init__(
+        self,
+        first_byte: str = "fixed:0",
+        chunk_interval: str = "fixed:0",
+        chunk_size: int = 0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        timeout_rate: float = 0.0,
+        timeout_seconds: float = 30.0,
+    ):
+        self.first_byte = LatencyModel(first_byte)
+        self.chunk_interval = LatencyModel(chunk_interval)
+        self.chunk_size = chunk_size
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "ProviderProfile":
+        return cls(**(data or {}))
+
+    def roll_fault(self) -> Optional[str]:
+        """Returns "timeout", "error" or None for a single request."""
+        roll = random.random()
+        if roll < self.timeout_rate:
+            return "timeout"
+        if roll < self.timeout_rate + self.error_rate:
+            return "error"
+        return None
+
+    async def stall(self):
+        """Simulates an upstream that accepts the request and never answers in time."""
+        await asyncio.sleep(self.timeout_seconds)
+
+
+# Defaults roughly shaped like the real vendors seen from a nearby region
+DEFAULT_PROFILES = {
+    "assemblyai": {"first_byte": "lognormal:0.3,0.3", "chunk_interval": "fixed:0.5"},
+    "gemini": {"first_byte": "lognormal:0.45,0.4", "chunk_interval": "uniform:0.02,0.08", "chunk_size": 40},
+    "murf": {"first_byte": "lognormal:0.35,0.5", "chunk_interval": "uniform:0.01,0.04", "chunk_size": 8192},
+    "serpapi": {"first_byte": "lognormal:0.9,0.4"},
+    "openai": {"first_byte": "lognormal:0.25,0.3", "chunk_interval": "uniform:0.01,0.03", "chunk_size": 24},
+}
+
+
+def load_profiles(overrides: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, ProviderProfile]:
+    """Builds a profile per provider, applying any overrides on top of the defaults."""
+    overrides = overrides or {}
+    return {
+        name: ProviderProfile.from_dict({**defaults, **overrides.get(name, {})})
+        for name, defaults in DEFAULT_PROFILES.items()
+    }
@@ -0,0 +1,170 @@
+# emulators/gemini.py
+import re
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from .faults import ProviderProfile
+
+ROUTING_PROMPT = "require a web search"
+SEARCH_KEYWORDS = ("today", "latest", "news", "weather", "current", "price", "score", "who won", "right now")
+
+
+def _last_user_text(body: Dict[str, Any]) -> str:
+    for content in reversed(body.get("contents", [])):
+        if content.get("role", "user") == "user":
+            return " ".join(part.get("text", "") for part in content.get("parts", []))
+    return ""
+
+
+def _declared_tools(body: Dict[str, Any]) -> List[str]:
+    return [
+        declaration.get("name", "")
+        for tool in body.get("tools", [])
+        for declaration in tool.get("functionDeclarations", tool.get("function_declarations", []))
+    ]
+
+
+def _function_responses(body: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Tool results in the latest message, if it carries any."""
+    contents = body.get("contents", [])
+    if not contents:
+        return []
+    return [part["functionResponse"] for part in contents[-1].get("parts", []) if "functionResponse" in part]
+
+
+def tool_turn(body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Scripted function calling: a query with search keywords calls `web_search`,
+    one mentioning the time calls `current_time` (both at once when both match).
+    Tool results are answered with a sentence per tool. None when no tool applies.
+    """
+    tools = _declared_tools(body)
+    if not tools:
+        return None
+    responses = _function_responses(body)
+    if responses:
+        sentences = []
+        for response in responses:
+            result = response.get("response", {})
+            if "error" in result:
+                sentences.append(f"The {response.get('name')} tool did not answer: {result['error']}")
+            else:
+                sentences.append(f"Here is what the {response.get('name')} tool found.")
+        return _response(" ".join(sentences))
+    query = _last_user_text(body).lower()
+    calls = []
+    if "web_search" in tools and any(keyword in query for keyword in SEARCH_KEYWORDS):
+        calls.append({"name": "web_search", "args": {"query": query}})
+    if "current_time" in tools and "time" in query:
+        calls.append({"name": "current_time", "args": {}})
+    if not calls:
+        return None
+    return {
+        "candidates": [{"content": {"role": "model", "parts": [{"functionCall": call} for call in calls]}, "index": 0, "finishReason": "STOP"}],
+        "usageMetadata": {"promptTokenCount": 0, "candidatesTokenCount": 0},
+    }
+
+
+def reply_for(prompt: str, replies: Dict[str, str]) -> str:
+    """Scripted reply: routing prompts get yes/no, otherwise the first matching pattern."""
+    if ROUTING_PROMPT in prompt:
+        query = prompt.rsplit("Query:", 1)[-1].lower()
+        return "yes" if any(keyword in query for keyword in SEARCH_KEYWORDS) else "no"
+    for pattern, reply in replies.items():
+        if re.search(pattern, prompt, re.IGNORECASE):
+            return reply
+    return (
+        "Certainly. This is the offline Gemini emulator answering your question. "
+        "It speaks in short sentences so the speech pipeline has something to do."
+    )
+
+
+def _chunks(text: str, size: int) -> List[str]:
+    if size <= 0:
+        return [text]
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+def _response(text: str, finished: bool = True) -> Dict[str, Any]:
+    candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+    if finished:
+        candidate["finishReason"] = "STOP"
+    return {
+        "candidates": [candidate],
+        "usageMetadata": {"promptTokenCount": 0, "candidatesTokenCount": len(text.split())},
+    }
+
+
+def create_router(profile: ProviderProfile, replies: Dict[str, str]) -> APIRouter:
+    """Gemini `generateContent`, `streamGenerateContent` (REST transport, JSON array or SSE) and `models.get`."""
+    router = APIRouter()
+
+    async def injected_fault():
+        fault = profile.roll_fault()
+        if fault == "timeout":
+            await profile.stall()
+        if fault == "error":
+            return JSONResponse(
+                status_code=profile.error_status,
+                content={"error": {"code": profile.error_status, "message": "Injected error", "status": "UNAVAILABLE"}},
+            )
+        return None
+
+    @router.get("/v1beta/models/{model}")
+    async def get_model(model: str):
+        """Model metadata, used by the app as a health probe."""
+        error = await injected_fault()
+        if error:
+            return error
+        return JSONResponse(content={
+            "name": f"models/{model}",
+            "baseModelId": model,
+            "version": "001",
+            "displayName": model,
+            "inputTokenLimit": 1048576,
+            "outputTokenLimit": 8192,
+            "supportedGenerationMethods": ["generateContent", "countTokens"],
+        })
+
+    @router.post("/v1beta/models/{model_action}")
+    async def models(model_action: str, request: Request):
+        _, _, action = model_action.partition(":")
+        body = await request.json()
+
+        error = await injected_fault()
+        if error:
+            return error
+
+        scripted = tool_turn(body)
+        text = reply_for(_last_user_text(body), replies)
+        await profile.first_byte.wait()
+
+        if action == "generateContent":
+            return JSONResponse(content=scripted or _response(text))
+
+        # Function calls arrive whole, in a single chunk
+        chunks = _chunks(text, profile.chunk_size)
+        pieces = [scripted] if scripted else [_response(chunk, finished=i == len(chunks) - 1) for i, chunk in enumerate(chunks)]
+        use_sse = request.query_params.get("alt") == "sse"
+
+        async def stream():
+            if not use_sse:
+                yield "["
+            for i, piece in enumerate(pieces):
+                if i:
+                    await profile.chunk_interval.wait()
+                payload = json.dumps(piece)
+                if use_sse:
+                    yield f"data: {payload}\r\n\r\n"
+                else:
+                    yield ("," if i else "") + payload
+            if not use_sse:
+                yield "]"
+
+        media_type = "text/event-stream" if use_sse else "application/json"
+        return StreamingResponse(stream(), media_type=media_type)
+
+    return router
@@ -0,0 +1,130 @@
+# emulators/murf.py
+import io
+import json
+import math
+import uuid
+import wave
+import base64
+from array import array
+from typing import Dict
+
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from .faults import ProviderProfile
+
+SAMPLE_RATE = 24000
+SECONDS_PER_CHAR = 0.06
+
+# One second of a quiet 220 Hz tone, tiled to the length of each utterance
+_TONE = array("h", (int(2000 * math.sin(2 * math.pi * 220 * i / SAMPLE_RATE)) for i in range(SAMPLE_RATE))).tobytes()
+
+
+def synthesize(text: str, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """A WAV file whose duration is proportional to the text length."""
+    frames = int(max(0.3, len(text) * SECONDS_PER_CHAR) * SAMPLE_RATE) * 2
+    pcm = (_TONE * (frames // len(_TONE) + 1))[:frames]
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def create_router(profile: ProviderProfile) -> APIRouter:
+    """Murf REST (`/v1/speech/stream`, `/v1/speech/generate`, `/v1/speech/voices`) and `stream-input` WebSocket."""
+    router = APIRouter()
+    files: Dict[str, bytes] = {}
+
+    async def injected_fault():
+        fault = profile.roll_fault()
+        if fault == "timeout":
+            await profile.stall()
+        if fault == "error":
+            return JSONResponse(status_code=profile.error_status, content={"errorMessage": "Injected error"})
+        return None
+
+    @router.post("/v1/speech/stream")
+    async def stream(request: Request):
+        body = await request.json()
+        error = await injected_fault()
+        if error:
+            return error
+        audio = synthesize(body.get("text", ""))
+        size = profile.chunk_size or len(audio)
+
+        async def chunks():
+            await profile.first_byte.wait()
+            for i in range(0, len(audio), size):
+                if i:
+                    await profile.chunk_interval.wait()
+                yield audio[i:i + size]
+
+        return StreamingResponse(chunks(), media_type="audio/wav")
+
+    @router.post("/v1/speech/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        error = await injected_fault()
+        if error:
+            return error
+        await profile.first_byte.wait()
+        audio = synthesize(body.get("text", ""))
+        file_id = uuid.uuid4().hex
+        files[file_id] = audio
+        return JSONResponse(content={
+            "audioFile": str(request.base_url) + f"v1/files/{file_id}.wav",
+            "audioLengthInSeconds": (len(audio) - 44) / 2 / SAMPLE_RATE,
+            "encodedAudio": None,
+        })
+
+    @router.get("/v1/files/{file_name}")
+    async def audio_file(file_name: str):
+        audio = files.get(file_name.split(".")[0])
+        if audio is None:
+            return JSONResponse(status_code=404, content={"errorMessage": "Not found"})
+        return Response(content=audio, media_type="audio/wav")
+
+    @router.get("/v1/speech/voices")
+    async def voices():
+        # Faults apply here too, so the app's health probe sees outages
+        error = await injected_fault()
+        if error:
+            return error
+        return JSONResponse(content=[
+            {"voiceId": "en-US-ken", "displayName": "Ken", "locale": "en-US", "availableStyles": ["Conversational"]},
+            {"voiceId": "en-US-natalie", "displayName": "Natalie", "locale": "en-US", "availableStyles": ["Conversational"]},
+        ])
+
+    @router.websocket("/v1/speech/stream-input")
+    async def stream_input(websocket: WebSocket):
+        fault = profile.roll_fault()
+        if fault == "error":
+            await websocket.close(code=1011)
+            return
+        await websocket.accept()
+        try:
+            while True:
+                data = json.loads(await websocket.receive_text())
+                if fault == "timeout":
+                    continue
+                # voice_config has neither; a context may end with or without text
+                if "text" in data:
+                    audio = synthesize(data["text"])
+                    size = profile.chunk_size or len(audio)
+                    await profile.first_byte.wait()
+                    for i in range(0, len(audio), size):
+                        if i:
+                            await profile.chunk_interval.wait()
+                        await websocket.send_json({
+                            "audio": base64.b64encode(audio[i:i + size]).decode("utf-8"),
+                            "context_id": data.get("context_id"),
+                        })
+                if data.get("end"):
+                    await websocket.send_json({"final": True, "context_id": data.get("context_id")})
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+
+    return router
@@ -0,0 +1,50 @@
+# emulators/openai.py
+import json
+import time
+from typing import Dict
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from .faults import ProviderProfile
+from .gemini import reply_for, _chunks
+
+
+def create_router(profile: ProviderProfile, replies: Dict[str, str]) -> APIRouter:
+    """OpenAI-compatible `/v1/chat/completions`, streamed as SSE or returned whole, with the Gemini emulator's replies."""
+    router = APIRouter()
+
+    @router.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        fault = profile.roll_fault()
+        if fault == "timeout":
+            await profile.stall()
+        if fault == "error":
+            return JSONResponse(status_code=profile.error_status, content={"error": {"message": "Injected error", "type": "server_error"}})
+
+        user_messages = [message.get("content", "") for message in body.get("messages", []) if message.get("role") == "user"]
+        text = reply_for(user_messages[-1] if user_messages else "", replies)
+        created = int(time.time())
+        await profile.first_byte.wait()
+
+        if not body.get("stream"):
+            return JSONResponse(content={
+                "id": "chatcmpl-emulator", "object": "chat.completion", "created": created, "model": body.get("model", ""),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            })
+
+        async def stream():
+            for i, piece in enumerate(_chunks(text, profile.chunk_size)):
+                if i:
+                    await profile.chunk_interval.wait()
+                chunk = {
+                    "id": "chatcmpl-emulator", "object": "chat.completion.chunk", "created": created, "model": body.get("model", ""),
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return router
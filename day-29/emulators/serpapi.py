@@ -0,0 +1,45 @@
+# emulators/serpapi.py
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+from .faults import ProviderProfile
+
+
+def create_router(profile: ProviderProfile) -> APIRouter:
+    """SerpAPI Google engine JSON (`/search` and `/search.json`) and `/account.json`."""
+    router = APIRouter()
+
+    async def search(request: Request):
+        query = request.query_params.get("q", "")
+
+        fault = profile.roll_fault()
+        if fault == "timeout":
+            await profile.stall()
+        if fault == "error":
+            return JSONResponse(status_code=profile.error_status, content={"error": "Injected error"})
+
+        await profile.first_byte.wait()
+        return JSONResponse(content={
+            "search_metadata": {"status": "Success"},
+            "search_parameters": {"q": query, "engine": request.query_params.get("engine", "google")},
+            "organic_results": [
+                {
+                    "position": i + 1,
+                    "title": f"Result {i + 1} for {query}",
+                    "link": f"https://example.com/{i + 1}",
+                    "snippet": f"Offline snippet {i + 1} about {query}.",
+                }
+                for i in range(5)
+            ],
+        })
+
+    async def account(request: Request):
+        fault = profile.roll_fault()
+        if fault == "error":
+            return JSONResponse(status_code=profile.error_status, content={"error": "Injected error"})
+        return JSONResponse(content={"account_status": "Active", "plan_searches_left": 100})
+
+    router.add_api_route("/search", search, methods=["GET"])
+    router.add_api_route("/search.json", search, methods=["GET"])
+    router.add_api_route("/account.json", account, methods=["GET"])
+    return router
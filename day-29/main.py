@@ -1,19 +1,59 @@
 # main.py
 from fastapi import FastAPI, Request, WebSocket
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import logging
 import asyncio
 import base64
-import re
+import functools
+import os
 import json
+from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor
 
 # Import services and config
 from services import stt, llm, tts
+from services.cache import response_cache, history_turns
+from services import warmup, diagnostics
+from services.loop_monitor import loop_monitor
+from services import metrics
+from services import executors
+from services.executors import ExecutorSaturated
+from services import limits
+from services.limits import RateLimited
+from services.breakers import CircuitOpen
+from services.timeline import TurnTimeline, new_turn_id
+from services import outbound
+from services import fillers
+from services import search
+from services import knowledge
+from services import tools
+from services import segmenter
+from services import speech_text
+from services import duplex
+from services import stt_idle
+from schemas import TTSRequest
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Send a per-turn "turn_timing" message to the client (used by the benchmarks)
+SEND_TURN_TIMINGS = os.getenv("SEND_TURN_TIMINGS", "0") == "1"
+# Expose /debug/stats (loop lag, threads, RSS) for load testing
+ENABLE_DEBUG_STATS = os.getenv("ENABLE_DEBUG_STATS", "0") == "1"
+
+# Served when a provider's circuit is open. Kept in memory so an outage is
+# answered in milliseconds, without touching disk or any provider.
+with open("static/fallback.mp3", "rb") as fallback_file:
+    FALLBACK_AUDIO_B64 = base64.b64encode(fallback_file.read()).decode("utf-8")
+FALLBACK_PHRASES = {
+    "assemblyai": "I can't hear you right now because speech recognition is unavailable. Please try again shortly.",
+    "gemini": "I'm having trouble thinking right now. Please try again in a moment.",
+    "murf": "My voice is unavailable at the moment, but my answers will still appear here.",
+    "serpapi": "Web search is unavailable right now. Please try again in a moment.",
+}
+
 app = FastAPI()
 
 # Mount static files for CSS/JS
@@ -21,80 +61,420 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
 
+@app.on_event("startup")
+async def start_background_services():
+    """Starts the loop-lag monitor and, optionally, the SDK pre-warm."""
+    if warmup.PREWARM_SDKS:
+        asyncio.create_task(warmup.prewarm_in_background())
+    loop_monitor.start()
+    fillers.build_at_startup()
+    asyncio.create_task(knowledge.load_in_background())
+
+    # Own the default executor so its backlog can be reported (uvloop hides it otherwise)
+    default_executor = ThreadPoolExecutor()
+    asyncio.get_running_loop().set_default_executor(default_executor)
+    metrics.EXECUTOR_QUEUE_DEPTH.set_function(lambda: default_executor._work_queue.qsize(), "default")
+
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    loop_monitor.stop()
+    executors.shutdown()
+    await search.close()
+    knowledge.close()
+
+
 @app.get("/")
 async def home(request: Request):
     """Serves the main HTML page."""
     return templates.TemplateResponse("index.html", {"request": request})
 
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint."""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.post("/tts")
+async def tts_endpoint(request: TTSRequest):
+    """Batch text-to-speech. Runs in the TTS executor's batch lane, behind live conversations."""
+    text = speech_text.normalize(request.text) if speech_text.SPEECH_NORMALIZE else request.text
+    if not text:
+        return Response(content=b"", media_type="audio/wav")
+    try:
+        await limits.acquire("murf", request.apiKey, "tts-http")
+        audio_bytes = await tts.speak_hedged(
+            text, request.apiKey, voice_id=request.voiceId, lane=executors.BATCH, hedging=False,
+        )
+    except ExecutorSaturated as e:
+        return JSONResponse(status_code=503, content={"error": str(e)})
+    except RateLimited as e:
+        return JSONResponse(status_code=429, content={"error": str(e)})
+    except tts.TTSDeadlineExceeded as e:
+        return JSONResponse(status_code=504, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": f"TTS generation failed: {e}"})
+    return Response(content=audio_bytes, media_type="audio/wav")
+
+
+@app.get("/debug/stats")
+async def debug_stats(reset: bool = False):
+    """Process and event-loop statistics used by the load generator."""
+    if not ENABLE_DEBUG_STATS:
+        return JSONResponse(status_code=404, content={"error": "Not found"})
+    return {
+        "active_sessions": metrics.ACTIVE_SESSIONS.labels().value,
+        "loop_lag": loop_monitor.snapshot(reset_max=reset),
+        "loop_stalls": loop_monitor.recent_stalls(),
+        "connections": outbound.connection_stats(),
+        **diagnostics.process_stats(),
+    }
+
+
+async def admit(websocket: WebSocket) -> bool:
+    """
+    Gets a session slot for a new connection. Over capacity the client is told
+    it is waiting (or refused when the wait list is full); audio it sends in
+    the meantime is discarded.
+    """
+    admission = limits.admission
+    if admission.try_admit():
+        return True
+    if not admission.can_wait():
+        await websocket.send_json({"type": "busy", "queued": False, "message": "The assistant is at capacity. Please try again later."})
+        await websocket.close(code=1013)
+        return False
+
+    await websocket.send_json({"type": "busy", "queued": True, "position": admission.waiting + 1, "message": "The assistant is busy. You will be connected shortly."})
+    waiter = asyncio.create_task(admission.wait())
+    while not waiter.done():
+        receive = asyncio.create_task(websocket.receive())
+        await asyncio.wait({waiter, receive}, return_when=asyncio.FIRST_COMPLETED)
+        if not receive.done():
+            receive.cancel()
+        elif receive.result()["type"] == "websocket.disconnect":
+            # A slot handed over at the same moment is passed on, not leaked
+            if not waiter.cancel() and waiter.result():
+                admission.release()
+            return False
+
+    if not waiter.result():
+        await websocket.send_json({"type": "busy", "queued": False, "message": "The assistant is still busy. Please try again later."})
+        await websocket.close(code=1013)
+        return False
+    try:
+        await websocket.send_json({"type": "admitted"})
+    except Exception:
+        admission.release()
+        raise
+    return True
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """Handles WebSocket connection for real-time transcription and voice response."""
     await websocket.accept()
+    try:
+        # The first message from the client should be the API keys
+        config = json.loads(await websocket.receive_text())
+    except Exception as e:
+        logging.info(f"WebSocket closed before configuration: {e}")
+        return
+    if not await admit(websocket):
+        return
+    # The slot is ours from here on; it is released however the session ends
+    metrics.ACTIVE_SESSIONS.inc()
+    try:
+        await run_session(websocket, config)
+    finally:
+        metrics.ACTIVE_SESSIONS.dec()
+        limits.admission.release()
+
+
+async def run_session(websocket: WebSocket, config: dict):
+    """Runs one admitted conversation until the client disconnects."""
     logging.info("WebSocket client connected.")
 
     loop = asyncio.get_event_loop()
+    session_id = uuid4().hex[:12]
+    # Every message to the client goes through this queue's writer task
+    outbound_queue = outbound.OutboundQueue(websocket, session_id)
+    outbound_queue.start()
     chat_history = []
-    api_keys = {}
+    api_keys = config.get("keys", {}) if config.get("type") == "config" else {}
+    if fillers.SEARCH_FILLERS:
+        # Builds the shared phrase bank in the background the first time a key is available
+        fillers.search_fillers.ensure(tts.DEFAULT_VOICE_ID, api_keys.get("murf"))
+    current_turn = {"task": None, "turn_id": None}
+    # Keeps the assistant's own voice, played back through the user's speakers, away from STT
+    gate = duplex.PlaybackGate()
 
-    async def handle_transcript(text: str):
+    async def handle_transcript(text: str, timeline: TurnTimeline):
         """Processes the final transcript, gets LLM and TTS responses, and streams audio."""
-        await websocket.send_json({"type": "final", "text": text})
+        turn_id = timeline.turn_id
+        metrics.INFLIGHT_TURNS.inc()
+
+        prefetched = None
+
+        def mark_sent(boundary, sent):
+            if not sent.cancelled() and sent.result():
+                boundary["sent_ms"] = timeline.mark("audio_sent")
+
+        tools_called = set()
+
+        def on_tool_call(name: str):
+            timeline.mark("tool_call", tool=name)
+            if name == "web_search" and name not in tools_called:
+                send_search_filler(timeline)
+            tools_called.add(name)
+
+        def run_tools(context: tools.ToolContext, calls):
+            # Called from the LLM worker thread; the tools run concurrently on the loop
+            return asyncio.run_coroutine_threadsafe(tools.run_calls(calls, context), loop).result()
+
         try:
-            # 1. Decide whether to search the web
-            if llm.should_search_web(text, api_keys.get("gemini")):
-                full_response, updated_history = llm.get_web_response(text, chat_history, api_keys.get("gemini"), api_keys.get("serpapi"))
+            # 1. Answer repeated questions from the cache. Only answers that were
+            #    not routed to web search are ever stored, so a hit skips routing too.
+            cached = response_cache.lookup(text, chat_history)
+            passages = []
+            if not cached and knowledge.index is not None:
+                passages = await executors.run("search", knowledge.lookup, text)
+            if cached:
+                timeline.mark("cache_hit")
+                full_response = cached.text
+                updated_history = chat_history + history_turns(text, cached.text)
+            elif knowledge.covers(passages):
+                # 2. Questions our own documents answer skip routing and web search
+                timeline.mark("knowledge_hit", source=passages[0].source, score=round(passages[0].score, 2))
+                await limits.acquire("gemini", api_keys.get("gemini"), session_id)
+                full_response, updated_history = await executors.run(
+                    "llm", llm.get_context_response, text, list(chat_history), api_keys.get("gemini"),
+                    [passage.text for passage in passages], "Reference Notes",
+                )
+            elif llm.LLM_TOOLS:
+                # 3. Let the model pick tools (web search, time, local docs) itself
+                timeline.mark("routed", tools=True)
+                await limits.acquire("gemini", api_keys.get("gemini"), session_id)
+                context = tools.ToolContext(api_keys, session_id, on_call=on_tool_call)
+                full_response, updated_history = await executors.run(
+                    "llm", llm.get_tool_response, text, list(chat_history), api_keys.get("gemini"),
+                    functools.partial(run_tools, context),
+                )
             else:
-                full_response, updated_history = llm.get_llm_response(text, chat_history, api_keys.get("gemini"))
-            
+                # 3. Otherwise decide whether to search the web. The search starts
+                #    speculatively alongside the decision and is cancelled on "no".
+                if search.SEARCH_PREFETCH:
+                    prefetched = search.prefetcher.start(text, api_keys.get("serpapi"))
+                await limits.acquire("gemini", api_keys.get("gemini"), session_id)
+                if await executors.run("llm", llm.should_search_web, text, api_keys.get("gemini")):
+                    timeline.mark("routed", search=True, prefetched=prefetched is not None)
+                    send_search_filler(timeline)
+                    speculative, prefetched = prefetched, None
+                    results = await search.results_for(text, api_keys.get("serpapi"), session_id, speculative)
+                    timeline.mark("search_done", found=results is not None)
+                    await limits.acquire("gemini", api_keys.get("gemini"), session_id)
+                    full_response, updated_history = await executors.run(
+                        "llm", llm.get_web_response, text, list(chat_history), api_keys.get("gemini"), results
+                    )
+                else:
+                    timeline.mark("routed", search=False)
+                    search.prefetcher.discard(prefetched)
+                    prefetched = None
+                    # Small talk goes to the fast tier, everything else to the full model
+                    decision = llm.estimate_complexity(text, chat_history)
+                    timeline.mark("complexity", **decision._asdict())
+                    await limits.acquire("gemini", api_keys.get("gemini"), session_id)
+                    full_response, updated_history = await executors.run(
+                        "llm", llm.get_llm_response, text, list(chat_history), api_keys.get("gemini"), decision.tier
+                    )
+                    # A successful reply extends the history; errors leave it untouched
+                    if len(updated_history) > len(chat_history):
+                        cached = response_cache.store(text, chat_history, full_response)
+
+            # The reply is not streamed, so its first token arrives with the full text
+            timeline.mark("llm_done", chars=len(full_response))
+
             # Update history for the next turn
             chat_history.clear()
             chat_history.extend(updated_history)
 
             # Send the full text response to the UI
-            await websocket.send_json({"type": "assistant", "text": full_response})
+            outbound_queue.put_nowait({"type": "assistant", "text": full_response}, outbound.TEXT, turn_id)
+            timeline.mark("assistant_sent")
 
-            # 2. Split the response into sentences
-            sentences = re.split(r'(?<=[.?!])\s+', full_response.strip())
+            # 4. Split the response into sentence-sized chunks of speakable text
+            normalizer = speech_text.SpeechNormalizer() if speech_text.SPEECH_NORMALIZE else None
+            sentences = segmenter.SentenceSegmenter(normalize=normalizer and normalizer.normalize).split(full_response)
+            metrics.SPEECH_TEXT_CHARS.labels("reply").observe(len(full_response))
+            metrics.SPEECH_TEXT_CHARS.labels("spoken").observe(sum(len(sentence) for sentence in sentences))
             
-            # 3. Process each sentence for TTS and stream audio back
+            # 5. Process each sentence for TTS and queue its audio; the writer sends it
+            #    while the next sentence is synthesized
+            pending_sends = []
             for sentence in sentences:
                 if sentence.strip():
-                    # Run the blocking TTS function in a separate thread
-                    audio_bytes = await loop.run_in_executor(
-                        None, tts.speak, sentence.strip(), api_keys.get("murf")
-                    )
+                    boundary = timeline.sentence(sentence.strip())
+                    audio_key = (tts.DEFAULT_VOICE_ID, sentence.strip())
+                    audio_bytes = cached.audio.get(audio_key) if cached else None
+                    if audio_bytes is None:
+                        await limits.acquire("murf", api_keys.get("murf"), session_id)
+                        # Deadline-bound (and optionally hedged) TTS on the TTS executor's interactive lane
+                        try:
+                            audio_bytes = await tts.speak_hedged(
+                                sentence.strip(), api_keys.get("murf"),
+                                on_first_chunk=lambda: boundary.setdefault("first_byte_ms", timeline.mark("tts_first_byte")),
+                            )
+                        except tts.TTSDeadlineExceeded as e:
+                            # Skip the stuck sentence instead of stalling the rest of the reply
+                            logging.warning(f"Skipping sentence: {e}")
+                            timeline.mark("tts_deadline")
+                            continue
+                        if cached and audio_bytes:
+                            cached.audio[audio_key] = audio_bytes
                     if audio_bytes:
+                        boundary.setdefault("first_byte_ms", timeline.mark("tts_first_byte"))
+                        boundary["done_ms"] = timeline.mark("tts_done", bytes=len(audio_bytes))
+                        timeline.add_bytes("audio", len(audio_bytes))
                         b64_audio = base64.b64encode(audio_bytes).decode('utf-8')
-                        await websocket.send_json({"type": "audio", "b64": b64_audio})
+                        sent = await outbound_queue.put({"type": "audio", "b64": b64_audio}, outbound.AUDIO, turn_id)
+                        sent.add_done_callback(functools.partial(mark_sent, boundary))
+                        pending_sends.append(sent)
+
+            await asyncio.gather(*pending_sends)
+            timeline.mark("turn_done")
+            send_turn_timing(timeline)
 
+        except asyncio.CancelledError:
+            timeline.mark("cancelled")
+            raise
+        except CircuitOpen as e:
+            logging.warning(f"Serving fallback reply: {e}")
+            timeline.mark("fallback", provider=e.provider)
+            send_fallback(e.provider, turn_id)
+            send_turn_timing(timeline)
+        except (ExecutorSaturated, RateLimited) as e:
+            logging.warning(f"Dropping turn: {e}")
+            timeline.mark("error", message=str(e))
+            outbound_queue.put_nowait({"type": "llm", "text": "Sorry, I'm handling too many requests right now. Please try again in a moment."}, outbound.TEXT)
         except Exception as e:
             logging.error(f"Error in LLM/TTS pipeline: {e}")
-            await websocket.send_json({"type": "llm", "text": "Sorry, I encountered an error."})
+            timeline.mark("error", message=str(e))
+            outbound_queue.put_nowait({"type": "llm", "text": "Sorry, I encountered an error."}, outbound.TEXT)
+        finally:
+            # The turn was cancelled or failed while the speculative search ran
+            search.prefetcher.discard(prefetched, "cancelled")
+            metrics.INFLIGHT_TURNS.dec()
+            timeline.write()
+
+    def send_turn_timing(timeline: TurnTimeline):
+        if SEND_TURN_TIMINGS:
+            outbound_queue.put_nowait({"type": "turn_timing", "stages": {
+                "llm_first_token": timeline.first("llm_done"),
+                "tts_first_byte": timeline.first("tts_first_byte"),
+                "first_audio_sent": timeline.first("audio_sent"),
+                "filler_sent": timeline.first("filler_sent"),
+            }}, outbound.TEXT, timeline.turn_id)
+
+    def send_search_filler(timeline: TurnTimeline):
+        """Plays a short pre-synthesized acknowledgement while the web search runs."""
+        if not fillers.SEARCH_FILLERS:
+            return
+        audio_bytes = fillers.search_fillers.pick(tts.DEFAULT_VOICE_ID)
+        if audio_bytes is None:
+            metrics.SEARCH_FILLERS.labels("unavailable").inc()
+            return
+        metrics.SEARCH_FILLERS.labels("sent").inc()
+
+        def mark_filler(sent):
+            if not sent.cancelled() and sent.result():
+                timeline.mark("filler_sent")
+
+        sent = outbound_queue.put_nowait({"type": "audio", "b64": base64.b64encode(audio_bytes).decode("utf-8")}, outbound.AUDIO, timeline.turn_id)
+        sent.add_done_callback(mark_filler)
 
+    def send_fallback(provider: str, turn_id: str = None):
+        metrics.FALLBACK_REPLIES.labels(provider).inc()
+        # LLM backends other than Gemini share its phrase
+        outbound_queue.put_nowait({"type": "assistant", "text": FALLBACK_PHRASES.get(provider, FALLBACK_PHRASES["gemini"])}, outbound.TEXT, turn_id)
+        outbound_queue.put_nowait({"type": "audio", "b64": FALLBACK_AUDIO_B64}, outbound.AUDIO, turn_id)
 
-    def on_final_transcript(text: str):
+    def start_turn(text: str, turn_id: str):
+        """Starts a turn, cancelling the previous one and dropping its unsent audio."""
+        previous = current_turn["task"]
+        if previous is not None and not previous.done():
+            previous.cancel()
+            outbound_queue.cancel_turn(current_turn["turn_id"])
+            outbound_queue.put_nowait({"type": "cancel", "turn_id": current_turn["turn_id"]}, outbound.CONTROL)
+        timeline = TurnTimeline(session_id, text, turn_id)
+        current_turn["turn_id"] = timeline.turn_id
+        # Sent here rather than in the task so it precedes the turn's final_patch
+        outbound_queue.put_nowait({"type": "final", "text": text, "turn_id": timeline.turn_id}, outbound.TEXT)
+        timeline.mark("final_sent")
+        current_turn["task"] = loop.create_task(handle_transcript(text, timeline))
+
+    def on_final_transcript(text: str) -> str:
         logging.info(f"Final transcript received: {text}")
-        asyncio.run_coroutine_threadsafe(handle_transcript(text), loop)
+        # Chosen here so the formatted text can name its turn even after a newer one starts
+        turn_id = new_turn_id()
+        loop.call_soon_threadsafe(start_turn, text, turn_id)
+        return turn_id
 
-    try:
-        # The first message from the client should be the API keys
-        config_data = await websocket.receive_text()
-        config = json.loads(config_data)
-        if config.get("type") == "config":
-            api_keys = config.get("keys", {})
+    def on_formatted_transcript(text: str, turn_id: str):
+        # Display only: the LLM already has the raw transcript
+        if turn_id:
+            outbound_queue.put_threadsafe({"type": "final_patch", "text": text, "turn_id": turn_id}, outbound.TEXT)
 
-        transcriber = stt.AssemblyAIStreamingTranscriber(
-            on_final_callback=on_final_transcript, 
+    def on_partial_transcript(text: str):
+        # Only the newest partial is worth sending; older queued ones are replaced
+        outbound_queue.put_threadsafe({"type": "partial", "text": text}, outbound.TEXT, coalesce_key="partial")
+
+    async def open_transcriber():
+        await limits.acquire("assemblyai", api_keys.get("assemblyai"), session_id)
+        # Connecting to AssemblyAI blocks until the session opens
+        return await executors.run(
+            "stt", stt.AssemblyAIStreamingTranscriber,
+            on_partial_callback=on_partial_transcript,
+            on_final_callback=on_final_transcript,
+            on_formatted_callback=on_formatted_transcript,
             api_key=api_keys.get("assemblyai")
         )
 
+    # Closed while the user is quiet and reopened when they speak again
+    upstream = stt_idle.IdleStream(open_transcriber)
+    try:
+        await upstream.open()
+
         while True:
-            data = await websocket.receive_bytes()
-            transcriber.stream_audio(data)
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                logging.info("WebSocket client disconnected.")
+                break
+            if message.get("bytes") is not None:
+                for chunk in gate.process(message["bytes"]):
+                    upstream.feed(chunk)
+            elif message.get("text"):
+                try:
+                    control = json.loads(message["text"])
+                except ValueError:
+                    logging.warning("Ignoring malformed control message")
+                    continue
+                if control.get("type") == "playback":
+                    gate.playback(control.get("state"))
+    except CircuitOpen as e:
+        # No transcription means no conversation: say so right away and close
+        logging.warning(f"Refusing session: {e}")
+        send_fallback(e.provider)
+        await outbound_queue.drain()
+        await websocket.close(code=1013)
     except Exception as e:
         logging.info(f"WebSocket connection closed: {e}")
     finally:
-        if 'transcriber' in locals() and transcriber:
-            transcriber.close()
+        metrics.STT_GATED_SECONDS.observe(gate.gated_seconds)
+        if gate.gated_seconds:
+            logging.info(f"Kept {gate.gated_seconds:.1f} s of playback audio from STT ({gate.barge_ins} barge-ins)")
+        if current_turn["task"] is not None:
+            current_turn["task"].cancel()
+        await outbound_queue.close()
+        await upstream.close()
         logging.info("Transcription resources released.")
@@ -4,4 +4,5 @@ from pydantic import BaseModel
 
 class TTSRequest(BaseModel):
     text: str
-    voiceId: str = "en-US-natalie"
\ No newline at end of file
+    voiceId: str = "en-US-natalie"
+    apiKey: str  # Murf key; the app has no server-side keys
\ No newline at end of file
@@ -0,0 +1,202 @@
+# services/breakers.py
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from services.metrics import BREAKER_STATE, BREAKER_TRIPS, BREAKER_REJECTIONS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Recent calls considered, and how many are needed before the breaker may trip
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+# Trip when this share of recent calls failed, or was slower than the provider's limit
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_SLOW_RATE = float(os.getenv("BREAKER_SLOW_RATE", "0.5"))
+# Seconds to fail fast before probing the provider again
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "15"))
+# Per-call latency above which a call counts as slow
+BREAKER_SLOW_SECONDS = {
+    "gemini": float(os.getenv("BREAKER_SLOW_SECONDS_GEMINI", "8")),
+    "murf": float(os.getenv("BREAKER_SLOW_SECONDS_MURF", "6")),
+    "serpapi": float(os.getenv("BREAKER_SLOW_SECONDS_SERPAPI", "5")),
+    "assemblyai": float(os.getenv("BREAKER_SLOW_SECONDS_ASSEMBLYAI", "5")),
+}
+
+
+class CircuitOpen(RuntimeError):
+    """Raised instead of calling a provider whose breaker is open."""
+
+    def __init__(self, provider: str):
+        super().__init__(f"{provider} is unavailable (circuit open)")
+        self.provider = provider
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcome and latency of recent calls to one provider and trips
+    open when too many fail or are slow. While open, calls fail immediately.
+
+    Recovery is checked in the background with the provider's probe, when one
+    is registered, using the most recent API key seen. Without a probe, the
+    first call after BREAKER_OPEN_SECONDS goes through as a half-open trial.
+    """
+
+    def __init__(self, provider: str, slow_seconds: float):
+        self.provider = provider
+        self.slow_seconds = slow_seconds
+        self.state = CLOSED
+        self.probe: Optional[Callable[[str], None]] = None
+        self._calls = deque(maxlen=BREAKER_WINDOW)
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._last_key: Optional[str] = None
+        self._lock = threading.Lock()
+        BREAKER_STATE.set_function(lambda: _STATE_VALUES[self.state], provider)
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN
+
+    @property
+    def available(self) -> bool:
+        """True when a call would be let through: closed, or due a half-open trial."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            return (
+                self.state == OPEN
+                and self.probe is None
+                and not self._trial_in_flight
+                and time.monotonic() - self._opened_at >= BREAKER_OPEN_SECONDS
+            )
+
+    def allow(self, api_key: Optional[str] = None) -> bool:
+        with self._lock:
+            if api_key:
+                self._last_key = api_key
+            if self.state == CLOSED:
+                return True
+            if (
+                self.state == OPEN
+                and self.probe is None
+                and not self._trial_in_flight
+                and time.monotonic() - self._opened_at >= BREAKER_OPEN_SECONDS
+            ):
+                self.state = HALF_OPEN
+                self._trial_in_flight = True
+                return True
+            BREAKER_REJECTIONS.labels(self.provider).inc()
+            return False
+
+    def record(self, ok: bool, seconds: float):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trial_in_flight = False
+                if ok and seconds <= self.slow_seconds:
+                    self._close()
+                else:
+                    self._open()
+                return
+            if self.state != CLOSED:
+                return
+            self._calls.append((ok, seconds > self.slow_seconds))
+            if len(self._calls) < BREAKER_MIN_CALLS:
+                return
+            errors = sum(1 for call_ok, _ in self._calls if not call_ok) / len(self._calls)
+            slow = sum(1 for _, call_slow in self._calls if call_slow) / len(self._calls)
+            if errors >= BREAKER_ERROR_RATE or slow >= BREAKER_SLOW_RATE:
+                logger.warning(f"Circuit for {self.provider} opened: {errors:.0%} errors, {slow:.0%} slow over {len(self._calls)} calls")
+                self._open()
+
+    @contextmanager
+    def guard(self, api_key: Optional[str] = None):
+        """Wraps one provider call: fails fast when open, records the outcome otherwise."""
+        if not self.allow(api_key):
+            raise CircuitOpen(self.provider)
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.record(False, time.perf_counter() - start)
+            raise
+        self.record(True, time.perf_counter() - start)
+
+    def _open(self):
+        """Called with the lock held."""
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+        BREAKER_TRIPS.labels(self.provider).inc()
+        if self.probe is not None:
+            threading.Thread(target=self._probe_until_closed, name=f"{self.provider}-probe", daemon=True).start()
+
+    def _close(self):
+        """Called with the lock held."""
+        logger.info(f"Circuit for {self.provider} closed")
+        self.state = CLOSED
+        self._calls.clear()
+
+    def _probe_until_closed(self):
+        while True:
+            time.sleep(BREAKER_OPEN_SECONDS)
+            with self._lock:
+                if self.state != OPEN:
+                    return
+                self.state = HALF_OPEN
+                api_key = self._last_key
+            start = time.perf_counter()
+            try:
+                self.probe(api_key)
+                ok = True
+            except Exception as e:
+                logger.info(f"Probe for {self.provider} failed: {e}")
+                ok = False
+            with self._lock:
+                if ok and time.perf_counter() - start <= self.slow_seconds:
+                    self._close()
+                    return
+                # Back to open without counting another trip
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+
+BREAKERS: Dict[str, CircuitBreaker] = {
+    provider: CircuitBreaker(provider, slow_seconds) for provider, slow_seconds in BREAKER_SLOW_SECONDS.items()
+}
+
+
+def register_breaker(provider: str) -> CircuitBreaker:
+    """
+    The breaker for a provider configured at runtime, such as an extra LLM
+    backend. Its slow-call limit comes from BREAKER_SLOW_SECONDS_<PROVIDER> (default 8 s).
+    """
+    if provider not in BREAKERS:
+        BREAKERS[provider] = CircuitBreaker(provider, float(os.getenv(f"BREAKER_SLOW_SECONDS_{provider.upper()}", "8")))
+    return BREAKERS[provider]
+
+
+def guard(provider: str, api_key: Optional[str] = None):
+    return BREAKERS[provider].guard(api_key)
+
+
+def register_probe(provider: str, probe: Callable[[str], None]):
+    """A cheap call that raises when the provider is still unhealthy."""
+    BREAKERS[provider].probe = probe
+
+
+def is_open(provider: str) -> bool:
+    return BREAKERS[provider].is_open
+
+
+def available(provider: str) -> bool:
+    return BREAKERS[provider].available
@@ -0,0 +1,185 @@
+# services/cache.py
+import os
+import re
+import math
+import time
+import threading
+import logging
+from collections import Counter, OrderedDict
+from typing import FrozenSet, List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "0") == "1"
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+# Trigram cosine a rephrased question needs to reuse an answer (its content words must also match)
+LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", "0.85"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256"))
+LLM_CACHE_MAX_QUERY_CHARS = 120
+
+NGRAM_SIZE = 3
+
+# Words that usually point back at earlier turns ("what about it?", "tell me more about that").
+_CONTEXT_WORDS = {
+    "it", "its", "that", "this", "those", "these", "he", "she", "him", "her",
+    "they", "them", "their", "there", "again", "more", "else", "previous", "last",
+}
+# Words that can differ between two phrasings of the same question. Every
+# other word (names, numbers, question words, negations) must match exactly.
+_FILLER_WORDS = {
+    "a", "an", "the", "is", "are", "s", "please", "me", "tell", "can", "could",
+    "would", "you", "hey", "so", "just", "um", "uh", "ok", "okay",
+}
+_NON_WORD = re.compile(r"[^a-z0-9\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Lowercases, strips punctuation and collapses whitespace."""
+    text = _NON_WORD.sub(" ", text.lower())
+    return _SPACES.sub(" ", text).strip()
+
+
+def content_words(normalized: str) -> FrozenSet[str]:
+    """The words of a normalized query that carry its meaning."""
+    return frozenset(word for word in normalized.split() if word not in _FILLER_WORDS)
+
+
+def _ngrams(normalized: str) -> Counter:
+    padded = f" {normalized} "
+    return Counter(padded[i:i + NGRAM_SIZE] for i in range(max(len(padded) - NGRAM_SIZE + 1, 1)))
+
+
+def _norm(vector: Counter) -> float:
+    return math.sqrt(sum(count * count for count in vector.values()))
+
+
+def _cosine(a: Counter, a_norm: float, b: Counter, b_norm: float) -> float:
+    if not a_norm or not b_norm:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(count * b.get(gram, 0) for gram, count in a.items())
+    return dot / (a_norm * b_norm)
+
+
+class CachedResponse:
+    """A cached LLM answer plus any TTS audio already synthesized for it."""
+
+    def __init__(self, normalized: str, text: str):
+        self.normalized = normalized
+        self.text = text
+        self.content = content_words(normalized)
+        self.vector = _ngrams(normalized)
+        self.vector_norm = _norm(self.vector)
+        self.created_at = time.monotonic()
+        # (voice_id, sentence) -> audio bytes
+        self.audio: Dict[tuple, bytes] = {}
+
+
+class ResponseCache:
+    """
+    Opt-in cache for context-independent questions.
+
+    Lookups match the normalized query, or a rephrasing of it: the same
+    content words (everything but fillers like "the", "please", "tell me")
+    and a character trigram cosine of at least `similarity`. Spelling
+    alone never makes a match, so "capital of austria" and "capital of
+    australia", or "2023" and "2024", stay different questions.
+    The cache is shared by every session, so only a session's first turn is
+    eligible; any earlier turn could have shaped the answer ("what is my
+    name"). Callers must never store answers produced from web search.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = LLM_CACHE_ENABLED,
+        ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+        similarity: float = LLM_CACHE_SIMILARITY,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+    ):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def is_eligible(self, query: str, history: List[Any]) -> bool:
+        """True when the query can be answered without the conversation so far."""
+        if not self.enabled or history:
+            return False
+        normalized = normalize_query(query)
+        if not normalized or len(normalized) > LLM_CACHE_MAX_QUERY_CHARS:
+            return False
+        return not any(word in _CONTEXT_WORDS for word in normalized.split())
+
+    def lookup(self, query: str, history: List[Any]) -> Optional[CachedResponse]:
+        """Returns the fresh entry for the same question or the closest rephrasing of it, if any."""
+        if not self.is_eligible(query, history):
+            return None
+
+        normalized = normalize_query(query)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._entries.get(normalized)
+            if entry is None:
+                entry = self._closest(normalized)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(entry.normalized)
+            self.hits += 1
+
+        logger.info(f"LLM cache hit for '{query}' -> '{entry.normalized}'")
+        return entry
+
+    def store(self, query: str, history: List[Any], response_text: str) -> Optional[CachedResponse]:
+        """Caches a response if the query is eligible. Returns the new entry."""
+        if not response_text or not self.is_eligible(query, history):
+            return None
+
+        entry = CachedResponse(normalize_query(query), response_text)
+        with self._lock:
+            self._entries[entry.normalized] = entry
+            self._entries.move_to_end(entry.normalized)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _closest(self, normalized: str) -> Optional[CachedResponse]:
+        content = content_words(normalized)
+        vector = _ngrams(normalized)
+        vector_norm = _norm(vector)
+        best, best_score = None, self.similarity
+        for candidate in self._entries.values():
+            if candidate.content != content:
+                continue
+            score = _cosine(vector, vector_norm, candidate.vector, candidate.vector_norm)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def _evict_expired(self, now: float):
+        expired = [key for key, entry in self._entries.items() if now - entry.created_at > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+
+
+def history_turns(user_query: str, response_text: str) -> List[Dict[str, Any]]:
+    """Chat history entries equivalent to a real user/model exchange."""
+    return [
+        {"role": "user", "parts": [user_query]},
+        {"role": "model", "parts": [response_text]},
+    ]
+
+
+response_cache = ResponseCache()
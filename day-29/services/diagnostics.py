@@ -0,0 +1,40 @@
+# services/diagnostics.py
+import re
+import resource
+import threading
+from collections import Counter
+from typing import Dict
+
+# "ThreadPoolExecutor-0_3" -> "ThreadPoolExecutor", "Thread-7 (_read_loop)" -> "_read_loop"
+_THREAD_SUFFIX = re.compile(r"[-_]\d+(_\d+)?$")
+_THREAD_TARGET = re.compile(r"^Thread-\d+ \((.+)\)$")
+
+
+def rss_bytes() -> int:
+    """Current resident set size; falls back to peak RSS where /proc is missing."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def thread_groups() -> Dict[str, int]:
+    """Live Python threads grouped by pool or target name."""
+    groups = Counter()
+    for thread in threading.enumerate():
+        target = _THREAD_TARGET.match(thread.name)
+        groups[target.group(1) if target else _THREAD_SUFFIX.sub("", thread.name)] += 1
+    return dict(groups)
+
+
+def process_stats() -> Dict[str, object]:
+    groups = thread_groups()
+    return {
+        "rss_bytes": rss_bytes(),
+        "threads": sum(groups.values()),
+        "thread_groups": groups,
+    }
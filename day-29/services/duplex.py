@@ -0,0 +1,148 @@
+# services/duplex.py
+import os
+import math
+import time
+import logging
+import operator
+from array import array
+from collections import deque
+from typing import Deque, List, Optional
+
+from services.metrics import BARGE_INS
+
+logger = logging.getLogger(__name__)
+
+# What reaches STT while the browser plays the assistant's audio:
+#   barge_in - only speech clearly louder than the assistant's echo (default)
+#   half     - nothing
+#   full     - everything
+STT_DUPLEX = os.getenv("STT_DUPLEX", "barge_in")
+# Gating continues this long after playback ends, while the echo dies down
+DUPLEX_TAIL_MS = int(os.getenv("DUPLEX_TAIL_MS", "300"))
+# A playback the client never reports ending is treated as over after this long
+DUPLEX_MAX_PLAYBACK_SECONDS = float(os.getenv("DUPLEX_MAX_PLAYBACK_SECONDS", "60"))
+
+# Barge-in: BARGE_IN_MIN_MS of frames louder than both BARGE_IN_MIN_RMS and
+# BARGE_IN_RATIO times the running echo estimate
+BARGE_IN_RATIO = float(os.getenv("BARGE_IN_RATIO", "3.0"))
+BARGE_IN_MIN_RMS = float(os.getenv("BARGE_IN_MIN_RMS", "500"))
+BARGE_IN_MIN_MS = int(os.getenv("BARGE_IN_MIN_MS", "200"))
+# The start of each playback only teaches the echo estimate; no barge-in is detected in it
+BARGE_IN_LEARN_MS = int(os.getenv("BARGE_IN_LEARN_MS", "300"))
+# Held-back audio kept so a barge-in reaches STT from its first syllable
+BARGE_IN_PREROLL_MS = int(os.getenv("BARGE_IN_PREROLL_MS", "500"))
+
+FRAME_MS = 20
+
+
+class PlaybackGate:
+    """
+    Decides which mic audio goes to STT while the assistant is speaking.
+
+    The browser reports `{"type": "playback", "state": "start" | "end"}`.
+    During playback, the mic mostly hears the assistant's own voice coming
+    back through the speakers. STT would bill for that audio, and could
+    even start a new turn from it. In `barge_in` mode the energy of each
+    20 ms frame is compared with a running estimate of that echo. The
+    estimate is learned from the first BARGE_IN_LEARN_MS of each playback
+    and updated from the quieter frames after it. Once the user has been
+    clearly louder for BARGE_IN_MIN_MS, the gate opens for the rest of the
+    playback, and the held-back pre-roll is sent first. All other audio
+    during playback is dropped and counted in `gated_seconds`.
+    """
+
+    def __init__(self, sample_rate: int = 16000, mode: str = STT_DUPLEX):
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.gated_seconds = 0.0
+        self.barge_ins = 0
+        self._frame_samples = sample_rate * FRAME_MS // 1000
+        self._playing_since: Optional[float] = None
+        self._tail_until = 0.0
+        self._open = False              # the user barged in during this playback
+        self._loud_ms = 0
+        self._learned_ms = 0
+        # Kept between playbacks: the echo path rarely changes within a session
+        self._echo_rms = BARGE_IN_MIN_RMS / BARGE_IN_RATIO
+        self._preroll: Deque[bytes] = deque()
+        self._preroll_seconds = 0.0
+
+    def playback(self, state: str):
+        """Records a playback start or end reported by the client."""
+        now = time.monotonic()
+        if state == "start":
+            if not self._gating(now):
+                self._reset()
+            self._playing_since = now
+        elif state == "end" and self._playing_since is not None:
+            self._playing_since = None
+            self._tail_until = now + DUPLEX_TAIL_MS / 1000
+
+    @property
+    def playing(self) -> bool:
+        return self._playing_since is not None
+
+    def process(self, pcm: bytes) -> List[bytes]:
+        """Returns the audio to send to STT for one mic chunk: nothing, the chunk, or the pre-roll and the chunk."""
+        if self.mode == "full" or not self._gating(time.monotonic()):
+            if self._preroll or self._open:
+                self._reset()
+            return [pcm]
+        if self._open:
+            return [pcm]
+        if self.mode == "barge_in" and self._barge_in(pcm):
+            self._open = True
+            self.barge_ins += 1
+            BARGE_INS.inc()
+            logger.info(f"Barge-in over an echo estimate of {self._echo_rms:.0f} RMS")
+            released = list(self._preroll) + [pcm]
+            self.gated_seconds -= self._preroll_seconds
+            self._preroll.clear()
+            self._preroll_seconds = 0.0
+            return released
+        self._hold(pcm)
+        return []
+
+    def _gating(self, now: float) -> bool:
+        if self._playing_since is not None:
+            if now - self._playing_since <= DUPLEX_MAX_PLAYBACK_SECONDS:
+                return True
+            logger.warning("Playback end never reported; resuming STT")
+            self._playing_since = None
+        return now < self._tail_until
+
+    def _barge_in(self, pcm: bytes) -> bool:
+        samples = array("h", pcm[:len(pcm) - len(pcm) % 2])
+        for start in range(0, len(samples) - self._frame_samples + 1, self._frame_samples):
+            frame = samples[start:start + self._frame_samples]
+            rms = math.sqrt(sum(map(operator.mul, frame, frame)) / len(frame))
+            if self._learned_ms < BARGE_IN_LEARN_MS:
+                self._learned_ms += FRAME_MS
+                self._echo_rms = max(self._echo_rms, rms)
+            elif rms >= max(BARGE_IN_MIN_RMS, self._echo_rms * BARGE_IN_RATIO):
+                self._loud_ms += FRAME_MS
+                if self._loud_ms >= BARGE_IN_MIN_MS:
+                    return True
+            else:
+                self._loud_ms = 0
+                # Rise quickly with louder echo, fall back slowly
+                rate = 0.3 if rms > self._echo_rms else 0.02
+                self._echo_rms += (rms - self._echo_rms) * rate
+        return False
+
+    def _hold(self, pcm: bytes):
+        seconds = len(pcm) / 2 / self.sample_rate
+        self.gated_seconds += seconds
+        if self.mode != "barge_in":
+            return
+        self._preroll.append(pcm)
+        self._preroll_seconds += seconds
+        while len(self._preroll) > 1 and self._preroll_seconds - len(self._preroll[0]) / 2 / self.sample_rate >= BARGE_IN_PREROLL_MS / 1000:
+            self._preroll_seconds -= len(self._preroll.popleft()) / 2 / self.sample_rate
+
+    def _reset(self):
+        self._open = False
+        self._loud_ms = 0
+        self._learned_ms = 0
+        self._preroll.clear()
+        self._preroll_seconds = 0.0
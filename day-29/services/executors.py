@@ -0,0 +1,150 @@
+# services/executors.py
+import os
+import time
+import asyncio
+import logging
+import threading
+import functools
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict
+
+from services.metrics import EXECUTOR_QUEUE_DEPTH, EXECUTOR_QUEUE_WAIT_SECONDS, EXECUTOR_REJECTIONS, EXECUTOR_BUSY_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Lanes: live WebSocket turns always go ahead of batch HTTP work
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+# Worker threads per upstream; sized by how many calls each provider should see at once
+EXECUTOR_STT_WORKERS = int(os.getenv("EXECUTOR_STT_WORKERS", "8"))
+EXECUTOR_LLM_WORKERS = int(os.getenv("EXECUTOR_LLM_WORKERS", "8"))
+# Streams from LLM backends; a turn that fails over holds two for a while
+EXECUTOR_LLM_STREAM_WORKERS = int(os.getenv("EXECUTOR_LLM_STREAM_WORKERS", "16"))
+EXECUTOR_TTS_WORKERS = int(os.getenv("EXECUTOR_TTS_WORKERS", "8"))
+EXECUTOR_SEARCH_WORKERS = int(os.getenv("EXECUTOR_SEARCH_WORKERS", "4"))
+# Queued calls per executor before new ones are rejected
+EXECUTOR_MAX_QUEUE = int(os.getenv("EXECUTOR_MAX_QUEUE", "32"))
+# Share of workers batch work may occupy; the rest stay free for live turns
+EXECUTOR_BATCH_SHARE = float(os.getenv("EXECUTOR_BATCH_SHARE", "0.5"))
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when an executor's queue is full."""
+
+
+class _WorkItem:
+    def __init__(self, fn: Callable, lane: str):
+        self.fn = fn
+        self.lane = lane
+        self.future = Future()
+        self.queued_at = time.perf_counter()
+
+
+class LaneExecutor:
+    """
+    A bounded thread pool with two lanes. Workers always take interactive work
+    first, and batch work may occupy at most `batch_workers` threads at once,
+    so a burst of batch calls cannot hold every worker. Threads are started on
+    demand, like ThreadPoolExecutor.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int = EXECUTOR_MAX_QUEUE, batch_share: float = EXECUTOR_BATCH_SHARE):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max_queue
+        self.batch_workers = max(1, int(self.max_workers * batch_share))
+        self._queues = {INTERACTIVE: deque(), BATCH: deque()}
+        self._condition = threading.Condition()
+        self._threads = []
+        self._idle = 0
+        self._busy = 0
+        self._busy_batch = 0
+        self._shutdown = False
+        EXECUTOR_QUEUE_DEPTH.set_function(self.queue_depth, name)
+        EXECUTOR_BUSY_WORKERS.set_function(lambda: self._busy, name)
+
+    def queue_depth(self) -> int:
+        return len(self._queues[INTERACTIVE]) + len(self._queues[BATCH])
+
+    def submit(self, fn: Callable, *args, lane: str = INTERACTIVE, **kwargs) -> Future:
+        item = _WorkItem(functools.partial(fn, *args, **kwargs), lane)
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError(f"{self.name} executor is shut down")
+            if self.queue_depth() >= self.max_queue:
+                EXECUTOR_REJECTIONS.labels(self.name, lane).inc()
+                raise ExecutorSaturated(f"{self.name} executor is saturated ({self.max_queue} calls queued)")
+            self._queues[lane].append(item)
+            if self._idle == 0 and len(self._threads) < self.max_workers:
+                self._start_worker()
+            self._condition.notify()
+        return item.future
+
+    def _start_worker(self):
+        thread = threading.Thread(target=self._work, name=f"{self.name}-executor_{len(self._threads)}", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def _next_item(self):
+        """Called with the condition held; returns None when nothing is runnable."""
+        if self._queues[INTERACTIVE]:
+            return self._queues[INTERACTIVE].popleft()
+        if self._queues[BATCH] and self._busy_batch < self.batch_workers:
+            return self._queues[BATCH].popleft()
+        return None
+
+    def _work(self):
+        while True:
+            with self._condition:
+                self._idle += 1
+                item = self._next_item()
+                while item is None and not self._shutdown:
+                    self._condition.wait()
+                    item = self._next_item()
+                self._idle -= 1
+                if item is None:
+                    return
+                self._busy += 1
+                if item.lane == BATCH:
+                    self._busy_batch += 1
+
+            EXECUTOR_QUEUE_WAIT_SECONDS.labels(self.name, item.lane).observe(time.perf_counter() - item.queued_at)
+            if item.future.set_running_or_notify_cancel():
+                try:
+                    item.future.set_result(item.fn())
+                except BaseException as e:
+                    item.future.set_exception(e)
+
+            with self._condition:
+                self._busy -= 1
+                if item.lane == BATCH:
+                    self._busy_batch -= 1
+                    # A batch slot opened up; wake a worker that may be waiting on it
+                    self._condition.notify()
+
+    def shutdown(self):
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+
+
+EXECUTORS: Dict[str, LaneExecutor] = {
+    "stt": LaneExecutor("stt", EXECUTOR_STT_WORKERS),
+    "llm": LaneExecutor("llm", EXECUTOR_LLM_WORKERS),
+    # Separate from "llm": router calls running there wait on these streams
+    "llm_stream": LaneExecutor("llm_stream", EXECUTOR_LLM_STREAM_WORKERS),
+    "tts": LaneExecutor("tts", EXECUTOR_TTS_WORKERS),
+    "search": LaneExecutor("search", EXECUTOR_SEARCH_WORKERS),
+}
+
+
+async def run(executor: str, fn: Callable, *args, lane: str = INTERACTIVE, **kwargs):
+    """Runs a blocking call on the named executor and awaits its result."""
+    return await asyncio.wrap_future(EXECUTORS[executor].submit(fn, *args, lane=lane, **kwargs))
+
+
+def shutdown():
+    for executor in EXECUTORS.values():
+        executor.shutdown()
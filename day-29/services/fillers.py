@@ -0,0 +1,102 @@
+# services/fillers.py
+import os
+import asyncio
+import hashlib
+import logging
+import itertools
+from typing import Dict, List, Optional
+
+from services import tts, executors, limits, breakers
+
+logger = logging.getLogger(__name__)
+
+# Play a short acknowledgement as soon as a turn is routed to web search
+SEARCH_FILLERS = os.getenv("SEARCH_FILLERS", "1") == "1"
+# Optional server-side Murf key used to build the bank at startup; otherwise the
+# first session that brings a key builds it in the background
+MURF_API_KEY = os.getenv("MURF_API_KEY")
+
+SEARCH_PHRASES = [
+    "Let me look that up.",
+    "One moment, I'll check the web.",
+    "Give me a second to search for that.",
+    "Let me find the latest on that.",
+]
+
+
+def _file_name(voice_id: str, phrase: str) -> str:
+    digest = hashlib.sha1(phrase.encode("utf-8")).hexdigest()[:10]
+    return f"filler_{voice_id}_{digest}.wav"
+
+
+class PhraseBank:
+    """
+    Pre-synthesized filler audio per voice, shared by all sessions. Audio is
+    kept in memory and on disk under uploads/, so a restart loads it instead
+    of synthesizing again.
+    """
+
+    def __init__(self, phrases: List[str]):
+        self.phrases = phrases
+        self._audio: Dict[str, List[bytes]] = {}
+        self._building: Dict[str, asyncio.Task] = {}
+        self._rotation = itertools.count()
+
+    def load(self, voice_id: str) -> bool:
+        """Loads a complete set for a voice from disk; True when every phrase was found."""
+        clips = []
+        for phrase in self.phrases:
+            path = tts.UPLOADS_DIR / _file_name(voice_id, phrase)
+            if not path.is_file() or path.stat().st_size == 0:
+                return False
+            clips.append(path.read_bytes())
+        self._audio[voice_id] = clips
+        return True
+
+    def ensure(self, voice_id: str, api_key: Optional[str]):
+        """Starts a background build for a voice that has no phrases yet."""
+        if voice_id in self._audio or voice_id in self._building or not api_key:
+            return
+        if self.load(voice_id):
+            return
+        task = asyncio.get_running_loop().create_task(self._build(voice_id, api_key))
+        self._building[voice_id] = task
+
+    async def _build(self, voice_id: str, api_key: str):
+        clips = []
+        try:
+            for phrase in self.phrases:
+                await limits.acquire("murf", api_key, "fillers")
+                # Batch lane: building the bank never delays a live turn
+                audio_bytes = await executors.run(
+                    "tts", tts.speak, phrase, api_key, output_file="filler_build.wav",
+                    voice_id=voice_id, lane=executors.BATCH,
+                )
+                if not audio_bytes:
+                    raise RuntimeError(f"no audio for {phrase!r}")
+                clips.append(audio_bytes)
+            # Persist only complete sets, so a half-built bank is never loaded
+            for phrase, audio_bytes in zip(self.phrases, clips):
+                (tts.UPLOADS_DIR / _file_name(voice_id, phrase)).write_bytes(audio_bytes)
+            self._audio[voice_id] = clips
+            logger.info(f"Built {len(clips)} filler phrases for {voice_id}")
+        except Exception as e:
+            logger.warning(f"Could not build filler phrases for {voice_id}: {e}")
+        finally:
+            del self._building[voice_id]
+
+    def pick(self, voice_id: str) -> Optional[bytes]:
+        """The next phrase for a voice, rotating so consecutive turns vary; None when not built."""
+        clips = self._audio.get(voice_id)
+        if not clips or breakers.is_open("murf"):
+            return None
+        return clips[next(self._rotation) % len(clips)]
+
+
+search_fillers = PhraseBank(SEARCH_PHRASES)
+
+
+def build_at_startup():
+    """Loads the default voice's bank from disk, or builds it when MURF_API_KEY is set."""
+    if SEARCH_FILLERS and not search_fillers.load(tts.DEFAULT_VOICE_ID):
+        search_fillers.ensure(tts.DEFAULT_VOICE_ID, MURF_API_KEY)
@@ -0,0 +1,263 @@
+# services/knowledge.py
+import os
+import re
+import json
+import math
+import mmap
+import heapq
+import time
+import logging
+from array import array
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from services.metrics import KNOWLEDGE_LOOKUP_SECONDS, KNOWLEDGE_LOOKUPS, KNOWLEDGE_PASSAGES
+from services import executors
+
+logger = logging.getLogger(__name__)
+
+# Directory of .md/.txt documents to answer from before going to the web; unset disables it
+KNOWLEDGE_DIR = os.getenv("KNOWLEDGE_DIR")
+# Where the index files live (default: <KNOWLEDGE_DIR>/.index)
+KNOWLEDGE_INDEX_DIR = os.getenv("KNOWLEDGE_INDEX_DIR")
+# A lookup answers the turn when its best passage scores at least this (BM25)...
+KNOWLEDGE_MIN_SCORE = float(os.getenv("KNOWLEDGE_MIN_SCORE", "4"))
+# ...and contains at least this share of the query's terms
+KNOWLEDGE_MIN_COVERAGE = float(os.getenv("KNOWLEDGE_MIN_COVERAGE", "0.6"))
+KNOWLEDGE_TOP_K = int(os.getenv("KNOWLEDGE_TOP_K", "3"))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Passages are built from paragraphs and capped at this many words
+PASSAGE_WORDS = 120
+DOCUMENT_SUFFIXES = (".md", ".txt")
+INDEX_VERSION = 1
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or our "
+    "should the this to was what when where which who why will with you your".split()
+)
+
+# Each passage's row in passages.tbl: byte offset and length in passages.bin, length in terms, source index
+_ROW = 4
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class Passage(NamedTuple):
+    text: str
+    source: str
+    score: float
+    coverage: float
+
+
+def _split_passages(text: str) -> List[str]:
+    """Paragraphs, with short ones merged and long ones cut at PASSAGE_WORDS."""
+    passages, current = [], []
+    for paragraph in re.split(r"\n\s*\n", text):
+        words = paragraph.split()
+        while len(words) > PASSAGE_WORDS:
+            if current:
+                passages.append(" ".join(current))
+                current = []
+            passages.append(" ".join(words[:PASSAGE_WORDS]))
+            words = words[PASSAGE_WORDS:]
+        if current and len(current) + len(words) > PASSAGE_WORDS:
+            passages.append(" ".join(current))
+            current = []
+        current.extend(words)
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def _documents(root: Path) -> List[Path]:
+    return sorted(
+        path for path in root.rglob("*")
+        if path.is_file() and path.suffix in DOCUMENT_SUFFIXES and ".index" not in path.parts
+    )
+
+
+def _fingerprint(root: Path) -> List[list]:
+    return [[str(path.relative_to(root)), path.stat().st_size, path.stat().st_mtime_ns] for path in _documents(root)]
+
+
+def build(root: Path, index_dir: Path):
+    """Indexes every document under `root` into `index_dir`."""
+    start = time.perf_counter()
+    index_dir.mkdir(parents=True, exist_ok=True)
+    (index_dir / "meta.json").unlink(missing_ok=True)
+    sources = [str(path.relative_to(root)) for path in _documents(root)]
+    postings: Dict[str, array] = {}
+    table = array("Q")
+    total_terms = 0
+
+    with open(index_dir / "passages.bin", "wb") as texts:
+        offset = 0
+        for source_id, source in enumerate(sources):
+            for passage in _split_passages((root / source).read_text(encoding="utf-8", errors="replace")):
+                passage_id = len(table) // _ROW
+                tokens = tokenize(passage)
+                counts: Dict[str, int] = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                for token, tf in counts.items():
+                    postings.setdefault(token, array("I")).extend((passage_id, tf))
+                encoded = passage.encode("utf-8")
+                texts.write(encoded)
+                table.extend((offset, len(encoded), len(tokens), source_id))
+                offset += len(encoded)
+                total_terms += len(tokens)
+
+    terms = {}
+    with open(index_dir / "postings.bin", "wb") as postings_file:
+        position = 0
+        for term in sorted(postings):
+            entries = postings[term]
+            entries.tofile(postings_file)
+            # Offset in 4-byte words, and document frequency
+            terms[term] = [position, len(entries) // 2]
+            position += len(entries)
+    with open(index_dir / "passages.tbl", "wb") as table_file:
+        table.tofile(table_file)
+    with open(index_dir / "terms.json", "w", encoding="utf-8") as terms_file:
+        json.dump(terms, terms_file)
+
+    passage_count = len(table) // _ROW
+    # Written last: an index without a current meta.json is rebuilt
+    with open(index_dir / "meta.json", "w", encoding="utf-8") as meta_file:
+        json.dump({
+            "version": INDEX_VERSION,
+            "fingerprint": _fingerprint(root),
+            "sources": sources,
+            "passages": passage_count,
+            "avgdl": total_terms / passage_count if passage_count else 0.0,
+        }, meta_file)
+    logger.info(f"Indexed {passage_count} passages from {len(sources)} documents in {time.perf_counter() - start:.2f}s")
+
+
+def _map(path: Path, typecode: str):
+    """Read-only view of a file; pages are read from disk only when a lookup touches them."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None, memoryview(b"").cast(typecode)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mapped, memoryview(mapped).cast(typecode)
+
+
+class KnowledgeIndex:
+    """
+    BM25 over memory-mapped postings. Opening an index reads only the term
+    dictionary; postings and passage text stay on disk until queried.
+    """
+
+    def __init__(self, index_dir: Path):
+        with open(index_dir / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(index_dir / "terms.json", encoding="utf-8") as f:
+            self.terms: Dict[str, list] = json.load(f)
+        self.sources: List[str] = meta["sources"]
+        self.passages: int = meta["passages"]
+        self.avgdl: float = meta["avgdl"] or 1.0
+        self._maps = []
+        mapped, self._postings = _map(index_dir / "postings.bin", "I")
+        self._maps.append(mapped)
+        mapped, self._table = _map(index_dir / "passages.tbl", "Q")
+        self._maps.append(mapped)
+        self._texts_map, self._texts = _map(index_dir / "passages.bin", "B")
+        self._maps.append(self._texts_map)
+
+    def search(self, query: str, top_k: int = KNOWLEDGE_TOP_K) -> List[Passage]:
+        query_terms = set(tokenize(query))
+        if not query_terms or not self.passages:
+            return []
+        scores: Dict[int, float] = {}
+        matched: Dict[int, int] = {}
+        for term in query_terms:
+            entry = self.terms.get(term)
+            if entry is None:
+                continue
+            offset, df = entry
+            idf = math.log(1 + (self.passages - df + 0.5) / (df + 0.5))
+            entries = self._postings[offset:offset + 2 * df]
+            for i in range(0, 2 * df, 2):
+                passage_id, tf = entries[i], entries[i + 1]
+                length = self._table[passage_id * _ROW + 2]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self.avgdl)
+                scores[passage_id] = scores.get(passage_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+                matched[passage_id] = matched.get(passage_id, 0) + 1
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [self._passage(passage_id, score, matched[passage_id] / len(query_terms)) for passage_id, score in best]
+
+    def _passage(self, passage_id: int, score: float, coverage: float) -> Passage:
+        row = passage_id * _ROW
+        offset, length, source_id = self._table[row], self._table[row + 1], self._table[row + 3]
+        text = bytes(self._texts[offset:offset + length]).decode("utf-8")
+        return Passage(text, self.sources[source_id], score, coverage)
+
+    def close(self):
+        self._postings.release()
+        self._table.release()
+        self._texts.release()
+        for mapped in self._maps:
+            if mapped is not None:
+                mapped.close()
+
+
+def _is_current(root: Path, index_dir: Path) -> bool:
+    try:
+        with open(index_dir / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return meta.get("version") == INDEX_VERSION and meta.get("fingerprint") == _fingerprint(root)
+
+
+def open_index(root: Path, index_dir: Path) -> KnowledgeIndex:
+    """Opens the index, rebuilding it first when the documents changed."""
+    if not _is_current(root, index_dir):
+        build(root, index_dir)
+    return KnowledgeIndex(index_dir)
+
+
+index: Optional[KnowledgeIndex] = None
+
+
+async def load_in_background():
+    """Opens (or builds) the index on the search executor's batch lane after startup."""
+    global index
+    if not KNOWLEDGE_DIR:
+        return
+    root = Path(KNOWLEDGE_DIR)
+    index_dir = Path(KNOWLEDGE_INDEX_DIR) if KNOWLEDGE_INDEX_DIR else root / ".index"
+    try:
+        index = await executors.run("search", open_index, root, index_dir, lane=executors.BATCH)
+    except Exception as e:
+        logger.error(f"Could not load the knowledge index from {root}: {e}")
+        return
+    KNOWLEDGE_PASSAGES.set(index.passages)
+
+
+def lookup(query: str) -> List[Passage]:
+    """Best passages for a query; empty while the index is not loaded."""
+    if index is None:
+        return []
+    with KNOWLEDGE_LOOKUP_SECONDS.time():
+        passages = index.search(query)
+    KNOWLEDGE_LOOKUPS.labels("hit" if covers(passages) else "miss").inc()
+    return passages
+
+
+def covers(passages: List[Passage]) -> bool:
+    """Whether the corpus answers the query well enough to skip web search."""
+    return bool(passages) and passages[0].score >= KNOWLEDGE_MIN_SCORE and passages[0].coverage >= KNOWLEDGE_MIN_COVERAGE
+
+
+def close():
+    global index
+    if index is not None:
+        index.close()
+        index = None
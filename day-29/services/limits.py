@@ -0,0 +1,283 @@
+# services/limits.py
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Tuple
+
+from services.metrics import (
+    ADMISSION_WAIT_SECONDS, ADMISSION_WAITING, ADMISSION_REJECTIONS,
+    RATE_LIMIT_WAIT_SECONDS, RATE_LIMIT_REJECTIONS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Concurrent /ws sessions, and how many more may wait for a slot (0 = unlimited sessions)
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "32"))
+ADMISSION_QUEUE = int(os.getenv("ADMISSION_QUEUE", "16"))
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "30"))
+
+# Upstream request rates as "<requests per second>/<burst>"; "0" disables a limit.
+# The provider-wide bucket protects our account, the per-key bucket is applied to
+# each API key separately.
+RATE_LIMITS = {
+    "gemini": (os.getenv("RATE_LIMIT_GEMINI", "10/20"), os.getenv("RATE_LIMIT_GEMINI_PER_KEY", "5/10")),
+    "murf": (os.getenv("RATE_LIMIT_MURF", "20/40"), os.getenv("RATE_LIMIT_MURF_PER_KEY", "10/20")),
+    "serpapi": (os.getenv("RATE_LIMIT_SERPAPI", "2/5"), os.getenv("RATE_LIMIT_SERPAPI_PER_KEY", "1/3")),
+    "assemblyai": (os.getenv("RATE_LIMIT_ASSEMBLYAI", "5/10"), os.getenv("RATE_LIMIT_ASSEMBLYAI_PER_KEY", "2/5")),
+}
+# Longest a call may wait for a token before it is rejected
+RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "5"))
+
+_MAX_KEY_BUCKETS = 1024
+
+
+class RateLimited(RuntimeError):
+    """Raised when a call could not get an upstream token in time."""
+
+
+def parse_limit(spec: str) -> Optional[Tuple[float, float]]:
+    rate, _, burst = spec.partition("/")
+    rate = float(rate)
+    if rate <= 0:
+        return None
+    return rate, float(burst or max(1.0, rate))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= 1
+
+    def take(self):
+        self.tokens -= 1
+
+    def seconds_until_token(self, now: float) -> float:
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    @property
+    def full(self) -> bool:
+        return self.tokens >= self.burst
+
+
+def key_id(api_key: Optional[str]) -> str:
+    """A stable, non-reversible label for an API key."""
+    return hashlib.sha256((api_key or "").encode()).hexdigest()[:12]
+
+
+class ProviderLimiter:
+    """
+    Token buckets for one provider: one shared bucket plus one per API key.
+
+    Calls that cannot proceed at once wait in per-session queues, which are
+    served round-robin, so one busy session cannot starve the others. A
+    session whose key is exhausted does not hold up sessions using other keys.
+    """
+
+    def __init__(self, provider: str, limit: Optional[Tuple[float, float]], key_limit: Optional[Tuple[float, float]], max_wait: float = RATE_LIMIT_MAX_WAIT_SECONDS):
+        self.provider = provider
+        self.bucket = TokenBucket(*limit) if limit else None
+        self.key_limit = key_limit
+        self.max_wait = max_wait
+        self._key_buckets: Dict[str, TokenBucket] = {}
+        # session -> waiters (future, key bucket), served round-robin
+        self._waiting: "OrderedDict[str, deque]" = OrderedDict()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def _key_bucket(self, api_key: Optional[str]) -> Optional[TokenBucket]:
+        if not self.key_limit:
+            return None
+        key = key_id(api_key)
+        bucket = self._key_buckets.get(key)
+        if bucket is None:
+            if len(self._key_buckets) >= _MAX_KEY_BUCKETS:
+                # Full buckets carry no state worth keeping
+                for idle in [k for k, b in self._key_buckets.items() if b.full]:
+                    del self._key_buckets[idle]
+            bucket = self._key_buckets[key] = TokenBucket(*self.key_limit)
+        return bucket
+
+    def _try_take(self, key_bucket: Optional[TokenBucket], now: float) -> bool:
+        if self.bucket is not None and not self.bucket.available(now):
+            return False
+        if key_bucket is not None and not key_bucket.available(now):
+            return False
+        if self.bucket is not None:
+            self.bucket.take()
+        if key_bucket is not None:
+            key_bucket.take()
+        return True
+
+    def try_acquire(self, api_key: Optional[str]) -> bool:
+        """Takes a token only if one is free right now and nobody is queued."""
+        if self.bucket is None and not self.key_limit:
+            return True
+        return not self._waiting and self._try_take(self._key_bucket(api_key), time.monotonic())
+
+    async def acquire(self, api_key: Optional[str], session_id: str = ""):
+        if self.bucket is None and not self.key_limit:
+            return
+        key_bucket = self._key_bucket(api_key)
+        if not self._waiting and self._try_take(key_bucket, time.monotonic()):
+            RATE_LIMIT_WAIT_SECONDS.labels(self.provider).observe(0.0)
+            return
+
+        start = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(session_id, deque()).append((waiter, key_bucket))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            self._forget(session_id, waiter)
+            raise
+        # The dispatcher may have granted the token just as the wait timed out
+        if not waiter.done():
+            self._forget(session_id, waiter)
+            RATE_LIMIT_REJECTIONS.labels(self.provider).inc()
+            raise RateLimited(f"{self.provider} rate limit: no token within {self.max_wait:g}s")
+        RATE_LIMIT_WAIT_SECONDS.labels(self.provider).observe(time.perf_counter() - start)
+
+    def _forget(self, session_id: str, waiter: asyncio.Future):
+        queue = self._waiting.get(session_id)
+        if queue is None:
+            return
+        for entry in list(queue):
+            if entry[0] is waiter:
+                queue.remove(entry)
+        if not queue:
+            del self._waiting[session_id]
+        if not waiter.done():
+            waiter.cancel()
+
+    async def _dispatch(self):
+        while self._waiting:
+            now = time.monotonic()
+            granted = False
+            for session_id in list(self._waiting):
+                queue = self._waiting[session_id]
+                waiter, key_bucket = queue[0]
+                if waiter.done():
+                    queue.popleft()
+                elif self._try_take(key_bucket, now):
+                    queue.popleft()
+                    waiter.set_result(None)
+                    granted = True
+                if not queue:
+                    del self._waiting[session_id]
+                elif granted:
+                    # Served: go to the back of the rotation
+                    self._waiting.move_to_end(session_id)
+                if granted:
+                    break
+            if granted:
+                continue
+
+            delays = [self.bucket.seconds_until_token(now)] if self.bucket is not None else []
+            delays.extend(queue[0][1].seconds_until_token(now) for queue in self._waiting.values() if queue[0][1] is not None)
+            await asyncio.sleep(min(max(min(delays, default=0.01), 0.001), 0.1))
+
+
+LIMITERS: Dict[str, ProviderLimiter] = {
+    provider: ProviderLimiter(provider, parse_limit(limit), parse_limit(key_limit))
+    for provider, (limit, key_limit) in RATE_LIMITS.items()
+}
+
+
+async def acquire(provider: str, api_key: Optional[str], session_id: str = ""):
+    """Waits for a token for one upstream call; raises RateLimited after the max wait."""
+    await LIMITERS[provider].acquire(api_key, session_id)
+
+
+def try_acquire(provider: str, api_key: Optional[str]) -> bool:
+    """Non-blocking acquire for optional work such as hedged requests."""
+    return LIMITERS[provider].try_acquire(api_key)
+
+
+class AdmissionController:
+    """
+    Caps concurrent sessions. Connections over the cap wait in FIFO order
+    for up to `max_wait` seconds; when the wait list is full they are refused.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, max_waiting: int = ADMISSION_QUEUE, max_wait: float = ADMISSION_MAX_WAIT_SECONDS):
+        self.max_sessions = max_sessions
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters: deque = deque()
+        ADMISSION_WAITING.set_function(lambda: len(self._waiters))
+
+    def try_admit(self) -> bool:
+        if self.max_sessions <= 0 or (self.active < self.max_sessions and not self._waiters):
+            self.active += 1
+            ADMISSION_WAIT_SECONDS.observe(0.0)
+            return True
+        return False
+
+    def can_wait(self) -> bool:
+        if len(self._waiters) >= self.max_waiting:
+            ADMISSION_REJECTIONS.labels("queue_full").inc()
+            return False
+        return True
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def wait(self) -> bool:
+        """Waits for a slot; False when `max_wait` passed first."""
+        start = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        # release() may have handed over a slot just as the wait timed out
+        if not waiter.done():
+            self._abandon(waiter)
+            ADMISSION_REJECTIONS.labels("timeout").inc()
+            return False
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - start)
+        return True
+
+    def _abandon(self, waiter: asyncio.Future):
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+        if waiter.done():
+            # A slot was already handed to this waiter; pass it on
+            self.release()
+        else:
+            waiter.cancel()
+
+    def release(self):
+        # Hand the slot straight to the next waiter, if any
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.active -= 1
+
+
+admission = AdmissionController()
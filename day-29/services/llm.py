@@ -1,12 +1,37 @@
 # services/llm.py
-import google.generativeai as genai
-from typing import List, Dict, Any, Tuple
-from serpapi import GoogleSearch
+import os
+import re
+import time
+from typing import Callable, List, Dict, Any, NamedTuple, Optional, Tuple
 
 # Configure logging
 import logging
 logger = logging.getLogger(__name__)
 
+from services.metrics import ROUTING_SECONDS, LLM_FIRST_TOKEN_SECONDS, LLM_TOTAL_SECONDS, LLM_TIER_SECONDS, LLM_FAST_FALLBACKS, UPSTREAM_ERRORS
+from services import breakers, tools, llm_backends
+from services.llm_backends import configure_gemini
+from services.breakers import CircuitOpen
+
+# Provider SDKs are imported on first use so that importing this module stays
+# cheap at cold start. Web search lives in services/search.py; the backends
+# replies are routed between live in services/llm_backends.py.
+
+# Let the model call tools (services/tools.py) instead of routing with should_search_web
+LLM_TOOLS = os.getenv("LLM_TOOLS", "0") == "1"
+# Tool-call round trips allowed per turn before the model must answer
+TOOL_MAX_ROUNDS = int(os.getenv("TOOL_MAX_ROUNDS", "3"))
+# Send trivial turns to a smaller model with a short prompt and reply cap (opt-in)
+COMPLEXITY_ROUTING = os.getenv("COMPLEXITY_ROUTING", "0") == "1"
+# Turns scoring below this use the fast tier (see estimate_complexity)
+COMPLEXITY_THRESHOLD = float(os.getenv("COMPLEXITY_THRESHOLD", "1.0"))
+# Fast tier backends, in LLM_BACKENDS syntax, and their reply length cap
+LLM_FAST_BACKENDS = os.getenv("LLM_FAST_BACKENDS", "gemini:gemini-1.5-flash-8b")
+FAST_MAX_OUTPUT_TOKENS = int(os.getenv("FAST_MAX_OUTPUT_TOKENS", "128"))
+
+FAST = "fast"
+STRONG = "strong"
+
 system_instructions = """
 You are MARVIS (Machine-based Assistant for Research, Voice, and Interactive Services), my personal voice AI assistant, inspired by JARVIS.
 
@@ -21,49 +46,198 @@ Rules:
 Goal: Be a fast, reliable, and efficient assistant for everyday tasks, coding help, research, and productivity, always maintaining a helpful and slightly humorous demeanor.
 """
 
+fast_system_instructions = """
+You are MARVIS, a witty personal voice assistant. Reply in one or two short sentences that sound natural spoken aloud.
+"""
+
+fast_router = llm_backends.LLMRouter(llm_backends.parse_backends(LLM_FAST_BACKENDS))
+
+# Whole-utterance small talk: greetings, thanks, acknowledgements
+_CHITCHAT = re.compile(
+    r"^(hi|hello|hey|thanks|thank you|ok|okay|cool|great|nice|bye|goodbye|good (morning|afternoon|evening|night)"
+    r"|how are you|who are you|what time is it|what's up)\b",
+    re.IGNORECASE,
+)
+# A fast tier reply that opens like this is a refusal; the full model answers instead
+_REFUSAL = re.compile(
+    r"^\W*(?:(?:i'm |i am )?sorry,? (?:but )?)?"
+    r"(?:i (?:can't|cannot|am unable|'m unable|am not able|'m not able|don't know)|as an ai)\b",
+    re.IGNORECASE,
+)
+# Signals of multi-step, analytical or coding requests
+_COMPLEX_TERMS = re.compile(
+    r"\b(code|coding|function|script|program|debug|error|bug|explain|compare|difference|steps?|plan|why"
+    r"|how (do|does|can|should|would)|write|implement|analy[sz]e|summari[sz]e|pros and cons)\b",
+    re.IGNORECASE,
+)
+
+class ComplexityDecision(NamedTuple):
+    tier: str
+    score: float
+    words: int
+    chitchat: bool
+    complex_terms: int
+    history_turns: int
+
+def estimate_complexity(user_query: str, history: List[Dict[str, Any]]) -> ComplexityDecision:
+    """
+    Cheap local estimate of how much model a turn needs. Every ten words add
+    1, each complex term adds 1, extra questions add 0.5 each and prior turns
+    0.1 each (up to 1); small talk subtracts 1. Below COMPLEXITY_THRESHOLD
+    the fast tier answers.
+    """
+    query = user_query.strip()
+    words = len(query.split())
+    chitchat = words <= 8 and bool(_CHITCHAT.match(query))
+    complex_terms = len(_COMPLEX_TERMS.findall(query))
+    history_turns = len(history) // 2
+    score = words / 10 + complex_terms + 0.5 * max(0, query.count("?") - 1) + 0.1 * min(history_turns, 10)
+    if chitchat:
+        score -= 1
+    tier = FAST if COMPLEXITY_ROUTING and score < COMPLEXITY_THRESHOLD else STRONG
+    decision = ComplexityDecision(tier, round(score, 2), words, chitchat, complex_terms, history_turns)
+    # One line per turn, so thresholds can be tuned against latency and quality
+    logger.info(f"Complexity route: {decision.tier} score={decision.score} words={words} chitchat={chitchat} "
+                f"complex_terms={complex_terms} history_turns={history_turns}")
+    return decision
+
+def _probe_gemini(api_key: str):
+    configure_gemini(api_key).get_model("models/gemini-1.5-flash")
+
+breakers.register_probe("gemini", _probe_gemini)
+
 def should_search_web(user_query: str, api_key: str) -> bool:
     """
     Uses a lightweight LLM prompt to decide if a web search is necessary.
     """
     try:
-        genai.configure(api_key=api_key)
+        genai = configure_gemini(api_key)
         model = genai.GenerativeModel('gemini-1.5-flash')
         prompt = f"Does the following query require a web search to answer accurately? Respond with only 'yes' or 'no'.\n\nQuery: '{user_query}'"
-        response = model.generate_content(prompt)
+        with breakers.guard("gemini", api_key), ROUTING_SECONDS.time():
+            response = model.generate_content(prompt)
         return response.text.strip().lower() == "yes"
+    except CircuitOpen:
+        # get_llm_response will fail fast too; don't count this as an upstream error
+        return False
     except Exception as e:
         logger.error(f"Error in should_search_web: {e}")
+        UPSTREAM_ERRORS.labels("gemini").inc()
         return False
 
-def get_llm_response(user_query: str, history: List[Dict[str, Any]], api_key: str) -> Tuple[str, List[Dict[str, Any]]]:
-    """Gets a response from the Gemini LLM and updates chat history."""
+def get_llm_response(user_query: str, history: List[Dict[str, Any]], api_key: str, tier: str = STRONG) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Gets a response from the fastest healthy LLM backend of a tier and
+    updates chat history. Raises CircuitOpen when no backend is available.
+    """
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash', system_instruction=system_instructions)
-        chat = model.start_chat(history=history)
-        response = chat.send_message(user_query)
-        return response.text, chat.history
+        start = time.perf_counter()
+        if tier == FAST:
+            text, backend = _fast_reply(user_query, history, api_key)
+            if text is None:
+                tier = STRONG
+        if tier == STRONG:
+            text, backend = llm_backends.router.generate(system_instructions, llm_backends.plain_history(history), user_query, api_key)
+        elapsed = time.perf_counter() - start
+        LLM_TOTAL_SECONDS.observe(elapsed)
+        LLM_TIER_SECONDS.labels(tier).observe(elapsed)
+        logger.debug(f"Reply served by {backend.name} ({tier} tier)")
+        return text, list(history) + [
+            {"role": "user", "parts": [user_query]},
+            {"role": "model", "parts": [text]},
+        ]
+    except CircuitOpen:
+        raise
     except Exception as e:
+        # Counted per provider in UPSTREAM_ERRORS by the backend that failed
         logger.error(f"Error getting LLM response: {e}")
         return "I'm sorry, I encountered an error while processing your request.", history
 
-def get_web_response(user_query: str, history: List[Dict[str, Any]], gemini_api_key: str, serp_api_key: str) -> Tuple[str, List[Dict[str, Any]]]:
-    """Gets a response from the Gemini LLM after performing a web search."""
+def _fast_reply(user_query: str, history: List[Dict[str, Any]], api_key: str):
+    """The fast tier's reply and backend, or (None, None) when the full model should answer instead."""
     try:
-        params = {
-            "q": user_query,
-            "api_key": serp_api_key,
-            "engine": "google",
-        }
-        search = GoogleSearch(params)
-        results = search.get_dict()
-        if "organic_results" in results:
-            search_context = "\n".join([result.get("snippet", "") for result in results["organic_results"][:5]])
-            prompt_with_context = f"Based on the following search results, answer the user's query: '{user_query}'\n\nSearch Results:\n{search_context}"
-            return get_llm_response(prompt_with_context, history, gemini_api_key)
-        else:
-            return "I couldn't find any relevant information on the web.", history
+        text, backend = fast_router.generate(
+            fast_system_instructions, llm_backends.plain_history(history), user_query, api_key, FAST_MAX_OUTPUT_TOKENS
+        )
+    except Exception as e:
+        reason = "error"
+        logger.warning(f"Fast tier failed, asking the full model: {e}")
+    else:
+        spoken = (text or "").strip().replace("\u2019", "'")
+        if spoken and not _REFUSAL.match(spoken):
+            return text, backend
+        reason = "refusal" if spoken else "empty"
+        logger.info(f"Fast tier reply from {backend.name} was {'a refusal' if spoken else 'empty'}, asking the full model")
+    LLM_FAST_FALLBACKS.labels(reason).inc()
+    return None, None
 
+def _function_calls(response) -> List[Tuple[str, Dict[str, Any]]]:
+    calls = []
+    for part in response.parts:
+        if "function_call" in part:
+            call = type(part.function_call).to_dict(part.function_call)
+            calls.append((call["name"], call.get("args") or {}))
+    return calls
+
+def get_tool_response(
+    user_query: str,
+    history: List[Dict[str, Any]],
+    api_key: str,
+    run_tools: Callable[[List[Tuple[str, Dict[str, Any]]]], List[Dict[str, Any]]],
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Gets a response from the Gemini LLM with the registered tools available.
+    Each round of calls the model asks for is handed to `run_tools`, which
+    returns one result per call, and the results are sent back until the
+    model answers. Raises CircuitOpen when Gemini's breaker is open.
+    """
+    try:
+        genai = configure_gemini(api_key)
+        model = genai.GenerativeModel('gemini-1.5-flash', system_instruction=system_instructions, tools=tools.declarations())
+        chat = model.start_chat(history=history)
+        start = time.perf_counter()
+        with breakers.guard("gemini", api_key):
+            response = chat.send_message(user_query)
+        for _ in range(TOOL_MAX_ROUNDS):
+            calls = _function_calls(response)
+            if not calls:
+                break
+            results = run_tools(calls)
+            parts = [
+                genai.protos.Part(function_response=genai.protos.FunctionResponse(name=name, response=result))
+                for (name, _), result in zip(calls, results)
+            ]
+            with breakers.guard("gemini", api_key):
+                response = chat.send_message(genai.protos.Content(parts=parts))
+        if _function_calls(response):
+            logger.warning(f"Model still calling tools after {TOOL_MAX_ROUNDS} rounds")
+            return "I couldn't finish looking that up. Please try asking again.", history
+        elapsed = time.perf_counter() - start
+        LLM_FIRST_TOKEN_SECONDS.observe(elapsed)
+        LLM_TOTAL_SECONDS.observe(elapsed)
+        return response.text, chat.history
+    except CircuitOpen:
+        raise
     except Exception as e:
-        logger.error(f"Error getting LLM response: {e}")
-        return "I'm sorry, I encountered an error while processing your request.", history
\ No newline at end of file
+        logger.error(f"Error getting tool-assisted LLM response: {e}")
+        UPSTREAM_ERRORS.labels("gemini").inc()
+        return "I'm sorry, I encountered an error while processing your request.", history
+
+def get_web_response(user_query: str, history: List[Dict[str, Any]], gemini_api_key: str, results: Optional[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Gets a response from the Gemini LLM grounded in web search `results`
+    (SerpAPI JSON). Without results, e.g. when search is down or late, the
+    query is answered from the model alone.
+    """
+    if results is None:
+        return get_llm_response(user_query, history, gemini_api_key)
+    if "organic_results" not in results:
+        return "I couldn't find any relevant information on the web.", history
+    snippets = [result.get("snippet", "") for result in results["organic_results"][:5]]
+    return get_context_response(user_query, history, gemini_api_key, snippets)
+
+def get_context_response(user_query: str, history: List[Dict[str, Any]], api_key: str, snippets: List[str], label: str = "Search Results") -> Tuple[str, List[Dict[str, Any]]]:
+    """Gets a response from the Gemini LLM grounded in retrieved snippets (web results or local passages)."""
+    context = "\n".join(snippets)
+    prompt_with_context = f"Based on the following {label.lower()}, answer the user's query: '{user_query}'\n\n{label}:\n{context}"
+    return get_llm_response(prompt_with_context, history, api_key)
\ No newline at end of file
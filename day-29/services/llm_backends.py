@@ -0,0 +1,280 @@
+# services/llm_backends.py
+import os
+import json
+import time
+import queue
+import random
+import logging
+import threading
+from collections import deque
+from statistics import median
+from typing import Any, Iterator, List, Optional, Tuple
+
+from services.metrics import (
+    LLM_FIRST_TOKEN_SECONDS, LLM_BACKEND_FIRST_TOKEN_SECONDS, LLM_BACKEND_MEDIAN_FIRST_TOKEN_SECONDS,
+    LLM_BACKEND_TURNS, LLM_FAILOVERS, UPSTREAM_ERRORS,
+)
+from services import breakers
+from services import executors
+from services.breakers import CircuitOpen
+
+logger = logging.getLogger(__name__)
+
+# Endpoint override, e.g. a local emulator at http://127.0.0.1:8765
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+# Backends in order of preference: "gemini:<model>", "openai:<model>" (at OPENAI_BASE_URL) or "local"
+LLM_BACKENDS = os.getenv("LLM_BACKENDS", "gemini:gemini-1.5-flash")
+# "fastest" routes to the healthy backend with the lowest rolling median time to
+# first token; "ordered" always uses the first healthy one
+LLM_ROUTING_POLICY = os.getenv("LLM_ROUTING_POLICY", "fastest")
+# A less preferred backend must be this many times faster to be chosen
+LLM_ROUTING_MARGIN = float(os.getenv("LLM_ROUTING_MARGIN", "1.2"))
+# Share of turns sent to a random healthy backend so every median stays current
+LLM_ROUTING_EXPLORE = float(os.getenv("LLM_ROUTING_EXPLORE", "0.05"))
+LLM_TTFT_WINDOW = int(os.getenv("LLM_TTFT_WINDOW", "50"))
+# Give up on a backend whose first token is later than this and try the next one
+LLM_FIRST_TOKEN_DEADLINE_SECONDS = float(os.getenv("LLM_FIRST_TOKEN_DEADLINE_SECONDS", "3"))
+# Any OpenAI-compatible chat completions server (vLLM, llama.cpp, Ollama, ...)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "http://127.0.0.1:8000/v1")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+# Latency of the in-process stand-in backend, for tests
+LOCAL_LLM_FIRST_TOKEN_SECONDS = float(os.getenv("LOCAL_LLM_FIRST_TOKEN_SECONDS", "0.05"))
+
+# (role, text) pairs with roles "user" and "model"
+Messages = List[Tuple[str, str]]
+
+
+def configure_gemini(api_key: str):
+    """Configures the Gemini SDK, honouring GEMINI_API_ENDPOINT, and returns it."""
+    import google.generativeai as genai
+    if GEMINI_API_ENDPOINT:
+        genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+    else:
+        genai.configure(api_key=api_key)
+    return genai
+
+
+def plain_history(history: List[Any]) -> Messages:
+    """
+    Text-only view of a chat history, whether it holds dicts (cache entries,
+    earlier backend turns) or Gemini Content protos. Tool-call entries are dropped.
+    """
+    messages = []
+    for entry in history:
+        if isinstance(entry, dict):
+            role = entry.get("role", "user")
+            parts = entry.get("parts", [])
+            text = "".join(part if isinstance(part, str) else part.get("text", "") for part in parts)
+        else:
+            role = entry.role
+            text = "".join(part.text for part in entry.parts if "text" in part)
+        if text:
+            messages.append((role, text))
+    return messages
+
+
+class Backend:
+    """One model on one provider. `stream` yields the reply's text as it arrives."""
+    provider = ""
+
+    def __init__(self, name: str, model: str = ""):
+        self.name = name
+        self.model = model
+        self._first_token = deque(maxlen=LLM_TTFT_WINDOW)
+        breakers.register_breaker(self.provider)
+        LLM_BACKEND_MEDIAN_FIRST_TOKEN_SECONDS.set_function(lambda: self.median_first_token() or 0.0, name)
+
+    def stream(
+        self, system: str, history: Messages, prompt: str, api_key: str, cancel: threading.Event, max_output_tokens: Optional[int] = None,
+    ) -> Iterator[str]:
+        raise NotImplementedError
+
+    def observe(self, seconds: float):
+        self._first_token.append(seconds)
+        LLM_BACKEND_FIRST_TOKEN_SECONDS.labels(self.name).observe(seconds)
+
+    def median_first_token(self) -> Optional[float]:
+        samples = list(self._first_token)
+        return median(samples) if samples else None
+
+    @property
+    def healthy(self) -> bool:
+        # An open breaker without a probe recovers through a trial call, so
+        # the backend is offered again once that trial is due
+        return breakers.available(self.provider)
+
+
+class GeminiBackend(Backend):
+    provider = "gemini"
+
+    def stream(self, system, history, prompt, api_key, cancel, max_output_tokens=None):
+        genai = configure_gemini(api_key)
+        generation_config = {"max_output_tokens": max_output_tokens} if max_output_tokens else None
+        model = genai.GenerativeModel(self.model, system_instruction=system, generation_config=generation_config)
+        chat = model.start_chat(history=[{"role": role, "parts": [text]} for role, text in history])
+        for chunk in chat.send_message(prompt, stream=True):
+            if cancel.is_set():
+                return
+            text = "".join(part.text for part in chunk.parts if "text" in part)
+            if text:
+                yield text
+
+
+class OpenAIBackend(Backend):
+    """Streams from an OpenAI-compatible `/chat/completions` endpoint."""
+    provider = "openai"
+
+    def stream(self, system, history, prompt, api_key, cancel, max_output_tokens=None):
+        import requests
+        messages = [{"role": "system", "content": system}]
+        messages += [{"role": "assistant" if role == "model" else "user", "content": text} for role, text in history]
+        messages.append({"role": "user", "content": prompt})
+        headers = {"Authorization": f"Bearer {OPENAI_API_KEY}"} if OPENAI_API_KEY else {}
+        body = {"model": self.model, "messages": messages, "stream": True}
+        if max_output_tokens:
+            body["max_tokens"] = max_output_tokens
+        with requests.post(
+            f"{OPENAI_BASE_URL}/chat/completions",
+            json=body,
+            headers=headers, stream=True, timeout=(5, 60),
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if cancel.is_set():
+                    return
+                if not line.startswith(b"data: "):
+                    continue
+                data = line[6:]
+                if data == b"[DONE]":
+                    return
+                choices = json.loads(data).get("choices") or [{}]
+                text = choices[0].get("delta", {}).get("content")
+                if text:
+                    yield text
+
+
+class LocalBackend(Backend):
+    """In-process stand-in with a fixed first-token delay, for tests and offline runs."""
+    provider = "local"
+
+    def stream(self, system, history, prompt, api_key, cancel, max_output_tokens=None):
+        if cancel.wait(LOCAL_LLM_FIRST_TOKEN_SECONDS):
+            return
+        yield "This is the local stand-in model. "
+        yield "It answers every question with these two sentences."
+
+
+_BACKEND_TYPES = {"gemini": GeminiBackend, "openai": OpenAIBackend, "local": LocalBackend}
+
+
+def parse_backends(spec: str) -> List[Backend]:
+    backends = []
+    for entry in filter(None, (item.strip() for item in spec.split(","))):
+        kind, _, model = entry.partition(":")
+        if kind not in _BACKEND_TYPES:
+            raise ValueError(f"Unknown LLM backend {kind!r} in LLM_BACKENDS")
+        backends.append(_BACKEND_TYPES[kind](entry, model))
+    return backends
+
+
+class _Attempt:
+    """One backend's reply, streamed on an llm_stream executor thread into a queue."""
+
+    def __init__(self, backend: Backend, system: str, history: Messages, prompt: str, api_key: str, max_output_tokens: Optional[int]):
+        self.backend = backend
+        self.cancel = threading.Event()
+        self.chunks = queue.Queue()
+        self.start = time.perf_counter()
+        try:
+            executors.EXECUTORS["llm_stream"].submit(self._run, system, history, prompt, api_key, max_output_tokens)
+        except executors.ExecutorSaturated as e:
+            self.chunks.put(("error", e))
+
+    def _run(self, system, history, prompt, api_key, max_output_tokens):
+        try:
+            with breakers.guard(self.backend.provider, api_key):
+                for text in self.backend.stream(system, history, prompt, api_key, self.cancel, max_output_tokens):
+                    self.chunks.put(("text", text))
+            self.chunks.put(("done", None))
+        except Exception as e:
+            if not isinstance(e, CircuitOpen):
+                UPSTREAM_ERRORS.labels(self.backend.provider).inc()
+            self.chunks.put(("error", e))
+
+    def next(self, timeout: Optional[float] = None) -> Tuple[str, Any]:
+        """Raises queue.Empty when nothing arrived within `timeout`."""
+        return self.chunks.get(timeout=timeout)
+
+
+class LLMRouter:
+    """
+    Picks a backend per turn from rolling time-to-first-token, and fails over
+    to the next candidate when the first token misses its deadline or the
+    backend errors before answering. Once a token has arrived the turn stays
+    on that backend.
+    """
+
+    def __init__(self, backends: List[Backend], policy: str = LLM_ROUTING_POLICY):
+        self.backends = backends
+        self.policy = policy
+
+    def candidates(self) -> List[Backend]:
+        """Healthy backends, the one to try first at the front."""
+        healthy = [backend for backend in self.backends if backend.healthy]
+        if self.policy != "fastest" or len(healthy) < 2:
+            return healthy
+        if random.random() < LLM_ROUTING_EXPLORE:
+            first = random.choice(healthy)
+        else:
+            first = healthy[0]
+            for backend in healthy[1:]:
+                candidate, current = backend.median_first_token(), first.median_first_token()
+                if candidate is not None and current is not None and candidate * LLM_ROUTING_MARGIN < current:
+                    first = backend
+        return [first] + [backend for backend in healthy if backend is not first]
+
+    def generate(self, system: str, history: Messages, prompt: str, api_key: str, max_output_tokens: Optional[int] = None) -> Tuple[str, Backend]:
+        """
+        The complete reply and the backend that produced it. Raises CircuitOpen
+        when no backend is available, or the last backend's error.
+        """
+        candidates = self.candidates()
+        if not candidates:
+            raise CircuitOpen(self.backends[0].provider)
+        error: Exception = CircuitOpen(self.backends[0].provider)
+        for i, backend in enumerate(candidates):
+            last = i == len(candidates) - 1
+            attempt = _Attempt(backend, system, history, prompt, api_key, max_output_tokens)
+            try:
+                # The last candidate is not cut off: a late answer beats none
+                kind, value = attempt.next(None if last else LLM_FIRST_TOKEN_DEADLINE_SECONDS)
+            except queue.Empty:
+                attempt.cancel.set()
+                # Count the miss so the rolling median steers later turns away
+                backend.observe(LLM_FIRST_TOKEN_DEADLINE_SECONDS)
+                LLM_FAILOVERS.labels(backend.name, "deadline").inc()
+                logger.warning(f"{backend.name} missed the {LLM_FIRST_TOKEN_DEADLINE_SECONDS:g}s first-token deadline; failing over")
+                continue
+            if kind == "error":
+                if last:
+                    raise value
+                error = value
+                LLM_FAILOVERS.labels(backend.name, "error").inc()
+                logger.warning(f"{backend.name} failed before its first token: {value}")
+                continue
+
+            first_token = time.perf_counter() - attempt.start
+            backend.observe(first_token)
+            LLM_FIRST_TOKEN_SECONDS.observe(first_token)
+            LLM_BACKEND_TURNS.labels(backend.name).inc()
+            pieces = []
+            while kind != "done":
+                if kind == "error":
+                    raise value
+                pieces.append(value)
+                kind, value = attempt.next()
+            return "".join(pieces), backend
+        raise error
+
+
+router = LLMRouter(parse_backends(LLM_BACKENDS))
@@ -0,0 +1,129 @@
+# services/loop_monitor.py
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import deque
+from typing import List, Optional
+
+from services.metrics import LOOP_LAG_SECONDS, LOOP_STALLS
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_INTERVAL = 0.1
+# Wake-ups later than this count as a stall
+LOOP_STALL_THRESHOLD_MS = float(os.getenv("LOOP_STALL_THRESHOLD_MS", "100"))
+# Capture the stack of whatever is blocking the loop (watchdog thread, debug only)
+LOOP_STALL_DEBUG = os.getenv("LOOP_STALL_DEBUG", "0") == "1"
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: how late a periodic wake-up fires compared to
+    when it was scheduled. Sustained lag means something is blocking the loop.
+
+    With `capture_stacks`, a watchdog thread notices a wake-up that is overdue
+    by more than the threshold while it is still overdue, and records the
+    loop thread's stack and current task, i.e. the code doing the blocking.
+    """
+
+    def __init__(
+        self,
+        interval: float = LOOP_LAG_INTERVAL,
+        window: int = 600,
+        stall_threshold_ms: float = LOOP_STALL_THRESHOLD_MS,
+        capture_stacks: bool = LOOP_STALL_DEBUG,
+    ):
+        self.interval = interval
+        self.samples = deque(maxlen=window)
+        self.max_lag_ms = 0.0
+        self.stall_threshold_ms = stall_threshold_ms
+        self.capture_stacks = capture_stacks
+        self.stalls = deque(maxlen=20)
+        self._task = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._expected: Optional[float] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread_id = threading.get_ident()
+            self._task = self._loop.create_task(self._run())
+            if self.capture_stacks:
+                self._stopped.clear()
+                self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+                self._watchdog.start()
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._stopped.set()
+        self._watchdog = None
+
+    async def _run(self):
+        while True:
+            self._expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (time.perf_counter() - self._expected) * 1000)
+            self.samples.append(lag_ms)
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            LOOP_LAG_SECONDS.observe(lag_ms / 1000)
+            if lag_ms > self.stall_threshold_ms:
+                LOOP_STALLS.inc()
+
+    def _watch(self):
+        captured_for = None
+        poll = max(self.stall_threshold_ms / 4000, 0.005)
+        while not self._stopped.wait(poll):
+            expected = self._expected
+            if expected is None or expected == captured_for:
+                continue
+            overdue_ms = (time.perf_counter() - expected) * 1000
+            if overdue_ms > self.stall_threshold_ms:
+                captured_for = expected
+                self._capture(overdue_ms)
+
+    def _capture(self, overdue_ms: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+        task = None
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            pass
+        stall = {
+            "at": round(time.time(), 3),
+            "overdue_ms": round(overdue_ms, 1),
+            "task": task.get_name() if task else None,
+            "coroutine": getattr(task.get_coro(), "__qualname__", None) if task else None,
+            "stack": [line.rstrip() for line in stack],
+        }
+        self.stalls.append(stall)
+        logger.warning(
+            f"Event loop blocked for more than {overdue_ms:.0f} ms in {stall['coroutine'] or 'a callback'}:\n"
+            + "".join(stack[-8:])
+        )
+
+    def recent_stalls(self) -> List[dict]:
+        return list(self.stalls)
+
+    def snapshot(self, reset_max: bool = False) -> dict:
+        samples = sorted(self.samples)
+        result = {
+            "current_ms": round(self.samples[-1], 2) if self.samples else 0.0,
+            "p99_ms": round(samples[int(len(samples) * 0.99) - 1], 2) if samples else 0.0,
+            "max_ms": round(self.max_lag_ms, 2),
+        }
+        if reset_max:
+            self.max_lag_ms = 0.0
+        return result
+
+
+loop_monitor = LoopLagMonitor()
@@ -0,0 +1,333 @@
+# services/metrics.py
+import time
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Latency buckets in seconds, from socket sends up to upstream timeouts
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0, 30.0)
+
+# Pending observations are folded into buckets once this many pile up
+_FOLD_THRESHOLD = 4096
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self.labels()
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            # dict.setdefault is atomic, so racing creators end up sharing one child
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _default(self):
+        return self.labels() if not self.labelnames else None
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, values))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0
+        # += on an attribute is not atomic, and counters are bumped from worker threads
+        self._lock = threading.Lock()
+
+    def inc(self):
+        with self._lock:
+            self._value += 1
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def render(self, name, labelnames, values):
+        return [f"{name}_total{_format_labels(labelnames, values)} {self.value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self):
+        self._default().inc()
+
+
+class _GaugeChild:
+    def __init__(self, function: Optional[Callable[[], float]] = None):
+        self._value = 0
+        self._function = function
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1):
+        self._value += amount
+
+    def dec(self, amount: float = 1):
+        self._value -= amount
+
+    @property
+    def value(self) -> float:
+        if self._function is not None:
+            try:
+                return self._function()
+            except Exception:
+                return float("nan")
+        return self._value
+
+    def render(self, name, labelnames, values):
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(self.value)}"]
+
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down. inc/dec are meant for the event loop thread;
+    use `set_function` for values read at scrape time.
+    """
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._default().dec(amount)
+
+    def set_function(self, function: Callable[[], float], *values: str):
+        self._children[values] = _GaugeChild(function)
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self._pending = deque()
+        self._fold_lock = threading.Lock()
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value: float):
+        # deque.append is atomic: recording never takes a lock
+        self._pending.append(value)
+        if len(self._pending) > _FOLD_THRESHOLD:
+            self._fold(blocking=False)
+
+    def _fold(self, blocking: bool = True):
+        if not self._fold_lock.acquire(blocking):
+            return
+        try:
+            while True:
+                try:
+                    value = self._pending.popleft()
+                except IndexError:
+                    break
+                self._counts[bisect_left(self.buckets, value)] += 1
+                self._sum += value
+                self._count += 1
+        finally:
+            self._fold_lock.release()
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def render(self, name, labelnames, values):
+        self._fold()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self._counts):
+            cumulative += count
+            le = 'le="' + _format_value(bound) + '"'
+            lines.append(f"{name}_bucket{_format_labels(labelnames, values, le)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, values)} {self._sum}")
+        lines.append(f"{name}_count{_format_labels(labelnames, values)} {self._count}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def counter(name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# Pipeline stage latencies
+STT_FINALIZATION_SECONDS = histogram("voice_stt_finalization_seconds", "End of the last spoken word to the final transcript.")
+STT_FORMAT_WAIT_SECONDS = histogram("voice_stt_format_wait_seconds", "Unformatted end of turn to the formatted turn (what STT_FORMAT_TURNS=wait adds before the LLM).")
+ROUTING_SECONDS = histogram("voice_routing_seconds", "should_search_web classifier call.")
+SEARCH_SECONDS = histogram("voice_search_seconds", "Web search request.")
+LLM_FIRST_TOKEN_SECONDS = histogram("voice_llm_first_token_seconds", "LLM request to first token.")
+LLM_TOTAL_SECONDS = histogram("voice_llm_total_seconds", "LLM request to complete reply.")
+LLM_BACKEND_FIRST_TOKEN_SECONDS = histogram("voice_llm_backend_first_token_seconds", "Time to first token per LLM backend, with missed deadlines counted at the deadline.", ("backend",))
+TTS_FIRST_BYTE_SECONDS = histogram("voice_tts_first_byte_seconds", "TTS request to first audio byte, per sentence.")
+TTS_TOTAL_SECONDS = histogram("voice_tts_total_seconds", "TTS request to complete audio, per sentence.")
+SPEECH_TEXT_CHARS = histogram(
+    "voice_speech_text_chars", "Characters per reply as the LLM wrote it (reply) and as sent to TTS after normalization (spoken).",
+    ("stage",), buckets=(50, 100, 200, 400, 800, 1600, 3200),
+)
+SOCKET_SEND_SECONDS = histogram("voice_socket_send_seconds", "WebSocket send of one message to the client.")
+OUTBOUND_SEND_SECONDS = histogram("voice_outbound_send_seconds", "Outbound message queued to sent, including time waiting behind other messages.", ("kind",))
+
+# Load
+ACTIVE_SESSIONS = gauge("voice_active_sessions", "Open /ws connections.")
+INFLIGHT_TURNS = gauge("voice_inflight_turns", "Turns between final transcript and last audio.")
+OUTBOUND_QUEUE_DEPTH = gauge("voice_outbound_queue_depth", "Messages waiting in per-connection outbound queues, summed over connections.")
+ADMISSION_WAITING = gauge("voice_admission_waiting", "Connections waiting for a session slot.")
+EXECUTOR_QUEUE_DEPTH = gauge("voice_executor_queue_depth", "Work items waiting for an executor thread.", ("executor",))
+EXECUTOR_BUSY_WORKERS = gauge("voice_executor_busy_workers", "Executor threads running a call.", ("executor",))
+EXECUTOR_QUEUE_WAIT_SECONDS = histogram("voice_executor_queue_wait_seconds", "Time a call waited for an executor thread.", ("executor", "lane"))
+
+# Event loop
+LOOP_LAG_SECONDS = histogram(
+    "voice_event_loop_lag_seconds", "How late a periodic event-loop wake-up fired.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_STALLS = counter("voice_event_loop_stalls", "Event-loop wake-ups later than LOOP_STALL_THRESHOLD_MS.")
+
+# TTS hedging and deadlines (hedge rate = hedges / requests, win rate = hedge wins / hedges)
+TTS_REQUESTS = counter("voice_tts_requests", "Sentences sent to TTS through the hedging path.")
+TTS_HEDGES = counter("voice_tts_hedges", "Duplicate TTS requests fired because the first byte was late.")
+TTS_HEDGE_WINS = counter("voice_tts_hedge_wins", "Hedged TTS requests that streamed before the original.")
+TTS_HEDGES_SKIPPED = counter("voice_tts_hedges_skipped", "Late TTS requests not hedged because of the spend cap or rate limit.")
+TTS_DEADLINE_EXCEEDED = counter("voice_tts_deadline_exceeded", "Sentences abandoned at TTS_DEADLINE_SECONDS.")
+TTS_HEDGE_THRESHOLD_SECONDS = gauge("voice_tts_hedge_threshold_seconds", "First-byte delay after which a TTS request is hedged (p95 per voice).", ("voice",))
+
+# Circuit breakers
+BREAKER_STATE = gauge("voice_breaker_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open.", ("provider",))
+BREAKER_TRIPS = counter("voice_breaker_trips", "Times a circuit breaker opened.", ("provider",))
+BREAKER_REJECTIONS = counter("voice_breaker_rejections", "Calls failed fast by an open circuit breaker.", ("provider",))
+FALLBACK_REPLIES = counter("voice_fallback_replies", "Turns answered with the fallback phrase and audio.", ("provider",))
+
+# Web search
+SEARCH_FILLERS = counter("voice_search_fillers", "Search turns by filler outcome: sent, or unavailable while the phrase bank is not built.", ("outcome",))
+SEARCH_PREFETCHES = counter("voice_search_prefetches", "Speculative searches started alongside routing, by outcome: used, wasted (routing said no), cancelled (turn ended first) or skipped (over a cap).", ("outcome",))
+
+# LLM backend routing
+LLM_BACKEND_MEDIAN_FIRST_TOKEN_SECONDS = gauge("voice_llm_backend_median_first_token_seconds", "Rolling median time to first token the router ranks backends by (0 = no samples yet).", ("backend",))
+LLM_TIER_SECONDS = histogram("voice_llm_tier_seconds", "LLM request to complete reply, by complexity tier (fast or strong).", ("tier",))
+LLM_BACKEND_TURNS = counter("voice_llm_backend_turns", "Replies served per LLM backend.", ("backend",))
+LLM_FAILOVERS = counter("voice_llm_failovers", "Turns moved off a backend before its first token, by reason: deadline or error.", ("backend", "reason"))
+LLM_FAST_FALLBACKS = counter("voice_llm_fast_fallbacks", "Fast tier turns answered by the full model instead, by reason: error, empty or refusal.", ("reason",))
+
+# Tool calls
+TOOL_CALL_SECONDS = histogram("voice_tool_call_seconds", "Tool call duration, cut off at the tool's deadline.", ("tool",))
+TOOL_CALLS = counter("voice_tool_calls", "Tool calls by outcome: ok, cached, timeout or error.", ("tool", "outcome"))
+
+# Local knowledge index
+KNOWLEDGE_LOOKUP_SECONDS = histogram(
+    "voice_knowledge_lookup_seconds", "BM25 lookup in the local knowledge index.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+KNOWLEDGE_LOOKUPS = counter("voice_knowledge_lookups", "Local knowledge lookups: hit (answered locally) or miss.", ("outcome",))
+KNOWLEDGE_PASSAGES = gauge("voice_knowledge_passages", "Passages in the loaded knowledge index.")
+
+# Admission and upstream rate limits
+ADMISSION_WAIT_SECONDS = histogram("voice_admission_wait_seconds", "Time a connection waited for a session slot.")
+ADMISSION_REJECTIONS = counter("voice_admission_rejections", "Connections refused a session slot.", ("reason",))
+RATE_LIMIT_WAIT_SECONDS = histogram("voice_rate_limit_wait_seconds", "Time an upstream call waited for a rate-limit token.", ("provider",))
+RATE_LIMIT_REJECTIONS = counter("voice_rate_limit_rejections", "Upstream calls rejected after waiting too long for a token.", ("provider",))
+
+# STT gating while the assistant speaks
+STT_GATED_SECONDS = histogram(
+    "voice_stt_gated_seconds", "Mic audio per session kept from STT because the assistant was speaking.",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600),
+)
+BARGE_INS = counter("voice_barge_ins", "Times the user spoke over the assistant loudly enough to reopen STT.")
+
+# Idle STT streams
+STT_STREAMS_OPEN = gauge("voice_stt_streams_open", "Upstream STT streams open across sessions.")
+STT_STREAMS_IDLE = gauge("voice_stt_streams_idle", "Sessions whose STT stream is closed until the user speaks again.")
+STT_IDLE_CLOSES = counter("voice_stt_idle_closes", "STT streams closed because the user stopped speaking.")
+STT_IDLE_PERIOD_SECONDS = histogram(
+    "voice_stt_idle_period_seconds", "Time a session's STT stream stayed closed: streaming time not billed.",
+    buckets=(10, 30, 60, 300, 900, 1800, 3600, 7200),
+)
+STT_REOPEN_SECONDS = histogram("voice_stt_reopen_seconds", "Speech after an idle period to the reopened STT stream.")
+
+# Failures
+UPSTREAM_ERRORS = counter("voice_upstream_errors", "Errors returned by upstream providers.", ("provider",))
+EXECUTOR_REJECTIONS = counter("voice_executor_rejections", "Calls rejected because an executor queue was full.", ("executor", "lane"))
+OUTBOUND_DROPPED = counter("voice_outbound_dropped", "Outbound messages dropped before sending.", ("reason",))
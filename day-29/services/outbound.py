@@ -0,0 +1,216 @@
+# services/outbound.py
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+import weakref
+from collections import deque
+from typing import Any, Dict, Optional
+
+from services.metrics import OUTBOUND_SEND_SECONDS, OUTBOUND_QUEUE_DEPTH, OUTBOUND_DROPPED, SOCKET_SEND_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Priorities: lower is sent first
+CONTROL = 0
+TEXT = 1
+AUDIO = 2
+_KIND = {CONTROL: "control", TEXT: "text", AUDIO: "audio"}
+
+# Queued text/audio messages per connection before producers wait for the client
+OUTBOUND_QUEUE_SIZE = int(os.getenv("OUTBOUND_QUEUE_SIZE", "64"))
+
+_open_queues: "weakref.WeakSet[OutboundQueue]" = weakref.WeakSet()
+
+
+class _Entry:
+    __slots__ = ("message", "priority", "turn_id", "coalesce_key", "queued_at", "dropped", "sent")
+
+    def __init__(self, message: Dict[str, Any], priority: int, turn_id: Optional[str], coalesce_key: Optional[str], sent: asyncio.Future):
+        self.message = message
+        self.priority = priority
+        self.turn_id = turn_id
+        self.coalesce_key = coalesce_key
+        self.queued_at = time.perf_counter()
+        self.dropped = False
+        # Resolves to True once the message is on the socket, False if it was dropped
+        self.sent = sent
+
+
+class OutboundQueue:
+    """
+    The only writer to one WebSocket. Producers enqueue messages and a single
+    task sends them in priority order (control > text > audio, FIFO within a
+    priority), so a slow client never blocks the code producing messages.
+
+      - a message with a `coalesce_key` replaces a still-queued message with
+        the same key (e.g. a newer partial transcript),
+      - `cancel_turn` drops everything queued for a turn and anything it sends later,
+      - text and audio producers wait once `max_size` messages are queued;
+        control messages are never held back.
+
+    `put`/`put_nowait` return a future that resolves to True when the message
+    has been sent and to False when it was dropped.
+
+    All methods must be called on the event loop; use `put_threadsafe` from
+    other threads.
+    """
+
+    def __init__(self, websocket, session_id: str = "", max_size: int = OUTBOUND_QUEUE_SIZE):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.max_size = max_size
+        self._heap = []
+        self._seq = itertools.count()
+        self._coalescing: Dict[str, _Entry] = {}
+        self._cancelled_turns = deque(maxlen=32)
+        self._depth = 0
+        self._ready = asyncio.Event()
+        self._space = asyncio.Condition()
+        self._task: Optional[asyncio.Task] = None
+        self._loop = asyncio.get_running_loop()
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.send_ms = deque(maxlen=256)
+        _open_queues.add(self)
+
+    def start(self):
+        if self._task is None:
+            self._task = self._loop.create_task(self._run())
+
+    async def close(self):
+        """Stops the writer; queued messages are dropped."""
+        self.closed = True
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for _, _, entry in self._heap:
+            if not entry.dropped:
+                self._drop(entry, "closed")
+        self._heap.clear()
+        async with self._space:
+            self._space.notify_all()
+
+    async def drain(self, timeout: float = 2.0):
+        """Waits until everything queued so far has been sent or dropped."""
+        pending = [entry.sent for _, _, entry in self._heap if not entry.dropped]
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    async def put(self, message: Dict[str, Any], priority: int = TEXT, turn_id: str = None, coalesce_key: str = None) -> asyncio.Future:
+        """Queues a message, waiting for room when the client is falling behind."""
+        if priority != CONTROL and self._depth >= self.max_size:
+            async with self._space:
+                await self._space.wait_for(lambda: self._depth < self.max_size or self.closed)
+        return self.put_nowait(message, priority, turn_id, coalesce_key)
+
+    def put_nowait(self, message: Dict[str, Any], priority: int = TEXT, turn_id: str = None, coalesce_key: str = None) -> asyncio.Future:
+        sent = self._loop.create_future()
+        if self.closed or (turn_id is not None and turn_id in self._cancelled_turns):
+            OUTBOUND_DROPPED.labels("closed" if self.closed else "cancelled").inc()
+            self.dropped += 1
+            sent.set_result(False)
+            return sent
+        if coalesce_key is not None:
+            queued = self._coalescing.get(coalesce_key)
+            if queued is not None and not queued.dropped:
+                # Keep the original queue position, send the newest content
+                queued.message = message
+                self.coalesced += 1
+                return queued.sent
+        entry = _Entry(message, priority, turn_id, coalesce_key, sent)
+        if coalesce_key is not None:
+            self._coalescing[coalesce_key] = entry
+        heapq.heappush(self._heap, (priority, next(self._seq), entry))
+        self._depth += 1
+        self.max_depth = max(self.max_depth, self._depth)
+        self._ready.set()
+        return sent
+
+    def put_threadsafe(self, message: Dict[str, Any], priority: int = TEXT, turn_id: str = None, coalesce_key: str = None):
+        self._loop.call_soon_threadsafe(self.put_nowait, message, priority, turn_id, coalesce_key)
+
+    def cancel_turn(self, turn_id: str):
+        """Drops queued messages of a turn and ignores any it sends afterwards."""
+        self._cancelled_turns.append(turn_id)
+        for _, _, entry in self._heap:
+            if entry.turn_id == turn_id and not entry.dropped:
+                self._drop(entry, "cancelled")
+
+    def _drop(self, entry: _Entry, reason: str):
+        entry.dropped = True
+        entry.sent.set_result(False)
+        self._depth -= 1
+        self.dropped += 1
+        OUTBOUND_DROPPED.labels(reason).inc()
+        if entry.coalesce_key is not None and self._coalescing.get(entry.coalesce_key) is entry:
+            del self._coalescing[entry.coalesce_key]
+
+    async def _run(self):
+        try:
+            while True:
+                if not self._heap:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                _, _, entry = heapq.heappop(self._heap)
+                if entry.dropped:
+                    continue
+                self._depth -= 1
+                if entry.coalesce_key is not None and self._coalescing.get(entry.coalesce_key) is entry:
+                    del self._coalescing[entry.coalesce_key]
+                async with self._space:
+                    self._space.notify_all()
+
+                start = time.perf_counter()
+                try:
+                    await self.websocket.send_json(entry.message)
+                except BaseException:
+                    entry.sent.set_result(False)
+                    raise
+                done = time.perf_counter()
+                entry.sent.set_result(True)
+                SOCKET_SEND_SECONDS.observe(done - start)
+                OUTBOUND_SEND_SECONDS.labels(_KIND[entry.priority]).observe(done - entry.queued_at)
+                self.send_ms.append((done - entry.queued_at) * 1000)
+                self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The client went away; producers notice through `closed`
+            logger.info(f"Outbound writer for session {self.session_id} stopped: {e}")
+            self._task = None
+            await self.close()
+
+    def stats(self) -> Dict[str, Any]:
+        samples = sorted(self.send_ms)
+        return {
+            "session_id": self.session_id,
+            "depth": self._depth,
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "send_p50_ms": round(samples[len(samples) // 2], 2) if samples else 0.0,
+            "send_p95_ms": round(samples[int(len(samples) * 0.95) - 1], 2) if samples else 0.0,
+        }
+
+
+def total_depth() -> int:
+    return sum(queue.depth for queue in list(_open_queues))
+
+
+def connection_stats():
+    return [queue.stats() for queue in list(_open_queues) if not queue.closed]
+
+
+OUTBOUND_QUEUE_DEPTH.set_function(total_depth)
@@ -0,0 +1,141 @@
+# services/search.py
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from services.metrics import SEARCH_SECONDS, SEARCH_PREFETCHES, UPSTREAM_ERRORS
+from services import breakers, limits
+from services.breakers import CircuitOpen
+
+logger = logging.getLogger(__name__)
+
+# Endpoint override, e.g. a local emulator at http://127.0.0.1:8765
+SERPAPI_BASE_URL = os.getenv("SERPAPI_BASE_URL")
+# A search slower than this is abandoned and the turn is answered without it
+SEARCH_DEADLINE_SECONDS = float(os.getenv("SEARCH_DEADLINE_SECONDS", "4"))
+
+# Start the search while should_search_web is still deciding, and cancel it on "no"
+SEARCH_PREFETCH = os.getenv("SEARCH_PREFETCH", "1") == "1"
+# Speculative searches in flight at once, across all sessions
+SEARCH_PREFETCH_MAX_INFLIGHT = int(os.getenv("SEARCH_PREFETCH_MAX_INFLIGHT", "4"))
+# Spend cap for speculative searches as "<per second>/<burst>", on top of RATE_LIMIT_SERPAPI
+SEARCH_PREFETCH_BUDGET = os.getenv("SEARCH_PREFETCH_BUDGET", "0.2/5")
+
+_client = None
+
+
+def _probe_serpapi(api_key: str):
+    import requests
+    response = requests.get(f"{SERPAPI_BASE_URL or 'https://serpapi.com'}/account.json", params={"api_key": api_key}, timeout=5)
+    response.raise_for_status()
+
+breakers.register_probe("serpapi", _probe_serpapi)
+
+
+def _http_client():
+    """One pooled client for every search, so repeat searches skip the TLS handshake."""
+    global _client
+    if _client is None:
+        import httpx
+        _client = httpx.AsyncClient(base_url=SERPAPI_BASE_URL or "https://serpapi.com")
+    return _client
+
+
+async def close():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def search(query: str, api_key: str, deadline: float = SEARCH_DEADLINE_SECONDS) -> Dict[str, Any]:
+    """
+    Google results for a query as SerpAPI JSON.
+    Raises CircuitOpen when SerpAPI's breaker is open and TimeoutError past `deadline`.
+    """
+    client = _http_client()
+    params = {"q": query, "api_key": api_key, "engine": "google"}
+    start = time.perf_counter()
+    with breakers.guard("serpapi", api_key):
+        try:
+            response = await asyncio.wait_for(client.get("/search.json", params=params), deadline)
+            response.raise_for_status()
+        except Exception:
+            UPSTREAM_ERRORS.labels("serpapi").inc()
+            raise
+    # Cancelled speculative searches are not observed
+    SEARCH_SECONDS.observe(time.perf_counter() - start)
+    return response.json()
+
+
+class Prefetcher:
+    """
+    Bounds speculative searches: at most `max_inflight` at once, a token
+    bucket for spend, and never a token the real searches are waiting for.
+    """
+
+    def __init__(self, max_inflight: int = SEARCH_PREFETCH_MAX_INFLIGHT, budget: str = SEARCH_PREFETCH_BUDGET):
+        self.max_inflight = max_inflight
+        limit = limits.parse_limit(budget)
+        self.bucket = limits.TokenBucket(*limit) if limit else None
+        self.inflight = 0
+
+    def start(self, query: str, api_key: str) -> Optional[asyncio.Task]:
+        """Starts a speculative search, or returns None when it would exceed a bound."""
+        if self.inflight >= self.max_inflight or breakers.is_open("serpapi"):
+            SEARCH_PREFETCHES.labels("skipped").inc()
+            return None
+        if self.bucket is not None and not self.bucket.available(time.monotonic()):
+            SEARCH_PREFETCHES.labels("skipped").inc()
+            return None
+        if not limits.try_acquire("serpapi", api_key):
+            SEARCH_PREFETCHES.labels("skipped").inc()
+            return None
+        if self.bucket is not None:
+            self.bucket.take()
+        self.inflight += 1
+        task = asyncio.get_running_loop().create_task(search(query, api_key))
+        task.add_done_callback(self._finished)
+        return task
+
+    def _finished(self, task: asyncio.Task):
+        self.inflight -= 1
+        if not task.cancelled():
+            # Retrieve the exception so an unused failed prefetch is not logged as unhandled
+            task.exception()
+
+    def discard(self, task: Optional[asyncio.Task], outcome: str = "wasted"):
+        """Drops a speculative search: routing said no, or the turn ended first ("cancelled")."""
+        if task is not None:
+            SEARCH_PREFETCHES.labels(outcome).inc()
+            task.cancel()
+
+
+prefetcher = Prefetcher()
+
+
+async def results_for(query: str, api_key: str, session_id: str, prefetched: Optional[asyncio.Task] = None) -> Optional[Dict[str, Any]]:
+    """
+    Results from the speculative search when one was started, otherwise from
+    a new search. Returns None when search is unavailable (open circuit,
+    deadline, error), so the turn can be answered without it.
+    """
+    try:
+        if prefetched is not None:
+            SEARCH_PREFETCHES.labels("used").inc()
+            return await prefetched
+        await limits.acquire("serpapi", api_key, session_id)
+        return await search(query, api_key)
+    except CircuitOpen:
+        return None
+    except asyncio.TimeoutError:
+        logger.warning(f"Web search exceeded {SEARCH_DEADLINE_SECONDS:g}s; answering without it")
+        return None
+    except limits.RateLimited as e:
+        logger.warning(f"Answering without web search: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Web search failed: {e}")
+        return None
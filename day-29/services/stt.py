@@ -1,31 +1,139 @@
 # services/stt.py
-import assemblyai as aai
-from assemblyai.streaming.v3 import (
-    StreamingClient,
-    StreamingClientOptions,
-    StreamingParameters,
-    StreamingSessionParameters,
-    StreamingEvents,
-    BeginEvent,
-    TurnEvent,
-    TerminationEvent,
-    StreamingError,
+import os
+import json
+import time
+import threading
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, Callable, Dict, List
+
+from services.metrics import STT_FINALIZATION_SECONDS, STT_FORMAT_WAIT_SECONDS, UPSTREAM_ERRORS
+from services import breakers
+
+# Point at a local emulator (e.g. ws://127.0.0.1:8765/v3/ws) to run offline
+ASSEMBLYAI_STREAMING_URL = os.getenv("ASSEMBLYAI_STREAMING_URL")
+
+# How a finished turn's text is formatted:
+#   local - the raw transcript goes to the LLM at once; punctuation and casing
+#           for display are added locally
+#   patch - as local, and AssemblyAI's formatted turn is requested too and
+#           passed to on_formatted_callback to correct the display
+#   wait  - the LLM waits for AssemblyAI's formatted turn (slowest)
+STT_FORMAT_TURNS = os.getenv("STT_FORMAT_TURNS", "local")
+
+_QUESTION_STARTS = frozenset(
+    "what who whom whose where when why how which is are am was were do does did "
+    "can could would will should shall may might have has had".split()
 )
 
-def _on_begin(client: StreamingClient, event: BeginEvent):
+# The AssemblyAI SDK is imported when the first transcriber is created.
+if TYPE_CHECKING:
+    from assemblyai.streaming.v3 import (
+        StreamingClient,
+        BeginEvent,
+        TurnEvent,
+        TerminationEvent,
+        StreamingError,
+    )
+
+def format_locally(text: str) -> str:
+    """Capitalizes and punctuates a raw transcript: 'what time is it' -> 'What time is it?'"""
+    words = text.split()
+    if not words:
+        return text
+    words = ["I" + word[1:] if word == "i" or word.startswith("i'") else word for word in words]
+    formatted = " ".join(words)
+    formatted = formatted[0].upper() + formatted[1:]
+    if formatted[-1] not in ".?!":
+        formatted += "?" if words[0].lower() in _QUESTION_STARTS else "."
+    return formatted
+
+def _on_begin(client: "StreamingClient", event: "BeginEvent"):
     print(f"AAI session started: {event.id}")
 
-def _on_termination(client: StreamingClient, event: TerminationEvent):
+def _on_termination(client: "StreamingClient", event: "TerminationEvent"):
     print(f"AAI session terminated after {event.audio_duration_seconds} s")
 
-def _on_error(client: StreamingClient, error: StreamingError):
+def _on_error(client: "StreamingClient", error: "StreamingError"):
     print("AAI error:", error)
+    UPSTREAM_ERRORS.labels("assemblyai").inc()
+
+def _event_name(event: Any) -> str:
+    return str(getattr(event, "value", event))
+
+def _query_value(value: Any) -> str:
+    return str(value).lower() if isinstance(value, bool) else str(value)
+
+def _dump_params(params: Any) -> Dict[str, Any]:
+    if isinstance(params, dict):
+        return {k: v for k, v in params.items() if v is not None}
+    dump = getattr(params, "model_dump", None) or getattr(params, "dict")
+    return dump(exclude_none=True)
+
+class _V3WebSocketClient:
+    """
+    Minimal Universal Streaming v3 client for a custom endpoint URL.
+
+    The SDK always connects to wss://<api_host>, so this mirrors the parts of
+    StreamingClient the transcriber uses (on/connect/stream/set_params/
+    disconnect) on top of the plain websockets sync client.
+    """
+
+    def __init__(self, url: str, api_key: str = None):
+        self.url = url
+        self.api_key = api_key or ""
+        self._handlers: Dict[str, List[Callable]] = {}
+        self._ws = None
+        self._reader = None
+
+    def on(self, event: Any, handler: Callable):
+        self._handlers.setdefault(_event_name(event), []).append(handler)
+
+    def _emit(self, name: str, payload: Any):
+        for handler in self._handlers.get(name, []):
+            handler(self, payload)
+
+    def connect(self, params: Any):
+        from urllib.parse import urlencode
+        from websockets.sync.client import connect
+
+        query = urlencode({k: _query_value(v) for k, v in _dump_params(params).items()})
+        self._ws = connect(f"{self.url}?{query}", additional_headers={"Authorization": self.api_key})
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    def _read_loop(self):
+        try:
+            for message in self._ws:
+                data = json.loads(message)
+                self._emit(data.get("type", ""), SimpleNamespace(**data))
+        except Exception as e:
+            self._emit("Error", e)
+
+    def stream(self, audio_chunk: bytes):
+        self._ws.send(audio_chunk)
+
+    def set_params(self, params: Any):
+        self._ws.send(json.dumps({"type": "UpdateConfiguration", **_dump_params(params)}))
+
+    def disconnect(self, terminate: bool = False):
+        if self._ws is None:
+            return
+        try:
+            if terminate:
+                self._ws.send(json.dumps({"type": "Terminate"}))
+                self._reader.join(timeout=2.0)
+        finally:
+            self._ws.close()
 
 class AssemblyAIStreamingTranscriber:
     """
     Wrapper around AAI StreamingClient that exposes:
       - on_partial_callback(text) for interim results
-      - on_final_callback(text)   when end_of_turn=True
+      - on_final_callback(text)   once per turn, when end_of_turn=True;
+        whatever it returns identifies the turn
+      - on_formatted_callback(text, turn) with the text to display for that
+        turn, where `turn` is what on_final_callback returned for it
+        (see STT_FORMAT_TURNS)
     """
 
     def __init__(
@@ -33,17 +141,36 @@ class AssemblyAIStreamingTranscriber:
         sample_rate: int = 16000,
         on_partial_callback=None,
         on_final_callback=None,
+        on_formatted_callback=None,
         api_key: str = None
     ):
+        from assemblyai.streaming.v3 import (
+            StreamingClient,
+            StreamingClientOptions,
+            StreamingParameters,
+            StreamingEvents,
+        )
+
         self.on_partial_callback = on_partial_callback
         self.on_final_callback = on_final_callback
+        self.on_formatted_callback = on_formatted_callback
+        # turn_order -> on_final_callback's result, until the formatted turn arrives
+        self._turns = {}
+        # (turn_order, perf_counter) of the last unformatted end of turn
+        self._unformatted_at = None
+        self.sample_rate = sample_rate
+        # Audio streamed so far, in the same millisecond timeline as word timestamps
+        self.audio_ms_sent = 0.0
 
-        self.client = StreamingClient(
-            StreamingClientOptions(
-                api_key=api_key,
-                api_host="streaming.assemblyai.com",
+        if ASSEMBLYAI_STREAMING_URL:
+            self.client = _V3WebSocketClient(ASSEMBLYAI_STREAMING_URL, api_key)
+        else:
+            self.client = StreamingClient(
+                StreamingClientOptions(
+                    api_key=api_key,
+                    api_host="streaming.assemblyai.com",
+                )
             )
-        )
 
         # register events
         self.client.on(StreamingEvents.Begin, _on_begin)
@@ -54,32 +181,71 @@ class AssemblyAIStreamingTranscriber:
             lambda client, event: self._on_turn(client, event),
         )
 
-        self.client.connect(
-            StreamingParameters(
-                sample_rate=sample_rate,
-                format_turns=False,
+        # Fails fast with CircuitOpen while AssemblyAI's breaker is open
+        with breakers.guard("assemblyai", api_key):
+            self.client.connect(
+                StreamingParameters(
+                    sample_rate=sample_rate,
+                    # Set once per session; toggling it per turn doubles the end-of-turn events
+                    format_turns=STT_FORMAT_TURNS in ("patch", "wait"),
+                )
             )
-        )
 
-    def _on_turn(self, client: StreamingClient, event: TurnEvent):
+    def _on_turn(self, client: "StreamingClient", event: "TurnEvent"):
         text = (event.transcript or "").strip()
         if not text:
             return
 
-        if event.end_of_turn:
-            if self.on_final_callback:
-                self.on_final_callback(text)
-
-            if not event.turn_is_formatted:
-                try:
-                    client.set_params(StreamingSessionParameters(format_turns=True))
-                except Exception as set_err:
-                    print("set_params error:", set_err)
-        else:
+        if not event.end_of_turn:
             if self.on_partial_callback:
                 self.on_partial_callback(text)
+            return
+
+        # With format_turns on, each turn ends twice: unformatted, then formatted
+        if event.turn_is_formatted:
+            if self._unformatted_at and self._unformatted_at[0] == event.turn_order:
+                # How long the LLM would wait for formatting
+                STT_FORMAT_WAIT_SECONDS.observe(time.perf_counter() - self._unformatted_at[1])
+                self._unformatted_at = None
+            if STT_FORMAT_TURNS == "wait":
+                self._final(event, text)
+            elif self.on_formatted_callback:
+                # By turn_order: a later turn may have ended in the meantime
+                self.on_formatted_callback(text, self._turns.pop(event.turn_order, None))
+            return
+
+        self._unformatted_at = (event.turn_order, time.perf_counter())
+        if STT_FORMAT_TURNS != "wait":
+            turn = self._final(event, text)
+            self._remember(event, turn)
+            if self.on_formatted_callback:
+                self.on_formatted_callback(format_locally(text), turn)
+
+    def _final(self, event: "TurnEvent", text: str):
+        self._observe_finalization(event)
+        if self.on_final_callback:
+            return self.on_final_callback(text)
+
+    def _remember(self, event: "TurnEvent", turn):
+        if STT_FORMAT_TURNS != "patch":
+            return
+        self._turns[event.turn_order] = turn
+        # A formatted turn that never arrives must not pin its entry forever
+        while len(self._turns) > 8:
+            self._turns.pop(next(iter(self._turns)))
+
+    def _observe_finalization(self, event: "TurnEvent"):
+        """Records how far the stream had moved past the last spoken word."""
+        words = event.words or []
+        if not words:
+            return
+        last = words[-1]
+        word_end_ms = last.get("end") if isinstance(last, dict) else getattr(last, "end", None)
+        if word_end_ms:
+            STT_FINALIZATION_SECONDS.observe(max(0.0, self.audio_ms_sent - word_end_ms) / 1000)
 
     def stream_audio(self, audio_chunk: bytes):
+        self.audio_ms_sent += len(audio_chunk) / 2 / self.sample_rate * 1000
         self.client.stream(audio_chunk)
 
     def close(self):
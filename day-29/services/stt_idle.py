@@ -0,0 +1,192 @@
+# services/stt_idle.py
+import os
+import math
+import time
+import asyncio
+import logging
+import operator
+import weakref
+from array import array
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Optional
+
+from services import executors
+from services.metrics import STT_STREAMS_OPEN, STT_STREAMS_IDLE, STT_IDLE_CLOSES, STT_IDLE_PERIOD_SECONDS, STT_REOPEN_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# A session's AssemblyAI stream is closed after this long without speech (0 keeps it open)
+STT_IDLE_SECONDS = float(os.getenv("STT_IDLE_SECONDS", "30"))
+# A 100 ms window this loud counts as speech: it keeps the stream open, or reopens it
+STT_IDLE_SPEECH_RMS = float(os.getenv("STT_IDLE_SPEECH_RMS", "500"))
+# Audio kept while the stream is closed, sent first when it reopens
+STT_IDLE_PREROLL_MS = int(os.getenv("STT_IDLE_PREROLL_MS", "1000"))
+# Audio buffered while the stream reopens; older audio is dropped past this
+STT_REOPEN_BUFFER_SECONDS = float(os.getenv("STT_REOPEN_BUFFER_SECONDS", "10"))
+REOPEN_BACKOFF_SECONDS = 2.0
+REAPER_INTERVAL_SECONDS = 1.0
+
+_streams: "weakref.WeakSet[IdleStream]" = weakref.WeakSet()
+_reaper: Optional[asyncio.Task] = None
+
+
+def speech_level(pcm: bytes, sample_rate: int = 16000) -> float:
+    """Loudest 100 ms window of 16-bit PCM, as RMS over every 4th sample (cheap enough for every chunk)."""
+    samples = array("h", pcm[:len(pcm) - len(pcm) % 2])[::4]
+    window = max(1, sample_rate // 40)
+    level = 0.0
+    for start in range(0, len(samples), window):
+        part = samples[start:start + window]
+        level = max(level, math.sqrt(sum(map(operator.mul, part, part)) / len(part)))
+    return level
+
+
+class IdleStream:
+    """
+    A session's upstream STT stream that is only open while the user talks.
+
+    `open()` connects through `connect` when the session starts. `feed()`
+    takes every mic chunk. After `idle_seconds` without speech, a shared
+    reaper task closes the stream, and the client WebSocket stays up. The
+    latest STT_IDLE_PREROLL_MS of audio is kept while the stream is closed.
+    When speech comes back, the stream reopens in the background. The
+    pre-roll and everything heard while it connects are sent first, so the
+    start of the utterance is not lost.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[Any]],
+        sample_rate: int = 16000,
+        idle_seconds: float = STT_IDLE_SECONDS,
+    ):
+        self.connect = connect
+        self.sample_rate = sample_rate
+        self.idle_seconds = idle_seconds
+        self.transcriber = None
+        self.reopens = 0
+        self.last_speech = time.monotonic()
+        self._idle_since: Optional[float] = None
+        self._reopening: Optional[asyncio.Task] = None
+        self._retry_at = 0.0
+        self._pending: Deque[bytes] = deque()
+        self._pending_seconds = 0.0
+        self._closed = False
+
+    async def open(self):
+        self.transcriber = await self.connect()
+        self.last_speech = time.monotonic()
+        _streams.add(self)
+        _ensure_reaper()
+
+    @property
+    def idle(self) -> bool:
+        return self._idle_since is not None
+
+    def feed(self, pcm: bytes):
+        """Sends a mic chunk upstream, or holds it while the stream is closed or reopening."""
+        now = time.monotonic()
+        speech = speech_level(pcm, self.sample_rate) >= STT_IDLE_SPEECH_RMS
+        if speech:
+            self.last_speech = now
+        if self.transcriber is not None and self._reopening is None:
+            self.transcriber.stream_audio(pcm)
+            return
+        self._hold(pcm)
+        if speech and self._reopening is None and now >= self._retry_at and not self._closed:
+            self._reopening = asyncio.get_running_loop().create_task(self._reopen())
+
+    async def close(self):
+        self._closed = True
+        _streams.discard(self)
+        if self._reopening is not None:
+            # Cancelling could strand a connection the executor is still opening
+            await asyncio.gather(self._reopening, return_exceptions=True)
+        self._end_idle_period()
+        transcriber, self.transcriber = self.transcriber, None
+        if transcriber is not None:
+            await executors.run("stt", transcriber.close)
+
+    def reap(self, now: float) -> bool:
+        """Closes the stream if the user has been quiet for `idle_seconds`; called by the reaper."""
+        if (
+            not self.idle_seconds or self.transcriber is None or self._reopening is not None
+            or now - self.last_speech < self.idle_seconds
+        ):
+            return False
+        transcriber, self.transcriber = self.transcriber, None
+        self._idle_since = now
+        STT_IDLE_CLOSES.inc()
+        logger.info(f"Closing STT stream after {now - self.last_speech:.0f} s without speech")
+        asyncio.get_running_loop().create_task(self._close_quietly(transcriber))
+        return True
+
+    async def _reopen(self):
+        started = time.perf_counter()
+        try:
+            transcriber = await self.connect()
+        except Exception as e:
+            logger.warning(f"Could not reopen STT stream: {e}")
+            self._retry_at = time.monotonic() + REOPEN_BACKOFF_SECONDS
+            self._trim(STT_IDLE_PREROLL_MS / 1000)
+            self._reopening = None
+            return
+        if self._closed:
+            await self._close_quietly(transcriber)
+            return
+        STT_REOPEN_SECONDS.observe(time.perf_counter() - started)
+        self.reopens += 1
+        self._end_idle_period()
+        while self._pending:
+            transcriber.stream_audio(self._pending.popleft())
+        self._pending_seconds = 0.0
+        self.transcriber = transcriber
+        self.last_speech = time.monotonic()
+        self._reopening = None
+
+    async def _close_quietly(self, transcriber):
+        try:
+            await executors.run("stt", transcriber.close)
+        except Exception as e:
+            logger.warning(f"Error closing idle STT stream: {e}")
+
+    def _hold(self, pcm: bytes):
+        self._pending.append(pcm)
+        self._pending_seconds += len(pcm) / 2 / self.sample_rate
+        limit = STT_REOPEN_BUFFER_SECONDS if self._reopening is not None else STT_IDLE_PREROLL_MS / 1000
+        self._trim(limit)
+
+    def _trim(self, seconds: float):
+        while len(self._pending) > 1 and self._pending_seconds - len(self._pending[0]) / 2 / self.sample_rate >= seconds:
+            self._pending_seconds -= len(self._pending.popleft()) / 2 / self.sample_rate
+
+    def _end_idle_period(self):
+        if self._idle_since is not None:
+            STT_IDLE_PERIOD_SECONDS.observe(time.monotonic() - self._idle_since)
+            self._idle_since = None
+
+
+async def _reap_forever():
+    while _streams:
+        await asyncio.sleep(REAPER_INTERVAL_SECONDS)
+        now = time.monotonic()
+        for stream in list(_streams):
+            stream.reap(now)
+
+
+def _ensure_reaper():
+    global _reaper
+    if _reaper is None or _reaper.done():
+        _reaper = asyncio.get_running_loop().create_task(_reap_forever())
+
+
+def open_streams() -> int:
+    return sum(1 for stream in list(_streams) if stream.transcriber is not None)
+
+
+def idle_streams() -> int:
+    return sum(1 for stream in list(_streams) if stream.idle)
+
+
+STT_STREAMS_OPEN.set_function(open_streams)
+STT_STREAMS_IDLE.set_function(idle_streams)
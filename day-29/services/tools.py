@@ -0,0 +1,190 @@
+# services/tools.py
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services.metrics import TOOL_CALL_SECONDS, TOOL_CALLS
+from services import executors, knowledge, limits, search
+from services.breakers import CircuitOpen
+
+logger = logging.getLogger(__name__)
+
+# Replace tools that call external services with local stand-ins (offline runs, tests)
+TOOLS_STANDINS = os.getenv("TOOLS_STANDINS", "0") == "1"
+# Simulated latency of the stand-in web_search, e.g. to exercise its deadline
+TOOLS_STANDIN_LATENCY_SECONDS = float(os.getenv("TOOLS_STANDIN_LATENCY_SECONDS", "0.2"))
+
+_MAX_CACHE_ENTRIES = 256
+
+
+class ToolContext:
+    """Per-turn state a tool may need: the session's API keys and hooks into the turn."""
+
+    def __init__(self, api_keys: Dict[str, str], session_id: str, on_call: Optional[Callable[[str], None]] = None):
+        self.api_keys = api_keys
+        self.session_id = session_id
+        self.on_call = on_call
+
+
+class Tool:
+    """
+    A function the model may call. `fn(args, context)` is a coroutine that
+    returns a JSON-serializable dict. Calls past `deadline` seconds are cut
+    off; successful results are reused for `cache_ttl` seconds (0 = never).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        parameters: Optional[Dict[str, Any]],
+        fn: Callable[[Dict[str, Any], ToolContext], Awaitable[Dict[str, Any]]],
+        deadline: float = 2.0,
+        cache_ttl: float = 0.0,
+    ):
+        self.name = name
+        self.description = description
+        self.parameters = parameters
+        self.fn = fn
+        self.deadline = deadline
+        self.cache_ttl = cache_ttl
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def declaration(self) -> Dict[str, Any]:
+        declaration = {"name": self.name, "description": self.description}
+        if self.parameters:
+            declaration["parameters"] = self.parameters
+        return declaration
+
+    def _cached(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._cache[key]
+            return None
+        return entry[1]
+
+    def _store(self, key: str, result: Dict[str, Any]):
+        self._cache[key] = (time.monotonic() + self.cache_ttl, result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > _MAX_CACHE_ENTRIES:
+            self._cache.popitem(last=False)
+
+    async def call(self, args: Dict[str, Any], context: ToolContext) -> Dict[str, Any]:
+        """Runs the tool; failures and timeouts come back as an "error" result for the model."""
+        key = json.dumps(args, sort_keys=True)
+        if self.cache_ttl:
+            cached = self._cached(key)
+            if cached is not None:
+                TOOL_CALLS.labels(self.name, "cached").inc()
+                return cached
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self.fn(args, context), self.deadline)
+        except asyncio.TimeoutError:
+            TOOL_CALLS.labels(self.name, "timeout").inc()
+            return {"error": f"The {self.name} tool timed out after {self.deadline:g} seconds."}
+        except Exception as e:
+            logger.warning(f"Tool {self.name} failed: {e}")
+            TOOL_CALLS.labels(self.name, "error").inc()
+            return {"error": f"The {self.name} tool failed."}
+        finally:
+            TOOL_CALL_SECONDS.labels(self.name).observe(time.perf_counter() - start)
+        TOOL_CALLS.labels(self.name, "ok").inc()
+        if self.cache_ttl:
+            self._store(key, result)
+        return result
+
+
+TOOLS: Dict[str, Tool] = {}
+
+
+def register(tool: Tool):
+    """Adds a tool, replacing any tool with the same name."""
+    TOOLS[tool.name] = tool
+
+
+def declarations() -> List[Dict[str, Any]]:
+    """Function declarations in the shape Gemini's `tools` parameter takes."""
+    return [{"function_declarations": [tool.declaration() for tool in TOOLS.values()]}]
+
+
+async def run_calls(calls: List[Tuple[str, Dict[str, Any]]], context: ToolContext) -> List[Dict[str, Any]]:
+    """Runs every call the model asked for at once; results come back in call order."""
+
+    async def run(name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        tool = TOOLS.get(name)
+        if tool is None:
+            return {"error": f"There is no tool named {name}."}
+        if context.on_call:
+            context.on_call(name)
+        return await tool.call(args, context)
+
+    return await asyncio.gather(*(run(name, args) for name, args in calls))
+
+
+def _query_parameters(description: str) -> Dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": {"query": {"type": "string", "description": description}},
+        "required": ["query"],
+    }
+
+
+async def _web_search(args: Dict[str, Any], context: ToolContext) -> Dict[str, Any]:
+    api_key = context.api_keys.get("serpapi")
+    await limits.acquire("serpapi", api_key, context.session_id)
+    try:
+        results = await search.search(args["query"], api_key)
+    except CircuitOpen:
+        return {"error": "Web search is unavailable right now."}
+    return {"results": [
+        {"title": result.get("title", ""), "snippet": result.get("snippet", "")}
+        for result in results.get("organic_results", [])[:5]
+    ]}
+
+
+async def _knowledge_lookup(args: Dict[str, Any], context: ToolContext) -> Dict[str, Any]:
+    passages = await executors.run("search", knowledge.lookup, args["query"])
+    return {"passages": [{"source": passage.source, "text": passage.text} for passage in passages]}
+
+
+async def _current_time(args: Dict[str, Any], context: ToolContext) -> Dict[str, Any]:
+    return {"utc": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+
+
+async def _standin_web_search(args: Dict[str, Any], context: ToolContext) -> Dict[str, Any]:
+    await asyncio.sleep(TOOLS_STANDIN_LATENCY_SECONDS)
+    return {"results": [{"title": "Offline result", "snippet": f"Stand-in search result about {args['query']}."}]}
+
+
+register(Tool(
+    "web_search",
+    "Searches the web for current events, weather, prices, scores and anything that may have changed recently.",
+    _query_parameters("The search query."),
+    _standin_web_search if TOOLS_STANDINS else _web_search,
+    deadline=search.SEARCH_DEADLINE_SECONDS,
+    cache_ttl=300,
+))
+register(Tool(
+    "current_time",
+    "Returns the current date and time in UTC.",
+    None,
+    _current_time,
+    deadline=0.5,
+))
+if knowledge.KNOWLEDGE_DIR:
+    register(Tool(
+        "knowledge_lookup",
+        "Looks up our own product documentation and notes.",
+        _query_parameters("What to look up."),
+        _knowledge_lookup,
+        deadline=0.5,
+        cache_ttl=600,
+    ))
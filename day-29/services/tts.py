@@ -1,40 +1,251 @@
 # services/tts.py
-import requests
-from typing import List, Dict, Any
-from murf import Murf
 from pathlib import Path
 import logging
 import os
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from services import executors, limits, breakers
+from services.metrics import (
+    TTS_FIRST_BYTE_SECONDS, TTS_TOTAL_SECONDS, UPSTREAM_ERRORS,
+    TTS_REQUESTS, TTS_HEDGES, TTS_HEDGE_WINS, TTS_HEDGES_SKIPPED, TTS_DEADLINE_EXCEEDED, TTS_HEDGE_THRESHOLD_SECONDS,
+)
 
 logger = logging.getLogger(__name__)
 
 MURF_API_URL = "https://api.murf.ai/v1/speech"
+DEFAULT_VOICE_ID = "en-US-ken"
+# Point at a local emulator (e.g. http://127.0.0.1:8765) to run offline
+MURF_BASE_URL = os.getenv("MURF_BASE_URL")
+
+# Give up on a sentence that has not fully synthesized within this many seconds
+TTS_DEADLINE_SECONDS = float(os.getenv("TTS_DEADLINE_SECONDS", "10"))
+# Fire a duplicate request when the first byte is later than the voice's p95
+TTS_HEDGING = os.getenv("TTS_HEDGING", "0") == "1"
+# Hedges allowed per primary request, over the last TTS_HEDGE_WINDOW requests
+TTS_HEDGE_MAX_RATIO = float(os.getenv("TTS_HEDGE_MAX_RATIO", "0.1"))
+TTS_HEDGE_WINDOW = 200
+# Threshold used until a voice has enough first-byte samples for a p95
+TTS_HEDGE_DEFAULT_SECONDS = float(os.getenv("TTS_HEDGE_DEFAULT_SECONDS", "1.5"))
+TTS_HEDGE_MIN_SAMPLES = 20
 
 # Ensure uploads folder exists
 UPLOADS_DIR = Path(__file__).resolve().parent.parent / "uploads"
 UPLOADS_DIR.mkdir(exist_ok=True)
 
-def speak(text: str, api_key: str, output_file: str = "stream_output.wav"):
+
+class TTSDeadlineExceeded(TimeoutError):
+    """Raised when a sentence was not synthesized within TTS_DEADLINE_SECONDS."""
+
+
+class FirstByteTracker:
+    """Rolling first-byte latencies for one voice and their p95."""
+
+    def __init__(self, window: int = 500):
+        self.samples = deque(maxlen=window)
+        self._p95: Optional[float] = None
+        self._stale = 0
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+        self._stale += 1
+
+    def p95(self) -> Optional[float]:
+        if len(self.samples) < TTS_HEDGE_MIN_SAMPLES:
+            return None
+        # Re-sorting the window on every request is wasteful; refresh every few samples
+        if self._p95 is None or self._stale >= 10:
+            ordered = sorted(self.samples)
+            self._p95 = ordered[int(len(ordered) * 0.95) - 1]
+            self._stale = 0
+        return self._p95
+
+    def hedge_after(self) -> float:
+        p95 = self.p95()
+        return p95 if p95 is not None else TTS_HEDGE_DEFAULT_SECONDS
+
+
+_trackers: Dict[str, FirstByteTracker] = {}
+# True for requests that fired a hedge; bounds extra spend
+_recent_hedges = deque(maxlen=TTS_HEDGE_WINDOW)
+
+
+def first_byte_tracker(voice_id: str) -> FirstByteTracker:
+    tracker = _trackers.get(voice_id)
+    if tracker is None:
+        tracker = _trackers.setdefault(voice_id, FirstByteTracker())
+        TTS_HEDGE_THRESHOLD_SECONDS.set_function(tracker.hedge_after, voice_id)
+    return tracker
+
+
+def _murf_client(api_key: str):
+    """Creates a Murf client, pointing its REST base at MURF_BASE_URL when set."""
+    from murf import Murf
+    if not MURF_BASE_URL:
+        return Murf(api_key=api_key)
+
+    import copy
+    from murf.environment import MurfEnvironment
+    environment = copy.copy(MurfEnvironment.DEFAULT)
+    environment.base = MURF_BASE_URL
+    return Murf(api_key=api_key, environment=environment)
+
+def _probe_murf(api_key: str):
+    _murf_client(api_key).text_to_speech.get_voices()
+
+breakers.register_probe("murf", _probe_murf)
+
+def speak(text: str, api_key: str, output_file: str = "stream_output.wav", on_first_chunk: Callable[[], None] = None, voice_id: str = DEFAULT_VOICE_ID, cancel: threading.Event = None):
     """
     Convert text to speech using Murf API and save audio in uploads folder.
+    `on_first_chunk` is called once when the first audio bytes arrive.
+    Setting `cancel` stops reading the stream; the call then returns None.
+    Raises CircuitOpen when Murf's breaker is open.
+    `text` should already be speakable; see services.speech_text.
     """
-    client = Murf(api_key=api_key)
+    client = _murf_client(api_key)
 
     file_path = UPLOADS_DIR / output_file
 
     # Start with a clean file
     open(file_path, "wb").close()
 
-    res = client.text_to_speech.stream(
-        text=text,
-        voice_id="en-US-ken",
-        style="Conversational"
-    )
+    start = time.perf_counter()
+    with breakers.guard("murf", api_key):
+        try:
+            res = client.text_to_speech.stream(
+                text=text,
+                voice_id=voice_id,
+                style="Conversational"
+            )
+
+            audio_bytes = b""
+            for audio_chunk in res:
+                if cancel is not None and cancel.is_set():
+                    res.close()
+                    return None
+                if not audio_bytes:
+                    first_byte = time.perf_counter() - start
+                    TTS_FIRST_BYTE_SECONDS.observe(first_byte)
+                    first_byte_tracker(voice_id).observe(first_byte)
+                    if on_first_chunk:
+                        on_first_chunk()
+                audio_bytes += audio_chunk
+                with open(file_path, "ab") as f:
+                    f.write(audio_chunk)
+        except Exception:
+            UPSTREAM_ERRORS.labels("murf").inc()
+            raise
+    TTS_TOTAL_SECONDS.observe(time.perf_counter() - start)
+
+    return audio_bytes
+
+
+def _hedge_allowed(api_key: str) -> bool:
+    if sum(_recent_hedges) >= TTS_HEDGE_MAX_RATIO * len(_recent_hedges) + 1:
+        return False
+    # A hedge is optional: only send it if the Murf rate limit has a token to spare
+    return limits.try_acquire("murf", api_key)
+
+
+class _Attempt:
+    """One speak() call running on the TTS executor."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, text: str, api_key: str, voice_id: str, output_file: str, lane: str):
+        self.cancel = threading.Event()
+        self.first_byte = loop.create_future()
+
+        def on_first_chunk():
+            loop.call_soon_threadsafe(lambda: self.first_byte.done() or self.first_byte.set_result(None))
+
+        self.done = asyncio.wrap_future(executors.EXECUTORS["tts"].submit(
+            speak, text, api_key, output_file=output_file, on_first_chunk=on_first_chunk,
+            voice_id=voice_id, cancel=self.cancel, lane=lane,
+        ))
+
+    def started(self) -> bool:
+        """First byte arrived, or the call already finished (possibly with an error)."""
+        return self.first_byte.done() or self.done.done()
+
+    def abandon(self):
+        self.cancel.set()
+        self.done.cancel()
+        self.first_byte.cancel()
+
+
+async def speak_hedged(
+    text: str,
+    api_key: str,
+    voice_id: str = DEFAULT_VOICE_ID,
+    on_first_chunk: Callable[[], None] = None,
+    lane: str = executors.INTERACTIVE,
+    deadline: float = TTS_DEADLINE_SECONDS,
+    hedging: bool = TTS_HEDGING,
+) -> bytes:
+    """
+    speak() on the TTS executor with a deadline. With hedging, a duplicate
+    request is fired when the first byte is later than the voice's adaptive
+    p95 and the spend cap allows it; whichever request streams first wins and
+    the other is abandoned. Raises TTSDeadlineExceeded when the deadline passes.
+    """
+    loop = asyncio.get_running_loop()
+    expires = loop.time() + deadline
+    TTS_REQUESTS.inc()
+    primary = _Attempt(loop, text, api_key, voice_id, "stream_output.wav", lane)
+    attempts = [primary]
+    try:
+        if hedging:
+            await asyncio.wait({primary.first_byte, primary.done}, timeout=first_byte_tracker(voice_id).hedge_after(), return_when=asyncio.FIRST_COMPLETED)
+            hedged = not primary.started() and _hedge_allowed(api_key)
+            if not primary.started():
+                _recent_hedges.append(hedged)
+                if hedged:
+                    TTS_HEDGES.inc()
+                    attempts.append(_Attempt(loop, text, api_key, voice_id, "stream_output_hedge.wav", lane))
+                else:
+                    TTS_HEDGES_SKIPPED.inc()
+            else:
+                _recent_hedges.append(False)
+
+        # The first attempt to stream wins; one that fails before streaming yields to the other
+        winner = None
+        pending = list(attempts)
+        while winner is None and pending:
+            remaining = expires - loop.time()
+            if remaining <= 0:
+                break
+            waits = {a.first_byte for a in pending} | {a.done for a in pending}
+            await asyncio.wait(waits, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in list(pending):
+                if attempt.first_byte.done() or (attempt.done.done() and attempt.done.exception() is None):
+                    winner = attempt
+                    break
+                if attempt.done.done():
+                    pending.remove(attempt)
+                    if not pending:
+                        # Every attempt failed; surface the last error
+                        raise attempt.done.exception()
+        if winner is None:
+            TTS_DEADLINE_EXCEEDED.inc()
+            raise TTSDeadlineExceeded(f"TTS did not start within {deadline:g}s")
 
-    audio_bytes = b""
-    for audio_chunk in res:
-        audio_bytes += audio_chunk
-        with open(file_path, "ab") as f:
-            f.write(audio_chunk)
+        for attempt in attempts:
+            if attempt is not winner:
+                attempt.abandon()
+        if winner is not primary:
+            TTS_HEDGE_WINS.inc()
+        if on_first_chunk:
+            on_first_chunk()
 
-    return audio_bytes
\ No newline at end of file
+        try:
+            return await asyncio.wait_for(asyncio.shield(winner.done), max(expires - loop.time(), 0))
+        except asyncio.TimeoutError:
+            TTS_DEADLINE_EXCEEDED.inc()
+            raise TTSDeadlineExceeded(f"TTS did not finish within {deadline:g}s")
+    finally:
+        for attempt in attempts:
+            if not attempt.done.done():
+                attempt.abandon()
@@ -0,0 +1,42 @@
+# services/warmup.py
+import os
+import time
+import asyncio
+import logging
+import importlib
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+PREWARM_SDKS = os.getenv("PREWARM_SDKS", "0") == "1"
+
+# Modules the services import lazily on first use
+PROVIDER_MODULES = [
+    "google.generativeai",
+    "assemblyai.streaming.v3",
+    "murf",
+    "httpx",
+]
+
+
+def prewarm() -> Dict[str, float]:
+    """Imports every provider SDK and returns the time each import took in ms."""
+    timings = {}
+    for name in PROVIDER_MODULES:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logger.warning(f"Pre-warm import of {name} failed: {e}")
+            continue
+        timings[name] = (time.perf_counter() - start) * 1000
+    logger.info("SDK pre-warm finished: " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in timings.items()))
+    return timings
+
+
+async def prewarm_in_background():
+    """Runs the pre-warm in a worker thread once the server is serving."""
+    # Yield first so the server finishes startup and starts accepting connections
+    await asyncio.sleep(0)
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, prewarm)
@@ -0,0 +1,70 @@
+# startup_report.py
+"""
+Reports the cold-start import cost of the app, grouped by top-level package.
+
+Usage:
+    python startup_report.py              # import main.py
+    python startup_report.py services.llm # import a single module
+    python startup_report.py --top 30
+"""
+import argparse
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+
+def run_importtime(module: str) -> str:
+    """Imports the module in a fresh interpreter with -X importtime and returns stderr."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        tail = result.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        raise SystemExit(f"Importing {module} failed: {tail[0]}")
+    return result.stderr
+
+
+def parse_importtime(output: str):
+    """Yields (module, self_us, cumulative_us) from -X importtime output."""
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        yield name.strip(), int(self_us), int(cumulative_us)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-module import cost report.")
+    parser.add_argument("module", nargs="?", default="main", help="module to import (default: main)")
+    parser.add_argument("--top", type=int, default=20, help="number of modules and packages to list")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = list(parse_importtime(run_importtime(args.module)))
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    by_package = defaultdict(int)
+    for name, self_us, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+
+    total_ms = sum(self_us for _, self_us, _ in rows) / 1000
+    print(f"Imported {args.module}: {len(rows)} modules, {total_ms:.1f} ms import time, {wall_ms:.1f} ms wall (incl. interpreter start)\n")
+
+    print(f"{'package':<40}{'self ms':>10}")
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{package:<40}{self_us / 1000:>10.1f}")
+
+    print(f"\n{'module':<55}{'self ms':>10}{'cumulative ms':>15}")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"{name:<55}{self_us / 1000:>10.1f}{cumulative_us / 1000:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -39,6 +39,10 @@ document.addEventListener("DOMContentLoaded", () => {
         alert("API keys saved!");
     });
 
+    // The latest user message and its turn, so a better-formatted transcript can replace it
+    let lastUserMessage = null;
+    let lastUserTurnId = null;
+
     const addOrUpdateMessage = (text, type) => {
         if (type === "assistant") {
             assistantMessageDiv = document.createElement('div');
@@ -51,13 +55,22 @@ document.addEventListener("DOMContentLoaded", () => {
             messageDiv.className = 'message user';
             messageDiv.textContent = text;
             chatLog.appendChild(messageDiv);
+            lastUserMessage = messageDiv;
         }
         chatLog.scrollTop = chatLog.scrollHeight;
     };
 
+    // Tells the server when the assistant is audible, so it can keep the echo away from STT
+    const setPlaying = (playing) => {
+        if (playing !== isPlaying && ws && ws.readyState === WebSocket.OPEN) {
+            ws.send(JSON.stringify({ type: "playback", state: playing ? "start" : "end" }));
+        }
+        isPlaying = playing;
+    };
+
     const playNextInQueue = () => {
         if (audioQueue.length > 0) {
-            isPlaying = true;
+            setPlaying(true);
             const base64Audio = audioQueue.shift();
             const audioData = Uint8Array.from(atob(base64Audio), c => c.charCodeAt(0)).buffer;
             
@@ -72,7 +85,7 @@ document.addEventListener("DOMContentLoaded", () => {
                 playNextInQueue();
             });
         } else {
-            isPlaying = false;
+            setPlaying(false);
         }
     };
 
@@ -119,8 +132,24 @@ document.addEventListener("DOMContentLoaded", () => {
                 const msg = JSON.parse(event.data);
                 if (msg.type === "assistant") {
                     addOrUpdateMessage(msg.text, "assistant");
+                } else if (msg.type === "busy") {
+                    if (!msg.queued) stopRecording();
+                    statusDisplay.textContent = msg.message;
+                } else if (msg.type === "admitted") {
+                    statusDisplay.textContent = "Listening...";
+                } else if (msg.type === "partial") {
+                    statusDisplay.textContent = msg.text;
                 } else if (msg.type === "final") {
+                    statusDisplay.textContent = "Listening...";
                     addOrUpdateMessage(msg.text, "user");
+                    lastUserTurnId = msg.turn_id;
+                } else if (msg.type === "final_patch") {
+                    if (lastUserMessage && msg.turn_id === lastUserTurnId) {
+                        lastUserMessage.textContent = msg.text;
+                    }
+                } else if (msg.type === "cancel") {
+                    // The reply was superseded by a new turn; drop its queued audio
+                    audioQueue = [];
                 } else if (msg.type === "audio") {
                     audioQueue.push(msg.b64);
                     if (!isPlaying) {
@@ -0,0 +1,59 @@
+# tests/test_cache.py
+import unittest
+
+from services.cache import ResponseCache, history_turns
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = ResponseCache(enabled=True)
+
+    def test_hit_on_same_normalized_question(self):
+        self.cache.store("What is the capital of Austria?", [], "Vienna.")
+        entry = self.cache.lookup("what is the capital of austria", [])
+        self.assertIsNotNone(entry)
+        self.assertEqual(entry.text, "Vienna.")
+
+    def test_rephrased_question_is_a_hit(self):
+        self.cache.store("What is the capital of France?", [], "Paris.")
+        for query in ("what's the capital of france", "what is the capital of france please", "Tell me, what is the capital of France?"):
+            with self.subTest(query=query):
+                entry = self.cache.lookup(query, [])
+                self.assertIsNotNone(entry)
+                self.assertEqual(entry.text, "Paris.")
+
+    def test_similar_question_is_a_miss(self):
+        self.cache.store("what is the capital of austria", [], "Vienna.")
+        self.assertIsNone(self.cache.lookup("what is the capital of australia", []))
+
+    def test_different_numbers_or_question_words_are_a_miss(self):
+        self.cache.store("who won the world cup in 2022", [], "Argentina.")
+        self.cache.store("why is the sky blue", [], "Rayleigh scattering.")
+        for query in ("who won the world cup in 2018", "who won the world cup in 2023", "how is the sky blue", "why is the sky not blue"):
+            with self.subTest(query=query):
+                self.assertIsNone(self.cache.lookup(query, []))
+
+    def test_same_content_words_below_the_threshold_are_a_miss(self):
+        cache = ResponseCache(enabled=True, similarity=0.99)
+        cache.store("what is the capital of france", [], "Paris.")
+        self.assertIsNone(cache.lookup("tell me the capital of france", []))
+
+    def test_answers_shaped_by_history_are_not_shared(self):
+        history = history_turns("my name is alice", "Nice to meet you, Alice!")
+        self.assertIsNone(self.cache.store("what is my name", history, "Your name is Alice."))
+        # Another session, with no history, must not get the first session's answer
+        self.assertIsNone(self.cache.lookup("what is my name", []))
+
+    def test_lookup_with_history_is_a_miss(self):
+        self.cache.store("how tall is mount everest", [], "About 8,849 meters.")
+        history = history_turns("hello", "Hi!")
+        self.assertIsNone(self.cache.lookup("how tall is mount everest", history))
+
+    def test_disabled_cache_stores_nothing(self):
+        cache = ResponseCache(enabled=False)
+        self.assertIsNone(cache.store("what is the capital of austria", [], "Vienna."))
+        self.assertIsNone(cache.lookup("what is the capital of austria", []))
+
+
+if __name__ == "__main__":
+    unittest.main()
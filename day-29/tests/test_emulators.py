@@ -0,0 +1,38 @@
+# tests/test_emulators.py
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from emulators import murf
+from emulators.faults import load_profiles
+
+
+class MurfStreamInputTest(unittest.TestCase):
+    def setUp(self):
+        app = FastAPI()
+        app.include_router(murf.create_router(load_profiles()["murf"]))
+        self.client = TestClient(app)
+
+    def test_end_only_message_closes_the_context(self):
+        with self.client.websocket_connect("/v1/speech/stream-input") as ws:
+            ws.send_json({"context_id": "c1", "voice_config": {"voiceId": "en-US-darnell"}})
+            ws.send_json({"context_id": "c1", "text": "Hello there.", "end": False})
+            ws.send_json({"context_id": "c1", "end": True})
+            messages = []
+            while not messages or not messages[-1].get("final"):
+                messages.append(ws.receive_json())
+        self.assertTrue(any("audio" in message for message in messages[:-1]))
+        self.assertEqual(messages[-1], {"final": True, "context_id": "c1"})
+
+    def test_text_with_end_still_closes_the_context(self):
+        with self.client.websocket_connect("/v1/speech/stream-input") as ws:
+            ws.send_json({"context_id": "c2", "text": "Bye.", "end": True})
+            messages = []
+            while not messages or not messages[-1].get("final"):
+                messages.append(ws.receive_json())
+        self.assertEqual(messages[-1]["context_id"], "c2")
+
+
+if __name__ == "__main__":
+    unittest.main()
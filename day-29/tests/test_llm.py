@@ -0,0 +1,48 @@
+# tests/test_llm.py
+import os
+import unittest
+from unittest import mock
+
+from services import llm, llm_backends
+
+
+class FastTierFallbackTest(unittest.TestCase):
+    def setUp(self):
+        self.fast = mock.Mock(name="fast")
+        self.strong = mock.Mock(name="strong")
+        self.strong.generate.return_value = ("Paris is the capital of France.", mock.Mock(name="gemini"))
+        patches = [
+            mock.patch.object(llm, "fast_router", self.fast),
+            mock.patch.object(llm_backends, "router", self.strong),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def answer(self):
+        text, _ = llm.get_llm_response("what is the capital of france", [], api_key="", tier=llm.FAST)
+        return text
+
+    def test_fast_answer_is_used(self):
+        self.fast.generate.return_value = ("Paris.", mock.Mock(name="flash-8b"))
+        self.assertEqual(self.answer(), "Paris.")
+        self.strong.generate.assert_not_called()
+
+    def test_empty_or_refusing_fast_answer_goes_to_the_full_model(self):
+        for reply in ("", "  ", "I'm sorry, but I can't help with that.", "I can’t answer that."):
+            with self.subTest(reply=reply):
+                self.fast.generate.return_value = (reply, mock.Mock(name="flash-8b"))
+                self.assertEqual(self.answer(), "Paris is the capital of France.")
+
+    def test_fast_tier_error_goes_to_the_full_model(self):
+        self.fast.generate.side_effect = RuntimeError("boom")
+        self.assertEqual(self.answer(), "Paris is the capital of France.")
+
+    @unittest.skipIf("COMPLEXITY_ROUTING" in os.environ, "COMPLEXITY_ROUTING is set")
+    def test_routing_is_off_by_default(self):
+        self.assertFalse(llm.COMPLEXITY_ROUTING)
+        self.assertEqual(llm.estimate_complexity("thanks", []).tier, llm.STRONG)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+# tests/test_llm_backends.py
+import unittest
+
+from services import breakers
+from services.llm_backends import LLMRouter, LocalBackend
+
+
+class RouterRecoveryTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = LocalBackend("local")
+        self.breaker = breakers.BREAKERS["local"]
+        self.router = LLMRouter([self.backend], policy="ordered")
+
+    def tearDown(self):
+        with self.breaker._lock:
+            self.breaker._close()
+
+    def trip(self):
+        with self.breaker._lock:
+            self.breaker._open()
+
+    def test_open_breaker_excludes_the_backend(self):
+        self.trip()
+        self.assertEqual(self.router.candidates(), [])
+        with self.assertRaises(breakers.CircuitOpen):
+            self.router.generate("system", [], "hello", api_key="")
+
+    def test_backend_returns_for_a_trial_after_the_open_period(self):
+        self.trip()
+        self.breaker._opened_at -= breakers.BREAKER_OPEN_SECONDS
+        self.assertEqual(self.router.candidates(), [self.backend])
+        text, backend = self.router.generate("system", [], "hello", api_key="")
+        self.assertIs(backend, self.backend)
+        self.assertTrue(text)
+        self.assertEqual(self.breaker.state, breakers.CLOSED)
+
+
+if __name__ == "__main__":
+    unittest.main()
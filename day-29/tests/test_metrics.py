@@ -0,0 +1,26 @@
+# tests/test_metrics.py
+import threading
+import unittest
+
+from services.metrics import Counter
+
+
+class CounterTest(unittest.TestCase):
+    def test_concurrent_increments_are_all_counted(self):
+        counter = Counter("test_events", "Events.", ("kind",))
+
+        def bump():
+            for _ in range(10000):
+                counter.labels("a").inc()
+
+        threads = [threading.Thread(target=bump) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counter.labels("a").value, 80000)
+        self.assertIn('test_events_total{kind="a"} 80000', counter.render())
+
+
+if __name__ == "__main__":
+    unittest.main()
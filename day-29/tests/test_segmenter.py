@@ -0,0 +1,112 @@
+# tests/test_segmenter.py
+import unittest
+
+from services.segmenter import SentenceSegmenter
+
+
+def split(text: str, **kwargs):
+    # min_chars=0 keeps one sentence per chunk, so boundaries are easy to check
+    return SentenceSegmenter(min_chars=0, **kwargs).split(text)
+
+
+def streamed(text: str, chunk: int, **kwargs):
+    segmenter = SentenceSegmenter(**kwargs)
+    out = []
+    for i in range(0, len(text), chunk):
+        out.extend(segmenter.feed(text[i:i + chunk]))
+    return out + segmenter.flush()
+
+
+class AbbreviationTest(unittest.TestCase):
+    def test_titles_and_latin_abbreviations_do_not_split(self):
+        self.assertEqual(
+            split("Dr. Patel says hi. Bring snacks, e.g. fruit. Done."),
+            ["Dr. Patel says hi.", "Bring snacks, e.g. fruit.", "Done."],
+        )
+
+    def test_initials_do_not_split(self):
+        self.assertEqual(split("J. R. R. Tolkien wrote it. Read it."), ["J. R. R. Tolkien wrote it.", "Read it."])
+
+    def test_ordinary_words_end_sentences(self):
+        self.assertEqual(split("Feel free to call us. We open at 9 am. See you."), ["Feel free to call us.", "We open at 9 am.", "See you."])
+        self.assertEqual(split("The answer is no. Sorry."), ["The answer is no.", "Sorry."])
+
+    def test_ambiguous_words_before_a_number_or_with_dots(self):
+        self.assertEqual(split("Take No. 5 home. It leaves at 9 a.m. Tomorrow too."), ["Take No. 5 home.", "It leaves at 9 a.m. Tomorrow too."])
+
+
+class NumberAndPunctuationTest(unittest.TestCase):
+    def test_decimals_do_not_split(self):
+        self.assertEqual(split("Pi is about 3.14 today. Version 2.0.1 shipped."), ["Pi is about 3.14 today.", "Version 2.0.1 shipped."])
+
+    def test_ellipsis_before_lowercase_continues(self):
+        self.assertEqual(split("Wait... that is odd. Really."), ["Wait... that is odd.", "Really."])
+
+    def test_ellipsis_before_capital_ends(self):
+        self.assertEqual(split("Hmm... Let me think. Okay."), ["Hmm...", "Let me think.", "Okay."])
+
+    def test_numbered_list_items(self):
+        self.assertEqual(split("Options:\n1. Take the bus.\n2. Walk.\n"), ["Options:", "1. Take the bus.", "2. Walk."])
+
+    def test_question_and_exclamation(self):
+        self.assertEqual(split("Really?! Yes! Sure."), ["Really?!", "Yes!", "Sure."])
+
+
+class StreamingTest(unittest.TestCase):
+    TEXT = (
+        "Sure! Dr. Patel recommends about 2.5 liters of water a day, e.g. eight glasses. "
+        "Wait... that is not quite right. Here are options:\n1. Take the bus.\n2. Walk along the river.\n"
+        "Is that what you were looking for?"
+    )
+
+    def test_chunk_size_does_not_change_the_result(self):
+        whole = SentenceSegmenter().split(self.TEXT)
+        for chunk in (1, 3, 7, 24, 1000):
+            self.assertEqual(streamed(self.TEXT, chunk), whole, f"chunk={chunk}")
+
+    def test_first_sentence_is_emitted_before_the_stream_ends(self):
+        segmenter = SentenceSegmenter()
+        self.assertEqual(segmenter.feed("Sure! The museum opens"), ["Sure!"])
+
+    def test_terminator_at_the_end_of_a_chunk_waits_for_more_text(self):
+        segmenter = SentenceSegmenter(min_chars=0)
+        self.assertEqual(segmenter.feed("It costs 3."), [])
+        self.assertEqual(segmenter.feed("50 dollars. Okay"), ["It costs 3.50 dollars."])
+
+
+class FlushTest(unittest.TestCase):
+    def test_flush_returns_the_unterminated_tail(self):
+        segmenter = SentenceSegmenter(min_chars=0)
+        self.assertEqual(segmenter.feed("First one. And the rest"), ["First one."])
+        self.assertEqual(segmenter.flush(), ["And the rest"])
+
+    def test_flush_returns_held_short_sentences(self):
+        segmenter = SentenceSegmenter(min_chars=40)
+        self.assertEqual(segmenter.feed("Hi. Yes. No. "), ["Hi."])
+        self.assertEqual(segmenter.flush(), ["Yes. No."])
+
+    def test_trailing_sentence_waits_for_flush(self):
+        # "done. " could still turn out to be "done. and", so it is held
+        segmenter = SentenceSegmenter(min_chars=0)
+        self.assertEqual(segmenter.feed("All done. "), [])
+        self.assertEqual(segmenter.flush(), ["All done."])
+
+    def test_flush_after_a_sentence_boundary_is_empty(self):
+        segmenter = SentenceSegmenter(min_chars=0)
+        self.assertEqual(segmenter.feed("All done.\n"), ["All done."])
+        self.assertEqual(segmenter.flush(), [])
+        self.assertEqual(segmenter.flush(), [])
+
+    def test_flush_of_an_empty_stream_is_empty(self):
+        self.assertEqual(SentenceSegmenter().flush(), [])
+
+    def test_long_sentence_is_cut_at_a_clause(self):
+        text = "alpha beta gamma, " * 20 + "end."
+        chunks = split(text, max_chars=100, first_max_chars=60)
+        self.assertTrue(all(len(chunk) <= 100 for chunk in chunks))
+        self.assertLessEqual(len(chunks[0]), 60)
+        self.assertEqual(" ".join(chunks).replace(" ,", ","), " ".join(text.split()).strip())
+
+
+if __name__ == "__main__":
+    unittest.main()
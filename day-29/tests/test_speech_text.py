@@ -0,0 +1,18 @@
+# tests/test_speech_text.py
+import unittest
+
+from services.speech_text import normalize
+
+
+class SymbolTest(unittest.TestCase):
+    def test_sharp_languages_keep_their_name(self):
+        self.assertEqual(normalize("Try C# or F#, not C."), "Try C sharp or F sharp, not C.")
+
+    def test_number_sign_and_hashtags(self):
+        self.assertEqual(normalize("Issue #12 is tagged #urgent"), "Issue number 12 is tagged urgent")
+
+    def test_lowercase_and_words_are_left_alone(self):
+        self.assertEqual(normalize("c# is fine, but ABC# is not a language"), "C sharp is fine, but ABC is not a language")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+# tests/test_stt.py
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from services import stt
+
+
+def turn(order: int, text: str, formatted: bool = False):
+    return SimpleNamespace(transcript=text, end_of_turn=True, turn_is_formatted=formatted, turn_order=order, words=[])
+
+
+class FormattedTurnTest(unittest.TestCase):
+    def setUp(self):
+        # Skips __init__, which connects to AssemblyAI
+        self.transcriber = stt.AssemblyAIStreamingTranscriber.__new__(stt.AssemblyAIStreamingTranscriber)
+        self.transcriber.on_partial_callback = None
+        self.transcriber.on_final_callback = lambda text: f"id-{text}"
+        self.formatted = []
+        self.transcriber.on_formatted_callback = lambda text, turn_id: self.formatted.append((text, turn_id))
+        self.transcriber._turns = {}
+        self.transcriber._unformatted_at = None
+        self.transcriber.audio_ms_sent = 0.0
+
+    def test_local_formatting_names_the_turn(self):
+        with mock.patch.object(stt, "STT_FORMAT_TURNS", "local"):
+            self.transcriber._on_turn(None, turn(0, "what time is it"))
+        self.assertEqual(self.formatted, [("What time is it?", "id-what time is it")])
+
+    def test_late_formatted_turn_patches_its_own_turn(self):
+        with mock.patch.object(stt, "STT_FORMAT_TURNS", "patch"):
+            self.transcriber._on_turn(None, turn(0, "first one"))
+            # The next turn ends before the first one's formatted copy arrives
+            self.transcriber._on_turn(None, turn(1, "second one"))
+            self.transcriber._on_turn(None, turn(0, "First one.", formatted=True))
+        self.assertEqual(self.formatted[-1], ("First one.", "id-first one"))
+        self.assertEqual(list(self.transcriber._turns), [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
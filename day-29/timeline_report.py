@@ -0,0 +1,192 @@
+# timeline_report.py
+"""
+Offline analyzer for the per-turn timelines written when TIMELINE_PATH is set.
+
+Usage:
+    python timeline_report.py summary timelines/turns.jsonl
+    python timeline_report.py outliers timelines/turns.jsonl --top 10
+    python timeline_report.py waterfall timelines/turns.jsonl --slowest 3
+    python timeline_report.py waterfall timelines/turns.jsonl --turn 3f2a9c1b7d04
+    python timeline_report.py complexity timelines/turns.jsonl
+
+Rotated files (turns.jsonl.1, .2, ...) are picked up automatically.
+"""
+import sys
+import glob
+import json
+import argparse
+from collections import defaultdict
+from typing import Dict, Iterator, List
+
+BAR_WIDTH = 60
+
+
+def expand_paths(paths: List[str]) -> List[str]:
+    files = []
+    for path in paths:
+        matches = sorted(glob.glob(path)) + sorted(glob.glob(f"{path}.[0-9]*"))
+        files.extend(match for match in matches if match not in files)
+    return files
+
+
+def load_turns(paths: List[str]) -> Iterator[dict]:
+    for path in expand_paths(paths):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, int(round(pct / 100 * len(ordered))) - 1)] if ordered else 0.0
+
+
+def stage_intervals(turn: dict) -> Iterator[tuple]:
+    """(stage, ms) pairs: each event owns the time since the previous event."""
+    previous = 0.0
+    for event in turn["events"]:
+        name, ms = event[0], event[1]
+        yield name, ms - previous
+        previous = ms
+
+
+def dominant_stage(turn: dict) -> str:
+    intervals = list(stage_intervals(turn))
+    if not intervals:
+        return "-"
+    name, ms = max(intervals, key=lambda item: item[1])
+    return f"{name} ({ms:.0f} ms)"
+
+
+def command_summary(args):
+    turns = list(load_turns(args.paths))
+    if not turns:
+        sys.exit("No turns found.")
+    totals = [turn["total_ms"] for turn in turns]
+    stages: Dict[str, List[float]] = defaultdict(list)
+    for turn in turns:
+        for name, ms in stage_intervals(turn):
+            stages[name].append(ms)
+    grand_total = sum(totals)
+
+    errors = sum(1 for turn in turns if any(event[0] == "error" for event in turn["events"]))
+    print(f"{len(turns)} turns, {errors} errors; total p50 {percentile(totals, 50):.0f} ms, "
+          f"p95 {percentile(totals, 95):.0f} ms, p99 {percentile(totals, 99):.0f} ms\n")
+    print(f"{'stage (time until event)':<28}{'count':>7}{'mean':>8}{'p50':>8}{'p95':>8}{'share':>8}")
+    for name, values in sorted(stages.items(), key=lambda item: sum(item[1]), reverse=True):
+        share = sum(values) / grand_total * 100 if grand_total else 0.0
+        print(f"{name:<28}{len(values):>7}{sum(values) / len(values):>8.0f}"
+              f"{percentile(values, 50):>8.0f}{percentile(values, 95):>8.0f}{share:>7.1f}%")
+
+
+def command_outliers(args):
+    turns = list(load_turns(args.paths))
+    totals = [turn["total_ms"] for turn in turns]
+    threshold = percentile(totals, args.percentile)
+    slow = sorted((turn for turn in turns if turn["total_ms"] >= threshold), key=lambda turn: turn["total_ms"], reverse=True)
+    print(f"Turns at or above p{args.percentile:g} ({threshold:.0f} ms):\n")
+    print(f"{'turn':<14}{'session':<14}{'total ms':>9}{'chars':>7}{'sentences':>11}  slowest stage")
+    for turn in slow[:args.top]:
+        print(f"{turn['turn_id']:<14}{turn['session_id']:<14}{turn['total_ms']:>9.0f}"
+              f"{turn['text_chars']:>7}{len(turn['sentences']):>11}  {dominant_stage(turn)}")
+
+
+def print_waterfall(turn: dict):
+    total = turn["total_ms"] or 1.0
+    scale = BAR_WIDTH / total
+    print(f"turn {turn['turn_id']} (session {turn['session_id']}): {turn['total_ms']:.0f} ms, "
+          f"{turn['bytes'].get('audio', 0)} audio bytes")
+    previous = 0.0
+    for event in turn["events"]:
+        name, ms = event[0], event[1]
+        offset = int(previous * scale)
+        width = max(1, int((ms - previous) * scale))
+        detail = " " + json.dumps(event[2]) if len(event) > 2 else ""
+        print(f"  {name:<18}{ms:>8.0f} ms |{' ' * offset}{'#' * width}{detail}")
+        previous = ms
+    for sentence in turn["sentences"]:
+        print(f"  sentence {sentence['index']}: {sentence['chars']} chars, start {sentence['start_ms']:.0f} ms, "
+              f"first byte {sentence.get('first_byte_ms', '-')} ms, sent {sentence.get('sent_ms', '-')} ms")
+    print()
+
+
+def command_waterfall(args):
+    turns = list(load_turns(args.paths))
+    if args.turn:
+        selected = [turn for turn in turns if turn["turn_id"] == args.turn]
+    else:
+        selected = sorted(turns, key=lambda turn: turn["total_ms"], reverse=True)[:args.slowest]
+    if not selected:
+        sys.exit("No matching turns.")
+    for turn in selected:
+        print_waterfall(turn)
+
+
+def event_detail(turn: dict, name: str):
+    """(ms, detail) of the first event with this name, or None."""
+    for event in turn["events"]:
+        if event[0] == name:
+            return event[1], event[2] if len(event) > 2 else {}
+    return None
+
+
+def command_complexity(args):
+    """LLM latency and reply length by complexity tier and score, for tuning COMPLEXITY_THRESHOLD."""
+    rows = []
+    for turn in load_turns(args.paths):
+        routed, done = event_detail(turn, "complexity"), event_detail(turn, "llm_done")
+        if routed and done:
+            rows.append((routed[1], done[0] - routed[0], done[1].get("chars", 0)))
+    if not rows:
+        sys.exit("No turns with complexity decisions found.")
+
+    print(f"{'tier':<10}{'turns':>7}{'llm p50':>9}{'llm p95':>9}{'chars p50':>11}")
+    for tier in sorted({decision["tier"] for decision, _, _ in rows}):
+        llm_ms = [ms for decision, ms, _ in rows if decision["tier"] == tier]
+        chars = [count for decision, _, count in rows if decision["tier"] == tier]
+        print(f"{tier:<10}{len(llm_ms):>7}{percentile(llm_ms, 50):>9.0f}{percentile(llm_ms, 95):>9.0f}{percentile(chars, 50):>11.0f}")
+
+    print(f"\n{'score':<10}{'turns':>7}{'fast':>6}{'llm p50':>9}{'chars p50':>11}")
+    buckets: Dict[float, list] = defaultdict(list)
+    for decision, ms, count in rows:
+        buckets[decision["score"] // args.bucket * args.bucket].append((decision["tier"], ms, count))
+    for start in sorted(buckets):
+        entries = buckets[start]
+        fast = sum(1 for tier, _, _ in entries if tier == "fast")
+        print(f"{start:<10.2f}{len(entries):>7}{fast:>6}{percentile([ms for _, ms, _ in entries], 50):>9.0f}"
+              f"{percentile([count for _, _, count in entries], 50):>11.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze per-turn timeline JSONL files.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    summary = sub.add_parser("summary", help="attribute time to stages across all turns")
+    summary.add_argument("paths", nargs="+")
+    summary.set_defaults(func=command_summary)
+
+    outliers = sub.add_parser("outliers", help="list the slowest turns")
+    outliers.add_argument("paths", nargs="+")
+    outliers.add_argument("--percentile", type=float, default=95)
+    outliers.add_argument("--top", type=int, default=20)
+    outliers.set_defaults(func=command_outliers)
+
+    waterfall = sub.add_parser("waterfall", help="draw event waterfalls")
+    waterfall.add_argument("paths", nargs="+")
+    waterfall.add_argument("--turn", help="turn_id to draw")
+    waterfall.add_argument("--slowest", type=int, default=3, help="draw the N slowest turns")
+    waterfall.set_defaults(func=command_waterfall)
+
+    complexity = sub.add_parser("complexity", help="LLM latency by complexity tier and score")
+    complexity.add_argument("paths", nargs="+")
+    complexity.add_argument("--bucket", type=float, default=0.5, help="score bucket width")
+    complexity.set_defaults(func=command_complexity)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()